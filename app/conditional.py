@@ -0,0 +1,123 @@
+"""Conditional GET support (ETag / Last-Modified) for read endpoints."""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional, Sequence
+
+from fastapi import Request, Response, status
+
+
+def entity_version(obj: Any) -> tuple:
+    """
+    Cheap version marker for a row: its table, ID and version counter,
+    falling back to updated_at/created_at for models without a counter.
+    """
+    if obj is None:
+        return ()
+    version = getattr(obj, "version", None)
+    if version is None:
+        version = getattr(obj, "updated_at", None) or getattr(obj, "created_at", None)
+    return (obj.__tablename__, obj.id, str(version))
+
+
+def last_modified_of(objects: Iterable[Any]) -> Optional[datetime]:
+    """Latest updated_at/created_at across objects."""
+    latest = None
+    for obj in objects:
+        if obj is None:
+            continue
+        stamp = getattr(obj, "updated_at", None) or getattr(obj, "created_at", None)
+        if stamp is None:
+            continue
+        if stamp.tzinfo is None:
+            # SQLite returns naive UTC timestamps
+            stamp = stamp.replace(tzinfo=timezone.utc)
+        if latest is None or stamp > latest:
+            latest = stamp
+    return latest
+
+
+def make_etag(parts: Iterable[Any]) -> str:
+    """Weak ETag over version markers, computed without serializing the body."""
+    digest = hashlib.sha1(repr(list(parts)).encode()).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def room_objects(room, movie, fields: Optional[Sequence[str]] = None) -> list:
+    """
+    Rows a RoomResponse is built from; movie may be a cached movie.
+    With a sparse fieldset, only the rows its fields come from.
+    """
+    objects = [room]
+    if fields is None or "movie" in fields:
+        objects.append(movie)
+    if fields is None or "creator" in fields:
+        objects.append(room.creator)
+    return objects
+
+
+def review_objects(review, movie, fields: Optional[Sequence[str]] = None) -> list:
+    """
+    Rows a ReviewResponse is built from; movie may be a cached movie.
+    With a sparse fieldset, only the rows its fields come from.
+    """
+    objects = [review]
+    if fields is None or "user" in fields:
+        objects.append(review.user)
+    if fields is None or "movie" in fields:
+        objects.append(movie)
+    return objects
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    objects: Iterable[Any],
+    extra: Iterable[Any] = (),
+    single: bool = False
+) -> Optional[Response]:
+    """
+    Set ETag on response from the rows the body is built from, plus any
+    extra values it depends on (e.g. member counts). Last-Modified and
+    If-Modified-Since are only used when the body is a single row
+    (single=True): removing a row from a list or a room's members moves
+    no timestamp, so lists and room details rely on the ETag alone.
+    Returns a 304 Response when the client's copy is current (the route
+    should return it as-is, skipping serialization), otherwise None.
+    """
+    objects = list(objects)
+    etag = make_etag([entity_version(obj) for obj in objects] + list(extra))
+    last_modified = last_modified_of(objects) if single else None
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        fresh = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                since = None
+            if since is not None and since.tzinfo is not None:
+                fresh = last_modified.replace(microsecond=0) <= since
+
+    if fresh:
+        # Keep other headers already set (e.g. X-Next-Cursor)
+        headers = dict(response.headers)
+        headers.pop("content-length", None)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
@@ -1,5 +1,8 @@
 """Database configuration and session management."""
-from sqlalchemy import create_engine
+import warnings
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError, SAWarning
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -9,6 +12,10 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./moviefan.db")
 
+# Strict mode (tests, benchmarks/query_budgets.py): relationships that were not
+# eager-loaded raise instead of querying, so N+1 patterns fail loudly
+STRICT_LOADING = os.getenv("STRICT_LOADING", "").lower() in ("1", "true", "yes")
+
 # Create engine
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
@@ -33,4 +40,50 @@ def get_db():
         db.close()
 
 
+def upgrade_schema(bind=None):
+    """
+    Add columns and indexes declared on models but missing from existing
+    tables. create_all() only creates missing tables, so this covers new
+    nullable/defaulted columns on databases created by older versions.
+    A column with info["backfill"] (a scalar SELECT correlated to the
+    table) is filled from it in the same transaction.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    preparer = bind.dialect.identifier_preparer
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = (
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=bind.dialect)}"
+                )
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+                if column.info.get("backfill"):
+                    conn.execute(text(
+                        f"UPDATE {preparer.format_table(table)} "
+                        f"SET {preparer.format_column(column)} = ({column.info['backfill']})"
+                    ))
 
+            with warnings.catch_warnings():
+                # SQLite can't reflect expression indexes; IF NOT EXISTS covers them
+                warnings.simplefilter("ignore", SAWarning)
+                indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in indexes:
+                    continue
+                try:
+                    with conn.begin_nested():
+                        conn.execute(CreateIndex(index, if_not_exists=True))
+                except (IntegrityError, OperationalError) as exc:
+                    # e.g. a unique index over rows that still hold duplicates;
+                    # the rest of the upgrade goes ahead
+                    print(f"Warning: could not create index {index.name}: {exc.orig}")
@@ -0,0 +1,80 @@
+"""Sparse fieldsets (?fields=id,title) for list endpoints."""
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import load_only
+
+from app.models import Movie, Room, Review
+
+FIELDS_DESCRIPTION = 'Comma-separated response fields to return, e.g. "id,title" (default: all)'
+
+# Columns every sparse query loads anyway: keys, sort keys and ETag version markers
+MOVIE_KEY_COLUMNS = (Movie.id, Movie.year, Movie.title, Movie.created_at, Movie.updated_at, Movie.version)
+ROOM_KEY_COLUMNS = (Room.id, Room.movie_id, Room.creator_id, Room.created_at, Room.updated_at, Room.version)
+REVIEW_KEY_COLUMNS = (Review.id, Review.movie_id, Review.user_id, Review.created_at, Review.updated_at, Review.version)
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[List[str]]:
+    """Validate a fields= value against a response schema; None means all fields."""
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in schema.model_fields]
+    if not names or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "fields must name at least one field"
+        )
+    return names
+
+
+def includes(fields: Optional[Sequence[str]], name: str) -> bool:
+    """Whether a response with these fields contains name."""
+    return fields is None or name in fields
+
+
+def load_columns(model, fields: Sequence[str], always: Iterable = ()):
+    """
+    Query option loading only the model columns named in fields, plus the
+    always columns (sort keys, version markers).
+    """
+    columns = sa_inspect(model).columns
+    attributes = {attribute.key: attribute for attribute in always}
+    for name in fields:
+        if name in columns:
+            attributes.setdefault(name, getattr(model, name))
+    return load_only(*attributes.values())
+
+
+@lru_cache(maxsize=256)
+def _subset_adapter(schema: Type[BaseModel], names: tuple) -> TypeAdapter:
+    subset = create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names}
+    )
+    return TypeAdapter(List[subset])
+
+
+def sparse_response(
+    schema: Type[BaseModel],
+    items: list,
+    fields: Sequence[str],
+    response: Response
+) -> Response:
+    """
+    JSON response with only the given fields of each item, validated and
+    serialized by a schema subset. Headers already set on response (cursor,
+    ETag) are kept.
+    """
+    adapter = _subset_adapter(schema, tuple(fields))
+    headers = dict(response.headers)
+    headers.pop("content-length", None)
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(items, from_attributes=True)),
+        media_type="application/json",
+        headers=headers
+    )
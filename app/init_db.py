@@ -3,9 +3,12 @@ from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine, Base
 from app.models import User, Movie, UserPreferences
 from app.auth import get_password_hash
+from app.services.bulk_ingest import ingest_movies
+from app.services.search_service import ensure_search_index
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+ensure_search_index(engine)
 
 # Sample movies data
 SAMPLE_MOVIES = [
@@ -135,12 +138,11 @@ def init_db():
         
         # Add sample movies
         print("Adding sample movies...")
-        for movie_data in SAMPLE_MOVIES:
-            movie = Movie(**movie_data)
-            db.add(movie)
-        
-        db.commit()
-        print(f"Successfully added {len(SAMPLE_MOVIES)} movies to the database.")
+        stats = ingest_movies(db, (
+            (line_no, movie_data, None)
+            for line_no, movie_data in enumerate(SAMPLE_MOVIES, start=1)
+        ))
+        print(f"Successfully added {stats['inserted']} movies to the database.")
         
     except Exception as e:
         print(f"Error initializing database: {e}")
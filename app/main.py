@@ -2,11 +2,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import engine, Base
-from app.routers import auth, users, movies, rooms, reviews, tmdb, zapier
+from app.database import engine, Base, SessionLocal, upgrade_schema
+from app.pagination import NEXT_CURSOR_HEADER
+from app.routers import auth, users, movies, rooms, reviews, tmdb, zapier, export
+from app.services.search_service import ensure_search_index
+from app.services.facet_index import facet_index
+from app.services.similarity_index import similarity_index
+from app.services.title_index import title_index
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+ensure_search_index(engine)
 
 # Create FastAPI app
 app = FastAPI(
@@ -22,6 +29,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified"],
 )
 
 # Include routers
@@ -32,6 +40,22 @@ app.include_router(rooms.router)
 app.include_router(reviews.router)
 app.include_router(tmdb.router)
 app.include_router(zapier.router)
+app.include_router(export.router)
+
+
+@app.on_event("startup")
+def load_indexes():
+    """
+    Build the autocomplete and facet indexes before serving requests, and
+    start building the similar-movies index in the background.
+    """
+    db = SessionLocal()
+    try:
+        title_index.ensure_loaded(db)
+        facet_index.ensure_loaded(db)
+    finally:
+        db.close()
+    similarity_index.start_rebuild()
 
 
 @app.get("/")
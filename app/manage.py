@@ -0,0 +1,292 @@
+"""
+Command-line maintenance tasks.
+
+Usage:
+    python -m app.manage <command> [options]
+"""
+import argparse
+import gzip
+import sys
+import time
+
+from app.database import SessionLocal, engine, Base, upgrade_schema
+from app.services.catalog_service import CatalogService
+from app.services.feed_service import FeedService, FEED_TRIM_SLACK
+from app.services.rating_service import RatingService
+from app.services.search_service import ensure_search_index
+from app.services.batch_recommendations import precompute_recommendations, DEFAULT_LIMIT
+from app.services.export import export_rows, EXPORT_COLUMNS, EXPORT_FORMATS
+from app.services.bulk_ingest import (
+    ingest_movies, ingest_reviews, iter_records, detect_format, SUPPORTED_FORMATS, DEFAULT_BATCH_SIZE
+)
+
+
+def backfill_terms(args):
+    """Populate genres/people join tables from the movie string columns."""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        processed = CatalogService.backfill_movie_terms(db, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"Backfilled genres and people for {processed} movies in {elapsed:.1f}s.")
+    finally:
+        db.close()
+
+
+def backfill_ratings(args):
+    """Fill the numeric rating columns from the string ratings."""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        processed = CatalogService.backfill_rating_values(db, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"Backfilled numeric ratings for {processed} movies in {elapsed:.1f}s.")
+    finally:
+        db.close()
+
+
+def reconcile_ratings(args):
+    """Recompute movie rating totals from reviews and repair any drift."""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        checked, repaired = RatingService.reconcile(db, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"Checked rating totals for {checked} movies in {elapsed:.1f}s; repaired {repaired}.")
+    finally:
+        db.close()
+
+
+def rebuild_rating_stats(args):
+    """Recompute the per-movie rating histograms from reviews."""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        rebuilt = RatingService.rebuild_stats(db, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"Rebuilt rating stats for {rebuilt} movies in {elapsed:.1f}s.")
+    finally:
+        db.close()
+
+
+def rebuild_feeds(args):
+    """Rebuild every user's "reviews from my rooms" feed from reviews."""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        written = FeedService.rebuild(db, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"Rebuilt feeds with {written} entries in {elapsed:.1f}s.")
+    finally:
+        db.close()
+
+
+def trim_feeds(args):
+    """Recount feed timelines and cut any past FEED_MAX_LENGTH (plus slack) back to it."""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        deleted = FeedService.trim(db, slack=args.slack, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"Trimmed {deleted} feed entries in {elapsed:.1f}s.")
+    finally:
+        db.close()
+
+
+def backfill_title_keys(args):
+    """Fill the normalized title keys used to detect duplicate movies."""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        processed, duplicates = CatalogService.backfill_title_keys(db, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"Backfilled title keys for {processed} movies in {elapsed:.1f}s.")
+        if duplicates:
+            print(
+                f"{len(duplicates)} movies duplicate an earlier title and year and were left "
+                f"without a key: {', '.join(map(str, duplicates[:20]))}"
+                + (" ..." if len(duplicates) > 20 else "")
+            )
+    finally:
+        db.close()
+
+
+def ingest_movies_file(args):
+    """Import movies from an NDJSON or CSV file, skipping existing titles."""
+    fmt = args.format or detect_format(name=args.path)
+    if fmt is None:
+        raise SystemExit(f"Cannot tell the format of {args.path}; pass --format ndjson|csv")
+
+    def progress(stats):
+        print(
+            f"  {stats['processed']:,} rows read, {stats['inserted']:,} inserted, "
+            f"{stats['duplicates']:,} duplicates, {stats['near_duplicates']:,} similar titles, "
+            f"{stats['invalid']:,} invalid "
+            f"({stats['rows_per_second']:,.0f} rows/sec)"
+        )
+
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            stats = ingest_movies(
+                db, iter_records(stream, fmt),
+                batch_size=args.batch_size, progress=progress, fuzzy=args.check_similar
+            )
+        for error in stats["errors"]:
+            print(f"  line {error['line']}: {error['error']}")
+        for near in stats["near_duplicate_lines"]:
+            target = f"line {near['similar_to_line']}" if "similar_to_line" in near else f"movie {near['similar_to']}"
+            print(f"  line {near['line']}: similar to {target} ({near['similarity']:.2f}), check it")
+        print(
+            f"Ingested {stats['inserted']:,} of {stats['processed']:,} movies in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_second']:,.0f} rows/sec)."
+        )
+    finally:
+        db.close()
+
+
+def ingest_reviews_file(args):
+    """Import reviews from an NDJSON or CSV file, updating existing ones."""
+    fmt = args.format or detect_format(name=args.path)
+    if fmt is None:
+        raise SystemExit(f"Cannot tell the format of {args.path}; pass --format ndjson|csv")
+
+    def progress(stats):
+        print(
+            f"  {stats['processed']:,} rows read, {stats['created']:,} created, "
+            f"{stats['updated']:,} updated, {stats['unchanged']:,} unchanged, "
+            f"{stats['superseded']:,} superseded, "
+            f"{stats['invalid']:,} invalid "
+            f"({stats['rows_per_second']:,.0f} rows/sec)"
+        )
+
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            stats = ingest_reviews(
+                db, iter_records(stream, fmt),
+                batch_size=args.batch_size, progress=progress, user_id=args.user_id
+            )
+        for error in stats["errors"]:
+            print(f"  line {error['line']}: {error['error']}")
+        print(
+            f"Ingested {stats['created'] + stats['updated']:,} of {stats['processed']:,} reviews "
+            f"for {len(stats['movie_ids']):,} movies in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_second']:,.0f} rows/sec)."
+        )
+    finally:
+        db.close()
+
+
+def export(args):
+    """Stream a table to an NDJSON or CSV file (gzipped for .gz paths)."""
+    compress = args.gzip or args.output.endswith(".gz")
+    started = time.perf_counter()
+    written = 0
+    if args.output == "-":
+        stream = sys.stdout.buffer
+    elif compress:
+        stream = gzip.open(args.output, "wb")
+    else:
+        stream = open(args.output, "wb")
+    try:
+        for chunk in export_rows(engine, args.entity, args.format, batch_size=args.batch_size):
+            stream.write(chunk)
+            written += len(chunk)
+    finally:
+        if stream is not sys.stdout.buffer:
+            stream.close()
+    if args.output != "-":
+        elapsed = time.perf_counter() - started
+        print(f"Exported {args.entity} ({written / 1e6:,.1f} MB uncompressed) to {args.output} in {elapsed:.1f}s.")
+
+
+def precompute(args):
+    """Score every user and store results in precomputed_recommendations."""
+    db = SessionLocal()
+    try:
+        stats = precompute_recommendations(
+            db,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            limit=args.limit
+        )
+        print(
+            f"Precomputed recommendations for {stats['users']} users with "
+            f"{stats['workers']} workers in {stats['scoring_seconds']:.1f}s "
+            f"({stats['users_per_second']:,.0f} users/sec)."
+        )
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-terms", help=backfill_terms.__doc__)
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.set_defaults(func=backfill_terms)
+
+    ratings = commands.add_parser("backfill-ratings", help=backfill_ratings.__doc__)
+    ratings.add_argument("--batch-size", type=int, default=5000)
+    ratings.set_defaults(func=backfill_ratings)
+
+    reconcile = commands.add_parser("reconcile-ratings", help=reconcile_ratings.__doc__)
+    reconcile.add_argument("--batch-size", type=int, default=5000)
+    reconcile.set_defaults(func=reconcile_ratings)
+
+    stats = commands.add_parser("rebuild-rating-stats", help=rebuild_rating_stats.__doc__)
+    stats.add_argument("--batch-size", type=int, default=5000, help="Movie IDs per transaction")
+    stats.set_defaults(func=rebuild_rating_stats)
+
+    feeds = commands.add_parser("rebuild-feeds", help=rebuild_feeds.__doc__)
+    feeds.add_argument("--batch-size", type=int, default=5000, help="Reviews fanned out per transaction")
+    feeds.set_defaults(func=rebuild_feeds)
+
+    trim = commands.add_parser("trim-feeds", help=trim_feeds.__doc__)
+    trim.add_argument("--slack", type=int, default=FEED_TRIM_SLACK, help="Entries past the cap a timeline may hold before it is trimmed")
+    trim.add_argument("--batch-size", type=int, default=1000, help="Timelines trimmed per transaction")
+    trim.set_defaults(func=trim_feeds)
+
+    title_keys = commands.add_parser("backfill-title-keys", help=backfill_title_keys.__doc__)
+    title_keys.add_argument("--batch-size", type=int, default=5000)
+    title_keys.set_defaults(func=backfill_title_keys)
+
+    ingest = commands.add_parser("ingest-movies", help=ingest_movies_file.__doc__)
+    ingest.add_argument("path", help="NDJSON (.ndjson/.jsonl) or CSV file")
+    ingest.add_argument("--format", choices=SUPPORTED_FORMATS, default=None, help="Input format (default: from the file extension)")
+    ingest.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per INSERT")
+    ingest.add_argument("--check-similar", action="store_true", help="Also report near-identical same-year titles (one lookup per row, slower)")
+    ingest.set_defaults(func=ingest_movies_file)
+
+    reviews = commands.add_parser("ingest-reviews", help=ingest_reviews_file.__doc__)
+    reviews.add_argument("path", help="NDJSON (.ndjson/.jsonl) or CSV file")
+    reviews.add_argument("--format", choices=SUPPORTED_FORMATS, default=None, help="Input format (default: from the file extension)")
+    reviews.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per INSERT")
+    reviews.add_argument("--user-id", type=int, default=None, help="Import every review as this user (default: each row's user_id)")
+    reviews.set_defaults(func=ingest_reviews_file)
+
+    dump = commands.add_parser("export", help=export.__doc__)
+    dump.add_argument("entity", choices=list(EXPORT_COLUMNS))
+    dump.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    dump.add_argument("--output", "-o", default="-", help="Output file, or - for stdout")
+    dump.add_argument("--gzip", action="store_true", help="Gzip the output (implied by a .gz path)")
+    dump.add_argument("--batch-size", type=int, default=1000, help="Rows fetched per round trip")
+    dump.set_defaults(func=export)
+
+    batch = commands.add_parser("precompute-recommendations", help=precompute.__doc__)
+    batch.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    batch.add_argument("--chunk-size", type=int, default=1000, help="Users per worker task")
+    batch.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Recommendations stored per user")
+    batch.set_defaults(func=precompute)
+
+    args = parser.parse_args(argv)
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    ensure_search_index(engine)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,30 @@
 """SQLAlchemy database models."""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Table, UniqueConstraint
-from sqlalchemy.orm import relationship
+import re
+import unicodedata
+from typing import Optional
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Boolean, Text, Table, UniqueConstraint, Index, desc, text
+from sqlalchemy.orm import relationship, synonym, validates
 from sqlalchemy.sql import func
-from app.database import Base
+from app.database import Base, STRICT_LOADING
+
+# Loader for every relationship below; routes eager-load what they serialize
+LAZY = "raise_on_sql" if STRICT_LOADING else "select"
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Lowercase, accent- and punctuation-free form of a title."""
+    decomposed = unicodedata.normalize("NFKD", title or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", stripped.casefold()).split())
+
+
+def parse_rating_value(value: Optional[str]) -> Optional[float]:
+    """Parse a string rating such as "8.5" into a float, or None."""
+    try:
+        return float(value) if value is not None else None
+    except (ValueError, TypeError):
+        return None
+
 
 # Association table for many-to-many relationship between users and rooms
 room_members = Table(
@@ -14,6 +36,26 @@ room_members = Table(
     Column('is_admin', Boolean, default=False)
 )
 
+# Association table for many-to-many relationship between movies and genres
+movie_genres = Table(
+    'movie_genres',
+    Base.metadata,
+    Column('movie_id', Integer, ForeignKey('movies.id'), primary_key=True),
+    Column('genre_id', Integer, ForeignKey('genres.id'), primary_key=True),
+    Index('ix_movie_genres_genre_movie', 'genre_id', 'movie_id')
+)
+
+# Association table linking movies to people, with their role on the movie
+movie_people = Table(
+    'movie_people',
+    Base.metadata,
+    Column('movie_id', Integer, ForeignKey('movies.id'), primary_key=True),
+    Column('person_id', Integer, ForeignKey('people.id'), primary_key=True),
+    Column('role', String(20), primary_key=True),  # director, cast
+    Column('position', Integer, default=0),  # Billing order within the role
+    Index('ix_movie_people_person_role_movie', 'person_id', 'role', 'movie_id')
+)
+
 
 class User(Base):
     """User model."""
@@ -30,13 +72,13 @@ class User(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    preferences = relationship("UserPreferences", back_populates="user", uselist=False)
-    rooms_created = relationship("Room", back_populates="creator", foreign_keys="Room.creator_id")
-    room_memberships = relationship("Room", secondary=room_members, back_populates="members")
-    invitations_sent = relationship("Invitation", back_populates="inviter", foreign_keys="Invitation.inviter_id")
-    invitations_received = relationship("Invitation", back_populates="invitee", foreign_keys="Invitation.invitee_id")
-    reviews = relationship("Review", back_populates="user", cascade="all, delete-orphan")
-    webhook_subscriptions = relationship("WebhookSubscription", back_populates="user", cascade="all, delete-orphan")
+    preferences = relationship("UserPreferences", back_populates="user", uselist=False, lazy=LAZY)
+    rooms_created = relationship("Room", back_populates="creator", foreign_keys="Room.creator_id", lazy=LAZY)
+    room_memberships = relationship("Room", secondary=room_members, back_populates="members", lazy=LAZY)
+    invitations_sent = relationship("Invitation", back_populates="inviter", foreign_keys="Invitation.inviter_id", lazy=LAZY)
+    invitations_received = relationship("Invitation", back_populates="invitee", foreign_keys="Invitation.invitee_id", lazy=LAZY)
+    reviews = relationship("Review", back_populates="user", cascade="all, delete-orphan", lazy=LAZY)
+    webhook_subscriptions = relationship("WebhookSubscription", back_populates="user", cascade="all, delete-orphan", lazy=LAZY)
 
 
 class UserPreferences(Base):
@@ -56,7 +98,7 @@ class UserPreferences(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    user = relationship("User", back_populates="preferences")
+    user = relationship("User", back_populates="preferences", lazy=LAZY)
 
 
 class Movie(Base):
@@ -74,13 +116,80 @@ class Movie(Base):
     imdb_rating = Column(String(10), nullable=True)  # e.g., "8.5"
     poster_url = Column(String(500), nullable=True)
     trailer_url = Column(String(500), nullable=True)
-    tmdb_id = Column(Integer, nullable=True, index=True)  # The Movie Database ID
+    tmdb_id = Column(Integer, nullable=True)  # The Movie Database ID (unique, see below)
+    title_key = Column(String(200), nullable=True)  # normalize_title(title), for dedupe
     average_rating = Column(String(10), nullable=True)  # Average user rating (calculated)
+    # Running totals over this movie's reviews; average_rating = rating_sum / rating_count.
+    # "backfill" fills the column when upgrade_schema adds it to an existing table
+    rating_sum = Column(
+        Integer, nullable=False, default=0, server_default="0",
+        info={"backfill": "SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.movie_id = movies.id"}
+    )
+    rating_count = Column(
+        Integer, nullable=False, default=0, server_default="0",
+        info={"backfill": "SELECT COUNT(*) FROM reviews WHERE reviews.movie_id = movies.id"}
+    )
+    # Numeric copies of the string ratings above, kept in sync for range scans/sorting
+    imdb_rating_value = Column(Float, nullable=True, index=True)
+    average_rating_value = Column(Float, nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by every UPDATE; used for ETags (updated_at only has second precision)
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))
+
+    __table_args__ = (
+        # Year/decade ranges combined with a minimum rating
+        Index('ix_movies_year_imdb_rating_value', 'year', 'imdb_rating_value'),
+        # Keyset pagination: list_movies (year desc, title, id), Zapier newest first
+        Index('ix_movies_year_desc_title_id', desc('year'), 'title', 'id'),
+        Index('ix_movies_created_at_id', 'created_at', 'id'),
+        # Dedupe keys: one movie per TMDB ID and per normalized title and year
+        Index('ux_movies_tmdb_id', 'tmdb_id', unique=True),
+        Index('ux_movies_title_key_year', 'title_key', func.coalesce(text('year'), 0), unique=True),
+    )
 
     # Relationships
-    rooms = relationship("Room", back_populates="movie")
-    reviews = relationship("Review", back_populates="movie", cascade="all, delete-orphan")
+    rooms = relationship("Room", back_populates="movie", lazy=LAZY)
+    reviews = relationship("Review", back_populates="movie", cascade="all, delete-orphan", lazy=LAZY)
+    genres = relationship("Genre", secondary=movie_genres, back_populates="movies", lazy=LAZY)
+    people = relationship("Person", secondary=movie_people, back_populates="movies", viewonly=True, lazy=LAZY)
+
+    @validates("title")
+    def _sync_title_key(self, key, value):
+        self.title_key = normalize_title(value)
+        return value
+
+    @validates("imdb_rating")
+    def _sync_imdb_rating_value(self, key, value):
+        self.imdb_rating_value = parse_rating_value(value)
+        return value
+
+    @validates("average_rating")
+    def _sync_average_rating_value(self, key, value):
+        self.average_rating_value = parse_rating_value(value)
+        return value
+
+
+class Genre(Base):
+    """Genre model (normalized from Movie.genre)."""
+    __tablename__ = "genres"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    name_key = Column(String(100), unique=True, index=True, nullable=False)  # Normalized, lowercased name
+
+    movies = relationship("Movie", secondary=movie_genres, back_populates="genres", lazy=LAZY)
+
+
+class Person(Base):
+    """Person model for directors and cast (normalized from Movie.director/cast)."""
+    __tablename__ = "people"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(200), nullable=False)
+    name_key = Column(String(200), unique=True, index=True, nullable=False)  # Normalized, lowercased name
+
+    movies = relationship("Movie", secondary=movie_people, back_populates="people", viewonly=True, lazy=LAZY)
 
 
 class Room(Base):
@@ -96,12 +205,19 @@ class Room(Base):
     max_members = Column(Integer, default=50)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))
+
+    __table_args__ = (
+        # Keyset pagination, newest first (created_at, id)
+        Index('ix_rooms_created_at_id', 'created_at', 'id'),
+        Index('ix_rooms_movie_created_at_id', 'movie_id', 'created_at', 'id'),
+    )
 
     # Relationships
-    movie = relationship("Movie", back_populates="rooms")
-    creator = relationship("User", back_populates="rooms_created", foreign_keys=[creator_id])
-    members = relationship("User", secondary=room_members, back_populates="room_memberships")
-    invitations = relationship("Invitation", back_populates="room", cascade="all, delete-orphan")
+    movie = relationship("Movie", back_populates="rooms", lazy=LAZY)
+    creator = relationship("User", back_populates="rooms_created", foreign_keys=[creator_id], lazy=LAZY)
+    members = relationship("User", secondary=room_members, back_populates="room_memberships", lazy=LAZY)
+    invitations = relationship("Invitation", back_populates="room", cascade="all, delete-orphan", lazy=LAZY)
 
 
 class Invitation(Base):
@@ -118,9 +234,9 @@ class Invitation(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    room = relationship("Room", back_populates="invitations")
-    inviter = relationship("User", back_populates="invitations_sent", foreign_keys=[inviter_id])
-    invitee = relationship("User", back_populates="invitations_received", foreign_keys=[invitee_id])
+    room = relationship("Room", back_populates="invitations", lazy=LAZY)
+    inviter = relationship("User", back_populates="invitations_sent", foreign_keys=[inviter_id], lazy=LAZY)
+    invitee = relationship("User", back_populates="invitations_received", foreign_keys=[invitee_id], lazy=LAZY)
 
 
 class Review(Base):
@@ -134,24 +250,80 @@ class Review(Base):
     review_text = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))
 
     # Relationships
-    movie = relationship("Movie", back_populates="reviews")
-    user = relationship("User", back_populates="reviews")
+    movie = relationship("Movie", back_populates="reviews", lazy=LAZY)
+    user = relationship("User", back_populates="reviews", lazy=LAZY)
 
     # Unique constraint: one review per user per movie
     __table_args__ = (
         UniqueConstraint('movie_id', 'user_id', name='unique_user_movie_review'),
+        # Keyset pagination, newest first (created_at, id)
+        Index('ix_reviews_movie_created_at_id', 'movie_id', 'created_at', 'id'),
+        Index('ix_reviews_user_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_reviews_created_at_id', 'created_at', 'id'),
+    )
+
+
+class MovieRatingStats(Base):
+    """Per-movie review statistics, maintained by the review write paths."""
+    __tablename__ = "movie_rating_stats"
+
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    # Number of reviews rating the movie 1, 2, ... 10
+    rating_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_6 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_7 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_8 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_9 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_10 = Column(Integer, nullable=False, default=0, server_default="0")
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    last_reviewed_at = Column(DateTime(timezone=True), nullable=True)  # Latest review created or edited
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))
+
+    # ETags identify rows by id
+    id = synonym("movie_id")
+
+
+class FeedEntry(Base):
+    """A roommate's review in a user's feed timeline, written when the review is."""
+    __tablename__ = "feed_entries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)  # Feed owner
+    review_id = Column(Integer, ForeignKey("reviews.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)  # The review's, for ordering
+
+    review = relationship("Review", lazy=LAZY)
+
+    __table_args__ = (
+        # A page of a timeline is one range scan, newest first (created_at, review_id)
+        Index('ix_feed_entries_user_created_at_review', 'user_id', 'created_at', 'review_id'),
+        Index('ix_feed_entries_review_id', 'review_id'),
     )
 
 
+class FeedTimeline(Base):
+    """Entry count of a user's feed timeline, so a fan-out only trims timelines past their cap."""
+    __tablename__ = "feed_timelines"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    length = Column(Integer, nullable=False, default=0, server_default="0")
+
+
 class WebhookSubscription(Base):
     """Webhook subscription model for Zapier triggers."""
     __tablename__ = "webhook_subscriptions"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    event_type = Column(String(50), nullable=False)  # new_room, new_review, new_movie, etc.
+    event_type = Column(String(50), nullable=False)  # new_room, new_review, reviews_imported, etc.
     webhook_url = Column(String(500), nullable=False)
     is_active = Column(Boolean, default=True)
     secret = Column(String(255), nullable=True)  # Optional webhook secret for verification
@@ -159,4 +331,16 @@ class WebhookSubscription(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    user = relationship("User", back_populates="webhook_subscriptions")
+    user = relationship("User", back_populates="webhook_subscriptions", lazy=LAZY)
+
+
+class PrecomputedRecommendation(Base):
+    """Recommendations written by the offline batch job, served as-is."""
+    __tablename__ = "precomputed_recommendations"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    rank = Column(Integer, primary_key=True)  # 0 = best
+    movie_id = Column(Integer, ForeignKey("movies.id"), nullable=False)
+    reason = Column(String(500), nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())  # When the batch run started
+    catalog_version = Column(Integer, nullable=True)  # Highest movie ID the batch run scored
@@ -0,0 +1,132 @@
+"""Keyset (cursor) pagination for list endpoints."""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DateTime, Integer, String, and_, or_, type_coerce
+from sqlalchemy.orm import Query
+
+from app.models import Movie, Room, Review
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Sort keys as (column, descending). The last column must be unique.
+KeysetOrder = Sequence[Tuple[Any, bool]]
+
+MOVIE_ORDER: KeysetOrder = ((Movie.year, True), (Movie.title, False), (Movie.id, False))
+MOVIE_NEWEST_ORDER: KeysetOrder = ((Movie.created_at, True), (Movie.id, True))
+ROOM_NEWEST_ORDER: KeysetOrder = ((Room.created_at, True), (Room.id, True))
+REVIEW_NEWEST_ORDER: KeysetOrder = ((Review.created_at, True), (Review.id, True))
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode sort key values as an opaque URL-safe cursor."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: KeysetOrder) -> List[Any]:
+    """Decode a cursor produced by encode_cursor for the same sort order."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(order):
+            raise ValueError
+        decoded = []
+        for (column, _), value in zip(order, values):
+            column_type = column.expression.type
+            if value is None:
+                if not column.expression.nullable:
+                    raise ValueError
+            elif isinstance(column_type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column_type, Integer):
+                if not isinstance(value, int):
+                    raise ValueError
+            elif isinstance(column_type, String):
+                if not isinstance(value, str):
+                    raise ValueError
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _bind(query: Query, column, value):
+    """Comparison value for column; see the SQLite note below."""
+    if isinstance(value, datetime) and query.session.get_bind().dialect.name == "sqlite":
+        # server_default=func.now() stores "YYYY-MM-DD HH:MM:SS" text on
+        # SQLite, while bound datetimes render with microseconds, so compare
+        # against text in the stored format
+        fmt = "%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S"
+        return type_coerce(value.strftime(fmt), String)
+    return value
+
+
+def _after(query: Query, order: KeysetOrder, values: Sequence[Any]):
+    """
+    Rows strictly after values in the given order, written as a bound on
+    the leading column plus the expanded row comparison so the matching
+    composite index is searched rather than scanned.
+    """
+    terms = []
+    for i, (column, descending) in enumerate(order):
+        value = _bind(query, column, values[i])
+        equal = [order[j][0] == _bind(query, order[j][0], values[j]) for j in range(i)]
+        terms.append(and_(*equal, column < value if descending else column > value))
+    leading, descending = order[0]
+    first = _bind(query, leading, values[0])
+    return and_(leading <= first if descending else leading >= first, or_(*terms))
+
+
+def _ordered(query: Query, order: KeysetOrder) -> Query:
+    return query.order_by(*[
+        (column.desc() if descending else column.asc()).nulls_last()
+        if column.expression.nullable else
+        (column.desc() if descending else column.asc())
+        for column, descending in order
+    ])
+
+
+def keyset_paginate(
+    query: Query,
+    order: KeysetOrder,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    response: Optional[Response] = None
+) -> list:
+    """
+    Fetch one page of query in the given order. With a cursor, the page
+    starts right after the row the cursor was taken from and skip is
+    ignored; otherwise skip is applied as an OFFSET.
+    When the page is full, the next page's cursor is set on response.
+    Only the leading sort column may be NULL (NULLs sort last).
+    """
+    if cursor is None:
+        items = _ordered(query, order).offset(skip).limit(limit).all()
+    else:
+        values = decode_cursor(cursor, order)
+        leading = order[0][0]
+        if values[0] is None:
+            items = _ordered(query.filter(leading.is_(None)), order).filter(
+                _after(query, order[1:], values[1:])
+            ).limit(limit).all()
+        else:
+            items = _ordered(query, order).filter(_after(query, order, values)).limit(limit).all()
+            if len(items) < limit and leading.expression.nullable:
+                # Rows with a NULL leading key come after every non-NULL one
+                items += _ordered(query.filter(leading.is_(None)), order).limit(limit - len(items)).all()
+
+    if response is not None and len(items) == limit:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [getattr(last, column.key) for column, _ in order]
+        )
+    return items
@@ -0,0 +1,44 @@
+"""Bulk export routes for partners."""
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
+
+from app.database import engine
+from app.models import User
+from app.auth import get_current_user_or_api_key
+from app.services.export import (
+    export_rows, gzip_chunks, EXPORT_COLUMNS, EXPORT_FORMATS, MEDIA_TYPES, DEFAULT_BATCH_SIZE
+)
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+
+@router.get("/{entity}")
+def export_entity(
+    entity: str,
+    request: Request,
+    format: str = Query("ndjson", description="ndjson or csv"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=100, le=10000),
+    current_user: User = Depends(get_current_user_or_api_key)
+):
+    """
+    Stream every movie, review or (public) room as NDJSON or CSV.
+    The body is gzipped on the fly when the client accepts gzip.
+    """
+    if entity not in EXPORT_COLUMNS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export: {entity}"
+        )
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    body = export_rows(engine, entity, format, batch_size)
+    headers = {"Content-Disposition": f'attachment; filename="{entity}.{format}"'}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
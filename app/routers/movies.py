@@ -1,95 +1,315 @@
 """Movie routes."""
+import io
+import tempfile
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import or_
+from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Movie
-from app.schemas import MovieResponse, MovieCreate, RecommendationResponse
+from app.models import Movie, normalize_title
+from app.schemas import (
+    MovieResponse, MovieCreate, MovieSuggestion, MovieFacetsResponse, RecommendationResponse
+)
 from app.auth import get_current_user
-from app.services.recommendation import RecommendationService
+from app.conditional import conditional_response
+from app.fields import FIELDS_DESCRIPTION, MOVIE_KEY_COLUMNS, parse_fields, load_columns, sparse_response
+from app.pagination import keyset_paginate, MOVIE_ORDER
+from app.services.recommendation import (
+    RecommendationService, RECOMMENDATION_STRATEGIES, recommendation_cache
+)
+from app.services import events
+from app.services.bulk_ingest import (
+    ingest_movies, iter_records, detect_format, SUPPORTED_FORMATS, DEFAULT_BATCH_SIZE, BULK_SPOOL_BYTES
+)
+from app.services.catalog_service import CatalogService, ROLE_DIRECTOR, ROLE_CAST
+from app.services.facet_index import facet_index
+from app.services.recommendation_engine import parse_decades
+from app.services.search_service import SearchService
+from app.services.movie_cache import movie_cache
+from app.services.seen_movies import seen_movies
+from app.services.title_index import title_index, MAX_SUGGESTIONS
 
 router = APIRouter(prefix="/api/movies", tags=["movies"])
 
 
 @router.get("", response_model=list[MovieResponse])
 def list_movies(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     search: Optional[str] = Query(None),
     genre: Optional[str] = Query(None),
+    director: Optional[str] = Query(None),
+    actor: Optional[str] = Query(None),
     year: Optional[int] = Query(None),
+    decade: Optional[str] = Query(None, description='e.g. "1990s"'),
+    min_rating: Optional[float] = Query(None, ge=0, le=10),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
-    """List movies with optional filtering."""
+    """
+    List movies with optional filtering.
+    With search, results are ordered by relevance and paged by offset only;
+    otherwise pass the X-Next-Cursor response header back as cursor.
+    With fields, only those columns are loaded and returned.
+    """
+    if search and cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor cannot be combined with search"
+        )
+    fields = parse_fields(fields, MovieResponse)
+
     query = db.query(Movie)
+    if fields:
+        query = query.options(load_columns(Movie, fields, MOVIE_KEY_COLUMNS))
     
     if search:
-        query = query.filter(
-            or_(
-                Movie.title.ilike(f"%{search}%"),
-                Movie.plot.ilike(f"%{search}%"),
-                Movie.director.ilike(f"%{search}%")
-            )
-        )
+        query = SearchService.search_movies(query, search)
     
     if genre:
-        query = query.filter(Movie.genre.ilike(f"%{genre}%"))
+        query = CatalogService.filter_by_genre(query, genre)
+    
+    if director:
+        query = CatalogService.filter_by_person(query, director, ROLE_DIRECTOR)
+    
+    if actor:
+        query = CatalogService.filter_by_person(query, actor, ROLE_CAST)
     
     if year:
         query = query.filter(Movie.year == year)
     
-    movies = query.order_by(Movie.year.desc(), Movie.title).offset(skip).limit(limit).all()
+    if decade:
+        decade_ranges = parse_decades(decade)
+        if not decade_ranges:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid decade. Use a value like 1990s."
+            )
+        query = query.filter(or_(*[
+            Movie.year.between(first_year, last_year) for first_year, last_year in decade_ranges
+        ]))
+    
+    if min_rating is not None:
+        query = query.filter(Movie.imdb_rating_value >= min_rating)
+    
+    if search:
+        movies = query.order_by(Movie.year.desc(), Movie.title).offset(skip).limit(limit).all()
+    else:
+        movies = keyset_paginate(query, MOVIE_ORDER, limit, skip, cursor, response)
+    
+    not_modified = conditional_response(request, response, movies, extra=fields or ())
+    if not_modified:
+        return not_modified
+    if fields:
+        return sparse_response(MovieResponse, movies, fields, response)
     return movies
 
 
+@router.get("/autocomplete", response_model=list[MovieSuggestion])
+def autocomplete_movies(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    db: Session = Depends(get_db)
+):
+    """
+    Suggest movies whose title (or a later word in it) starts with q,
+    best rated first. Served from the in-memory title index.
+    """
+    title_index.ensure_loaded(db)
+    return [
+        MovieSuggestion(id=movie_id, title=title, year=year)
+        for movie_id, title, year in title_index.complete(q, limit)
+    ]
+
+
+@router.get("/facets", response_model=MovieFacetsResponse)
+def get_movie_facets(
+    search: Optional[str] = Query(None),
+    genre: Optional[str] = Query(None),
+    director: Optional[str] = Query(None),
+    actor: Optional[str] = Query(None),
+    year: Optional[int] = Query(None),
+    decade: Optional[str] = Query(None, description='e.g. "1990s"'),
+    min_rating: Optional[float] = Query(None, ge=0, le=10),
+    db: Session = Depends(get_db)
+):
+    """
+    Movie counts per genre, decade and year for the list_movies filters,
+    restricted to the movies matching the filters given. Served from the
+    in-memory facet index; text/person/rating filters are resolved once
+    and cached as bitsets.
+    """
+    facet_index.ensure_loaded(db)
+    masks = []
+    
+    if search:
+        masks.append(facet_index.query_bits(
+            ("search", search.strip().casefold()),
+            SearchService.search_movies(db.query(Movie.id), search)
+        ))
+    
+    if genre:
+        masks.append(facet_index.genre_bits(genre))
+    
+    if director:
+        masks.append(facet_index.query_bits(
+            ("director", director.strip().casefold()),
+            CatalogService.filter_by_person(db.query(Movie.id), director, ROLE_DIRECTOR)
+        ))
+    
+    if actor:
+        masks.append(facet_index.query_bits(
+            ("actor", actor.strip().casefold()),
+            CatalogService.filter_by_person(db.query(Movie.id), actor, ROLE_CAST)
+        ))
+    
+    if year:
+        masks.append(facet_index.year_bits(year, year))
+    
+    if decade:
+        decade_ranges = parse_decades(decade)
+        if not decade_ranges:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid decade. Use a value like 1990s."
+            )
+        bits = 0
+        for first_year, last_year in decade_ranges:
+            bits |= facet_index.year_bits(first_year, last_year)
+        masks.append(bits)
+    
+    if min_rating is not None:
+        masks.append(facet_index.query_bits(
+            ("min_rating", min_rating),
+            db.query(Movie.id).filter(Movie.imdb_rating_value >= min_rating)
+        ))
+    
+    restrict = None
+    for mask in masks:
+        restrict = mask if restrict is None else restrict & mask
+    return facet_index.counts(restrict)
+
+
+@router.post("/bulk", response_model=dict)
+async def bulk_create_movies(
+    request: Request,
+    format: Optional[str] = Query(None, description="ndjson or csv (default: from Content-Type)"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    check_similar: bool = Query(False, description="Also report movies with a similar title that year (slower)"),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import movies from an NDJSON or CSV request body (one movie per line,
+    MovieCreate fields). Existing titles (same normalized title and year,
+    or TMDB ID) are skipped; with check_similar, inserted movies with a
+    near-identical same-year title are listed in near_duplicate_lines.
+    Returns counts, the first errors and rows/sec.
+    """
+    fmt = format or detect_format(content_type=request.headers.get("content-type"))
+    if fmt not in SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(SUPPORTED_FORMATS)}"
+        )
+
+    with tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_BYTES) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        text = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+        try:
+            return await run_in_threadpool(
+                ingest_movies, db, iter_records(text, fmt), batch_size, fuzzy=check_similar
+            )
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Request body must be UTF-8"
+            )
+        finally:
+            text.detach()
+
+
 @router.get("/{movie_id}", response_model=MovieResponse)
-def get_movie(movie_id: int, db: Session = Depends(get_db)):
-    """Get movie by ID."""
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
+def get_movie(
+    movie_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """Get movie by ID. Supports If-None-Match / If-Modified-Since."""
+    movie = movie_cache.get(db, movie_id)
     if not movie:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Movie not found"
         )
-    return movie
+    
+    not_modified = conditional_response(request, response, [movie], single=True)
+    if not_modified:
+        return not_modified
+    return movie.data
 
 
 @router.post("", response_model=MovieResponse, status_code=status.HTTP_201_CREATED)
 def create_movie(
     movie_data: MovieCreate,
+    allow_similar: bool = Query(False, description="Create even if a similar title exists that year"),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new movie entry."""
-    # Check if movie already exists
-    existing = db.query(Movie).filter(
-        Movie.title.ilike(movie_data.title)
-    ).first()
+    # Check if movie already exists (same normalized title and year or TMDB ID,
+    # or a near-identical title that year)
+    existing = CatalogService.find_duplicate(
+        db, movie_data.title, movie_data.year, movie_data.tmdb_id, fuzzy=not allow_similar
+    )
     
     if existing:
+        same_tmdb = movie_data.tmdb_id is not None and existing.tmdb_id == movie_data.tmdb_id
+        if existing.title_key == normalize_title(movie_data.title) or same_tmdb:
+            detail = "Movie already exists"
+        else:
+            detail = (
+                f"A similar movie already exists: {existing.title} ({existing.year}), "
+                f"ID {existing.id}. Pass allow_similar=true to create it anyway."
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Movie already exists"
+            detail=detail
         )
     
     movie = Movie(**movie_data.model_dump())
     db.add(movie)
+    db.flush()
+    CatalogService.sync_movie_terms(db, [movie])
     db.commit()
     db.refresh(movie)
+
+    events.emit(events.MOVIE_CREATED, db=db, movie=movie)
     return movie
 
 
 @router.get("/recommendations/me", response_model=list[RecommendationResponse])
 def get_my_recommendations(
     limit: int = Query(10, ge=1, le=50),
+    strategy: str = Query("content", pattern=f"^({'|'.join(RECOMMENDATION_STRATEGIES)})$"),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get personalized movie recommendations for current user."""
+    """
+    Get personalized movie recommendations for current user.
+    strategy: "content" (preference matching) or "collaborative" (item-item
+    similarity over review ratings).
+    """
     recommendations = RecommendationService.get_recommendations(
-        db, current_user.id, limit
+        db, current_user.id, limit, strategy
     )
     
     return [
@@ -98,6 +318,16 @@ def get_my_recommendations(
     ]
 
 
+@router.get("/recommendations/cache", response_model=dict)
+def get_recommendation_cache_stats(current_user = Depends(get_current_user)):
+    """Get recommendation, seen-set and movie cache hit/miss counters."""
+    return {
+        **recommendation_cache.stats(),
+        "seen_movies": seen_movies.stats(),
+        "movies": movie_cache.stats(),
+    }
+
+
 @router.get("/{movie_id}/similar", response_model=list[MovieResponse])
 def get_similar_movies(
     movie_id: int,
@@ -106,6 +336,12 @@ def get_similar_movies(
 ):
     """Get movies similar to the given movie."""
     similar = RecommendationService.get_similar_movies(db, movie_id, limit)
+    if similar is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Similar movies are not available yet; the index is still being built",
+            headers={"Retry-After": "30"}
+        )
     return similar
 
 
@@ -1,28 +1,26 @@
 """Review/rating routes."""
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
 from app.models import Review, Movie, User
-from app.schemas import ReviewCreate, ReviewUpdate, ReviewResponse
+from app.schemas import ReviewCreate, ReviewUpdate, ReviewResponse, MovieRatingStatsResponse
 from app.auth import get_current_user
+from app.conditional import conditional_response, review_objects
+from app.fields import (
+    FIELDS_DESCRIPTION, REVIEW_KEY_COLUMNS, parse_fields, includes, load_columns, sparse_response
+)
+from app.pagination import keyset_paginate, NEXT_CURSOR_HEADER, REVIEW_NEWEST_ORDER
+from app.services import events
+from app.services.feed_service import FeedService
+from app.services.movie_cache import movie_cache, responses_with_movies, with_movies
+from app.services.rating_service import RatingService
 
 router = APIRouter(prefix="/api/reviews", tags=["reviews"])
 
-
-def update_movie_average_rating(db: Session, movie_id: int):
-    """Update movie's average rating based on all reviews."""
-    avg_result = db.query(func.avg(Review.rating)).filter(
-        Review.movie_id == movie_id
-    ).scalar()
-    
-    if avg_result:
-        movie = db.query(Movie).filter(Movie.id == movie_id).first()
-        if movie:
-            movie.average_rating = f"{avg_result:.2f}"
-            db.commit()
+# Seconds clients and shared caches may reuse movie review stats without revalidating
+STATS_MAX_AGE = 30
 
 
 @router.post("", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
@@ -60,45 +58,95 @@ def create_review(
         review_text=review_data.review_text
     )
     db.add(review)
+    # Movie rating totals change in the same transaction as the review
+    RatingService.apply_change(db, review_data.movie_id, None, review.rating)
     db.commit()
     db.refresh(review)
     
-    # Update movie's average rating
-    update_movie_average_rating(db, review_data.movie_id)
+    events.emit(
+        events.REVIEW_CHANGED, db=db, user_id=current_user.id, review_id=review.id,
+        movie_id=review.movie_id, old_rating=None, new_rating=review.rating
+    )
     
-    return review
+    return _review_response(db, review)
 
 
 @router.get("/movie/{movie_id}", response_model=list[ReviewResponse])
 def get_movie_reviews(
     movie_id: int,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """Get all reviews for a specific movie."""
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
-    if not movie:
+    fields = parse_fields(fields, ReviewResponse)
+    movies = movie_cache.get_many(db, [movie_id])
+    if movie_id not in movies:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Movie not found"
         )
     
-    reviews = db.query(Review).filter(
-        Review.movie_id == movie_id
-    ).order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
+    query = _review_query(db, fields).filter(Review.movie_id == movie_id)
+    reviews = keyset_paginate(query, REVIEW_NEWEST_ORDER, limit, skip, cursor, response)
+    
+    not_modified = conditional_response(
+        request, response,
+        [obj for review in reviews for obj in review_objects(review, movies.get(movie_id), fields)],
+        extra=fields or ()
+    )
+    if not_modified:
+        return not_modified
+    return _review_list_response(db, reviews, fields, response, movies)
+
+
+@router.get("/movie/{movie_id}/stats", response_model=MovieRatingStatsResponse)
+def get_movie_review_stats(
+    movie_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    Rating distribution (1-10), review count, average and latest review
+    activity for a movie, read from the movie_rating_stats read model.
+    Supports If-None-Match / If-Modified-Since.
+    """
+    stats = RatingService.get_stats(db, movie_id)
+    if stats is None and movie_id not in movie_cache.get_many(db, [movie_id]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Movie not found"
+        )
     
-    return reviews
+    response.headers["Cache-Control"] = f"public, max-age={STATS_MAX_AGE}"
+    not_modified = conditional_response(
+        request, response,
+        [stats] if stats else [],
+        extra=(movie_id, stats.review_count if stats else 0, stats.rating_sum if stats else 0),
+        single=True
+    )
+    if not_modified:
+        return not_modified
+    return RatingService.stats_response(movie_id, stats)
 
 
 @router.get("/user/{user_id}", response_model=list[ReviewResponse])
 def get_user_reviews(
     user_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """Get all reviews by a specific user."""
+    fields = parse_fields(fields, ReviewResponse)
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -106,38 +154,83 @@ def get_user_reviews(
             detail="User not found"
         )
     
-    reviews = db.query(Review).filter(
-        Review.user_id == user_id
-    ).order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return reviews
+    query = _review_query(db, fields).filter(Review.user_id == user_id)
+    reviews = keyset_paginate(query, REVIEW_NEWEST_ORDER, limit, skip, cursor, response)
+    return _review_list_response(db, reviews, fields, response)
 
 
 @router.get("/me", response_model=list[ReviewResponse])
 def get_my_reviews(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get current user's reviews."""
-    reviews = db.query(Review).filter(
-        Review.user_id == current_user.id
-    ).order_by(Review.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return reviews
+    fields = parse_fields(fields, ReviewResponse)
+    query = _review_query(db, fields).filter(Review.user_id == current_user.id)
+    reviews = keyset_paginate(query, REVIEW_NEWEST_ORDER, limit, skip, cursor, response)
+    return _review_list_response(db, reviews, fields, response)
+
+
+@router.get("/feed", response_model=list[ReviewResponse])
+def get_my_feed(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get reviews by people the current user shares rooms with, newest first."""
+    reviews, next_cursor = FeedService.get_feed(db, current_user.id, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return _review_list_response(db, reviews, None, response)
+
+
+def _review_query(db: Session, fields: Optional[list]):
+    """Review query loading only the columns a sparse fieldset needs, and the author when returned."""
+    query = db.query(Review)
+    if fields:
+        query = query.options(load_columns(Review, fields, REVIEW_KEY_COLUMNS))
+    if includes(fields, "user"):
+        query = query.options(joinedload(Review.user))
+    return query
+
+
+def _review_list_response(
+    db: Session,
+    reviews: list,
+    fields: Optional[list],
+    response: Response,
+    movies: Optional[dict] = None
+):
+    """Serialize reviews, loading nested movies only when returned."""
+    if movies is None:
+        movies = movie_cache.get_many(db, [review.movie_id for review in reviews]) if includes(fields, "movie") else {}
+    if fields:
+        return sparse_response(ReviewResponse, with_movies(reviews, movies), fields, response)
+    return responses_with_movies(ReviewResponse, reviews, movies)
+
+
+def _review_response(db: Session, review: Review) -> ReviewResponse:
+    """Serialize one review (its author loaded) with its cached movie."""
+    return responses_with_movies(ReviewResponse, [review], movie_cache.get_many(db, [review.movie_id]))[0]
 
 
 @router.get("/{review_id}", response_model=ReviewResponse)
 def get_review(review_id: int, db: Session = Depends(get_db)):
     """Get a specific review by ID."""
-    review = db.query(Review).filter(Review.id == review_id).first()
+    review = db.query(Review).options(joinedload(Review.user)).filter(Review.id == review_id).first()
     if not review:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Review not found"
         )
-    return review
+    return _review_response(db, review)
 
 
 @router.put("/{review_id}", response_model=ReviewResponse)
@@ -161,18 +254,22 @@ def update_review(
             detail="You can only update your own reviews"
         )
     
+    old_rating = review.rating
     if review_update.rating is not None:
         review.rating = review_update.rating
     if review_update.review_text is not None:
         review.review_text = review_update.review_text
     
+    RatingService.apply_change(db, review.movie_id, old_rating, review.rating)
     db.commit()
     db.refresh(review)
     
-    # Update movie's average rating
-    update_movie_average_rating(db, review.movie_id)
+    events.emit(
+        events.REVIEW_CHANGED, db=db, user_id=review.user_id, review_id=review.id,
+        movie_id=review.movie_id, old_rating=old_rating, new_rating=review.rating
+    )
     
-    return review
+    return _review_response(db, review)
 
 
 @router.delete("/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -196,11 +293,16 @@ def delete_review(
         )
     
     movie_id = review.movie_id
+    old_rating = review.rating
     db.delete(review)
+    RatingService.apply_change(db, movie_id, old_rating, None)
+    FeedService.remove_review(db, review_id)
     db.commit()
     
-    # Update movie's average rating
-    update_movie_average_rating(db, movie_id)
+    events.emit(
+        events.REVIEW_CHANGED, db=db, user_id=current_user.id, review_id=review_id,
+        movie_id=movie_id, old_rating=old_rating, new_rating=None
+    )
 
 
 
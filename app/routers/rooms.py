@@ -1,7 +1,7 @@
 """Room management routes."""
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.database import get_db
 from app.models import Room, Invitation, User
@@ -10,10 +10,23 @@ from app.schemas import (
     InvitationCreate, InvitationResponse
 )
 from app.auth import get_current_user
+from app.conditional import conditional_response, room_objects
+from app.fields import (
+    FIELDS_DESCRIPTION, ROOM_KEY_COLUMNS, parse_fields, includes, load_columns, sparse_response
+)
+from app.services.movie_cache import movie_cache, responses_with_movies, with_movies
 from app.services.room_service import RoomService
 
 router = APIRouter(prefix="/api/rooms", tags=["rooms"])
 
+# Relationships an InvitationResponse serializes, loaded with the invitation
+INVITATION_OPTIONS = (
+    joinedload(Invitation.inviter),
+    joinedload(Invitation.invitee),
+    joinedload(Invitation.room).joinedload(Room.creator),
+    joinedload(Invitation.room).joinedload(Room.movie),
+)
+
 
 @router.post("", response_model=RoomResponse, status_code=status.HTTP_201_CREATED)
 def create_room(
@@ -41,60 +54,92 @@ def create_room(
         max_members=room_data.max_members
     )
     
-    # Add member count for response
-    room.member_count = len(room.members)
-    return room
+    return _room_response(db, room)
 
 
 @router.get("", response_model=list[RoomResponse])
 def list_rooms(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     movie_id: Optional[int] = Query(None),
     search: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: Optional[User] = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """List available rooms."""
+    fields = parse_fields(fields, RoomResponse)
     user_id = current_user.id if current_user else None
     rooms = RoomService.get_available_rooms(
         db=db,
         user_id=user_id,
         movie_id=movie_id,
         search=search,
-        limit=limit
+        limit=limit,
+        options=_room_options(fields)
     )
     
-    # Add member count
-    for room in rooms:
-        room.member_count = len(room.members)
-    
-    return rooms[skip:skip+limit]
+    rooms = rooms[skip:skip+limit]
+    return _room_list_response(db, rooms, fields, response)
 
 
 @router.get("/my-rooms", response_model=list[RoomResponse])
 def get_my_rooms(
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all rooms the current user is a member of."""
-    rooms = RoomService.get_user_rooms(db, current_user.id)
-    
-    # Add member count
-    for room in rooms:
-        room.member_count = len(room.members)
+    fields = parse_fields(fields, RoomResponse)
+    rooms = RoomService.get_user_rooms(db, current_user.id, options=_room_options(fields))
+    return _room_list_response(db, rooms, fields, response)
+
+
+def _room_options(fields: Optional[list]) -> list:
+    """Room query options: the columns a sparse fieldset needs, and the creator when returned."""
+    options = [load_columns(Room, fields, ROOM_KEY_COLUMNS)] if fields else []
+    if includes(fields, "creator"):
+        options.append(joinedload(Room.creator))
+    return options
+
+
+def _room_list_response(db: Session, rooms: list, fields: Optional[list], response: Response):
+    """Serialize rooms, computing member counts and nested movies only when returned."""
+    if includes(fields, "member_count"):
+        RoomService.set_member_counts(db, rooms)
     
-    return rooms
+    movies = movie_cache.get_many(db, [room.movie_id for room in rooms]) if includes(fields, "movie") else {}
+    if fields:
+        return sparse_response(RoomResponse, with_movies(rooms, movies), fields, response)
+    return responses_with_movies(RoomResponse, rooms, movies)
+
+
+def _room_response(db: Session, room: Room) -> RoomResponse:
+    """Serialize one room (its creator loaded) with member count and cached movie."""
+    RoomService.set_member_counts(db, [room])
+    return responses_with_movies(RoomResponse, [room], movie_cache.get_many(db, [room.movie_id]))[0]
+
+
+def _invitation_responses(db: Session, invitations: list) -> list:
+    """Invitations loaded with INVITATION_OPTIONS, with their rooms' member counts filled."""
+    RoomService.set_member_counts(db, [invitation.room for invitation in invitations])
+    return invitations
 
 
 @router.get("/{room_id}", response_model=RoomDetailResponse)
 def get_room(
     room_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get room details."""
-    room = db.query(Room).filter(Room.id == room_id).first()
+    """Get room details. Supports If-None-Match."""
+    room = db.query(Room).options(
+        selectinload(Room.members), joinedload(Room.creator)
+    ).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -109,7 +154,13 @@ def get_room(
         )
     
     room.member_count = len(room.members)
-    return room
+    movies = movie_cache.get_many(db, [room.movie_id])
+    not_modified = conditional_response(
+        request, response, room_objects(room, movies.get(room.movie_id)) + list(room.members)
+    )
+    if not_modified:
+        return not_modified
+    return responses_with_movies(RoomDetailResponse, [room], movies)[0]
 
 
 @router.put("/{room_id}", response_model=RoomResponse)
@@ -120,7 +171,7 @@ def update_room(
     db: Session = Depends(get_db)
 ):
     """Update room (only creator can update)."""
-    room = db.query(Room).filter(Room.id == room_id).first()
+    room = db.query(Room).options(joinedload(Room.creator)).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -144,8 +195,7 @@ def update_room(
     
     db.commit()
     db.refresh(room)
-    room.member_count = len(room.members)
-    return room
+    return _room_response(db, room)
 
 
 @router.post("/{room_id}/join", response_model=RoomResponse)
@@ -163,9 +213,8 @@ def join_room(
             detail=message
         )
     
-    room = db.query(Room).filter(Room.id == room_id).first()
-    room.member_count = len(room.members)
-    return room
+    room = db.query(Room).options(joinedload(Room.creator)).filter(Room.id == room_id).first()
+    return _room_response(db, room)
 
 
 @router.post("/{room_id}/leave", status_code=status.HTTP_200_OK)
@@ -215,7 +264,8 @@ def invite_to_room(
             detail=message
         )
     
-    return invitation
+    invitation = db.query(Invitation).options(*INVITATION_OPTIONS).filter(Invitation.id == invitation.id).one()
+    return _invitation_responses(db, [invitation])[0]
 
 
 @router.get("/invitations/me", response_model=list[InvitationResponse])
@@ -224,11 +274,11 @@ def get_my_invitations(
     db: Session = Depends(get_db)
 ):
     """Get invitations received by current user."""
-    invitations = db.query(Invitation).filter(
+    invitations = db.query(Invitation).options(*INVITATION_OPTIONS).filter(
         Invitation.invitee_id == current_user.id,
         Invitation.status == "pending"
     ).all()
-    return invitations
+    return _invitation_responses(db, invitations)
 
 
 @router.post("/invitations/{invitation_id}/accept", response_model=RoomResponse)
@@ -265,9 +315,8 @@ def accept_invitation(
             detail=message
         )
     
-    room = db.query(Room).filter(Room.id == invitation.room_id).first()
-    room.member_count = len(room.members)
-    return room
+    room = db.query(Room).options(joinedload(Room.creator)).filter(Room.id == invitation.room_id).first()
+    return _room_response(db, room)
 
 
 @router.post("/invitations/{invitation_id}/decline", status_code=status.HTTP_200_OK)
@@ -8,6 +8,9 @@ from app.models import Movie
 from app.schemas import MovieResponse, MovieCreate
 from app.auth import get_current_user
 from app.services.tmdb_service import TMDBService
+from app.services import events
+from app.services.catalog_service import CatalogService
+from app.services.movie_cache import movie_cache
 
 router = APIRouter(prefix="/api/tmdb", tags=["tmdb"])
 
@@ -86,10 +89,15 @@ def get_tmdb_movie_details(tmdb_id: int, db: Session = Depends(get_db)):
 @router.post("/import/{tmdb_id}", response_model=MovieResponse, status_code=status.HTTP_201_CREATED)
 def import_movie_from_tmdb(
     tmdb_id: int,
+    allow_similar: bool = Query(False, description="Import even if a similar title exists that year"),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Import a movie from TMDB into our database."""
+    """
+    Import a movie from TMDB into our database. An existing movie with the
+    same title and year is linked to the TMDB ID instead; a similar title
+    is only reported (409).
+    """
     # Check if movie already exists
     existing_movie = db.query(Movie).filter(Movie.tmdb_id == tmdb_id).first()
     if existing_movie:
@@ -108,12 +116,44 @@ def import_movie_from_tmdb(
                 detail="Movie not found on TMDB"
             )
         
+        # The same title may already have been added by hand or bulk ingest
+        duplicate = CatalogService.find_duplicate(
+            db, formatted_data["title"], formatted_data.get("year"), fuzzy=False
+        )
+        if duplicate:
+            if duplicate.tmdb_id is None:
+                # Link it so TMDB search results point at the local copy
+                duplicate.tmdb_id = tmdb_id
+                db.commit()
+                movie_cache.invalidate(duplicate.id)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Movie already exists with ID: {duplicate.id}"
+            )
+        
+        # A similar title is only reported: it may be a different film
+        similar = None if allow_similar else CatalogService.find_duplicate(
+            db, formatted_data["title"], formatted_data.get("year")
+        )
+        if similar:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=(
+                    f"A similar movie already exists: {similar.title} ({similar.year}), "
+                    f"ID {similar.id}. Pass allow_similar=true to import it anyway."
+                )
+            )
+        
         # Create movie in our database
         movie = Movie(**formatted_data)
         db.add(movie)
+        db.flush()
+        CatalogService.sync_movie_terms(db, [movie])
         db.commit()
         db.refresh(movie)
         
+        events.emit(events.MOVIE_CREATED, db=db, movie=movie)
+        
         return movie
     except ValueError as e:
         raise HTTPException(
@@ -6,6 +6,7 @@ from app.database import get_db
 from app.models import User, UserPreferences
 from app.schemas import UserResponse, UserUpdate, UserPreferencesBase, UserPreferencesResponse
 from app.auth import get_current_user
+from app.services import events
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -87,6 +88,7 @@ def update_user_preferences(
     
     db.commit()
     db.refresh(preferences)
+    events.emit(events.PREFERENCES_UPDATED, db=db, user_id=current_user.id)
     return preferences
 
 
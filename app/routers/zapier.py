@@ -1,14 +1,31 @@
 """Zapier integration routes - webhooks and Zapier-friendly endpoints."""
+import io
+import tempfile
 import requests
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc
 
 from app.database import get_db
 from app.models import User, Room, Review, Movie, WebhookSubscription
 from app.schemas import RoomResponse, ReviewResponse, MovieResponse
 from app.auth import get_current_user_or_api_key, generate_api_key
+from app.conditional import conditional_response, room_objects, review_objects
+from app.fields import (
+    FIELDS_DESCRIPTION, MOVIE_KEY_COLUMNS, ROOM_KEY_COLUMNS, REVIEW_KEY_COLUMNS,
+    parse_fields, includes, load_columns, sparse_response
+)
+from app.pagination import keyset_paginate, MOVIE_NEWEST_ORDER, ROOM_NEWEST_ORDER, REVIEW_NEWEST_ORDER
+from app.services import events
+from app.services.bulk_ingest import (
+    ingest_reviews, iter_records, detect_format, SUPPORTED_FORMATS, DEFAULT_BATCH_SIZE, BULK_SPOOL_BYTES
+)
+from app.services.movie_cache import movie_cache, responses_with_movies, with_movies
+from app.services.rating_service import RatingService
+from app.services.room_service import RoomService
+from app.services.search_service import SearchService
 
 router = APIRouter(prefix="/api/zapier", tags=["zapier"])
 
@@ -90,7 +107,7 @@ def create_webhook_subscription(
     db: Session = Depends(get_db)
 ):
     """Create a webhook subscription for Zapier triggers."""
-    valid_event_types = ["new_room", "new_review", "new_movie", "room_joined"]
+    valid_event_types = ["new_room", "new_review", "new_movie", "room_joined", "reviews_imported"]
     
     if event_type not in valid_event_types:
         raise HTTPException(
@@ -176,7 +193,6 @@ def create_room_zapier(
 ):
     """Create a room (Zapier-friendly endpoint)."""
     from app.models import Movie as MovieModel
-    from app.services.room_service import RoomService
     
     movie = db.query(MovieModel).filter(MovieModel.id == movie_id).first()
     if not movie:
@@ -195,7 +211,7 @@ def create_room_zapier(
         max_members=max_members
     )
     
-    room.member_count = len(room.members)
+    RoomService.set_member_counts(db, [room])
     
     # Trigger webhook
     background_tasks.add_task(
@@ -213,7 +229,7 @@ def create_room_zapier(
         }
     )
     
-    return room
+    return responses_with_movies(RoomResponse, [room], movie_cache.get_many(db, [room.movie_id]))[0]
 
 
 @router.post("/reviews", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
@@ -227,7 +243,6 @@ def create_review_zapier(
 ):
     """Create a review (Zapier-friendly endpoint)."""
     from app.schemas import ReviewCreate
-    from app.routers.reviews import update_movie_average_rating
     
     # Verify movie exists
     movie = db.query(Movie).filter(Movie.id == movie_id).first()
@@ -257,11 +272,15 @@ def create_review_zapier(
         review_text=review_text
     )
     db.add(review)
+    # Movie rating totals change in the same transaction as the review
+    RatingService.apply_change(db, movie_id, None, review.rating)
     db.commit()
     db.refresh(review)
     
-    # Update movie's average rating
-    update_movie_average_rating(db, movie_id)
+    events.emit(
+        events.REVIEW_CHANGED, db=db, user_id=current_user.id, review_id=review.id,
+        movie_id=movie_id, old_rating=None, new_rating=review.rating
+    )
     
     # Trigger webhook
     background_tasks.add_task(
@@ -279,69 +298,186 @@ def create_review_zapier(
         }
     )
     
-    return review
+    return responses_with_movies(ReviewResponse, [review], movie_cache.get_many(db, [review.movie_id]))[0]
+
+
+# Movie IDs listed in a bulk import's webhook payload
+WEBHOOK_MAX_MOVIE_IDS = 100
+
+
+@router.post("/reviews/bulk", response_model=dict)
+async def bulk_create_reviews_zapier(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    format: Optional[str] = Query(None, description="ndjson or csv (default: from Content-Type)"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    current_user: User = Depends(get_current_user_or_api_key),
+    db: Session = Depends(get_db)
+):
+    """
+    Import the current user's reviews from an NDJSON or CSV request body
+    (one review per line: movie_id or tmdb_id, rating, review_text).
+    Reviews of movies already reviewed are updated. Sends one
+    reviews_imported webhook for the whole import.
+    Returns counts, the first errors and rows/sec.
+    """
+    fmt = format or detect_format(content_type=request.headers.get("content-type"))
+    if fmt not in SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(SUPPORTED_FORMATS)}"
+        )
+
+    with tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_BYTES) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        text = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+        try:
+            stats = await run_in_threadpool(
+                ingest_reviews, db, iter_records(text, fmt), batch_size, user_id=current_user.id
+            )
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Request body must be UTF-8"
+            )
+        finally:
+            text.detach()
+    
+    movie_ids = stats.pop("movie_ids")
+    if movie_ids:
+        background_tasks.add_task(
+            notify_webhooks,
+            db,
+            "reviews_imported",
+            {
+                "event": "reviews_imported",
+                "user_id": current_user.id,
+                "created": stats["created"],
+                "updated": stats["updated"],
+                "movie_ids": movie_ids[:WEBHOOK_MAX_MOVIE_IDS],
+                "movie_count": len(movie_ids),
+            }
+        )
+    
+    return stats
 
 
 @router.get("/rooms", response_model=List[RoomResponse])
 def list_rooms_zapier(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     movie_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     current_user: Optional[User] = Depends(get_current_user_or_api_key),
     db: Session = Depends(get_db)
 ):
     """List rooms (Zapier-friendly endpoint)."""
+    fields = parse_fields(fields, RoomResponse)
     query = db.query(Room)
+    if fields:
+        query = query.options(load_columns(Room, fields, ROOM_KEY_COLUMNS))
+    if includes(fields, "creator"):
+        query = query.options(joinedload(Room.creator))
     
     if movie_id:
         query = query.filter(Room.movie_id == movie_id)
     
-    rooms = query.order_by(desc(Room.created_at)).offset(skip).limit(limit).all()
+    rooms = keyset_paginate(query, ROOM_NEWEST_ORDER, limit, skip, cursor, response)
     
-    for room in rooms:
-        room.member_count = len(room.members)
+    extra = list(fields or ())
+    if includes(fields, "member_count"):
+        RoomService.set_member_counts(db, rooms)
+        extra += [room.member_count for room in rooms]
     
-    return rooms
+    movies = movie_cache.get_many(db, [room.movie_id for room in rooms]) if includes(fields, "movie") else {}
+    not_modified = conditional_response(
+        request, response,
+        [obj for room in rooms for obj in room_objects(room, movies.get(room.movie_id), fields)],
+        extra=extra
+    )
+    if not_modified:
+        return not_modified
+    if fields:
+        return sparse_response(RoomResponse, with_movies(rooms, movies), fields, response)
+    return responses_with_movies(RoomResponse, rooms, movies)
 
 
 @router.get("/reviews", response_model=List[ReviewResponse])
 def list_reviews_zapier(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     movie_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """List reviews (Zapier-friendly endpoint)."""
+    fields = parse_fields(fields, ReviewResponse)
     query = db.query(Review)
+    if fields:
+        query = query.options(load_columns(Review, fields, REVIEW_KEY_COLUMNS))
+    if includes(fields, "user"):
+        query = query.options(joinedload(Review.user))
     
     if movie_id:
         query = query.filter(Review.movie_id == movie_id)
     
-    reviews = query.order_by(desc(Review.created_at)).offset(skip).limit(limit).all()
-    return reviews
+    reviews = keyset_paginate(query, REVIEW_NEWEST_ORDER, limit, skip, cursor, response)
+    
+    movies = movie_cache.get_many(db, [review.movie_id for review in reviews]) if includes(fields, "movie") else {}
+    not_modified = conditional_response(
+        request, response,
+        [obj for review in reviews for obj in review_objects(review, movies.get(review.movie_id), fields)],
+        extra=fields or ()
+    )
+    if not_modified:
+        return not_modified
+    if fields:
+        return sparse_response(ReviewResponse, with_movies(reviews, movies), fields, response)
+    return responses_with_movies(ReviewResponse, reviews, movies)
 
 
 @router.get("/movies", response_model=List[MovieResponse])
 def list_movies_zapier(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     search: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """List movies (Zapier-friendly endpoint)."""
-    from sqlalchemy import or_
+    if search and cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor cannot be combined with search"
+        )
+    fields = parse_fields(fields, MovieResponse)
     
     query = db.query(Movie)
+    if fields:
+        query = query.options(load_columns(Movie, fields, MOVIE_KEY_COLUMNS))
     
     if search:
-        query = query.filter(
-            or_(
-                Movie.title.ilike(f"%{search}%"),
-                Movie.plot.ilike(f"%{search}%")
-            )
-        )
-    
-    movies = query.order_by(desc(Movie.created_at)).offset(skip).limit(limit).all()
+        query = SearchService.search_movies(query, search)
+        movies = query.order_by(desc(Movie.created_at)).offset(skip).limit(limit).all()
+    else:
+        movies = keyset_paginate(query, MOVIE_NEWEST_ORDER, limit, skip, cursor, response)
+    
+    not_modified = conditional_response(request, response, movies, extra=fields or ())
+    if not_modified:
+        return not_modified
+    if fields:
+        return sparse_response(MovieResponse, movies, fields, response)
     return movies
 
 
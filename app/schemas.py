@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response validation."""
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import Optional, List, Union
 from datetime import datetime
 
 
@@ -76,6 +76,24 @@ class MovieResponse(MovieBase):
         from_attributes = True
 
 
+class MovieSuggestion(BaseModel):
+    id: int
+    title: str
+    year: Optional[int] = None
+
+
+class FacetCount(BaseModel):
+    value: Union[int, str]
+    count: int
+
+
+class MovieFacetsResponse(BaseModel):
+    total: int
+    genres: List[FacetCount]
+    decades: List[FacetCount]
+    years: List[FacetCount]
+
+
 # Room Schemas
 class RoomBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=200)
@@ -168,6 +186,20 @@ class ReviewCreate(ReviewBase):
     movie_id: int
 
 
+class ReviewImport(ReviewBase):
+    """One review of a bulk import; the movie is given by ID or TMDB ID."""
+    movie_id: Optional[int] = None
+    tmdb_id: Optional[int] = None
+    user_id: Optional[int] = None  # Defaults to the importing user
+    created_at: Optional[datetime] = None  # Original review time, for migrated histories
+
+    @model_validator(mode="after")
+    def _require_movie(self):
+        if self.movie_id is None and self.tmdb_id is None:
+            raise ValueError("movie_id or tmdb_id is required")
+        return self
+
+
 class ReviewUpdate(BaseModel):
     rating: Optional[int] = Field(None, ge=1, le=10)
     review_text: Optional[str] = None
@@ -185,3 +217,16 @@ class ReviewResponse(ReviewBase):
     class Config:
         from_attributes = True
 
+
+class RatingBucket(BaseModel):
+    rating: int
+    count: int
+
+
+class MovieRatingStatsResponse(BaseModel):
+    movie_id: int
+    review_count: int
+    rating_sum: int
+    average_rating: Optional[float] = None
+    distribution: List[RatingBucket]  # One bucket per rating, 1-10
+    last_reviewed_at: Optional[datetime] = None
@@ -0,0 +1,144 @@
+"""Offline batch precompute of recommendations for every user."""
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Movie, User, UserPreferences, Room, Review, PrecomputedRecommendation, room_members
+from app.services.recommendation_engine import RecommendationEngine
+
+# Most recommendations the API will ask for (see /recommendations/me)
+DEFAULT_LIMIT = 50
+
+# (user_id, preferences or None, movie IDs to exclude)
+UserJob = Tuple[int, Optional[SimpleNamespace], List[int]]
+
+_worker_engine: Optional[RecommendationEngine] = None
+
+
+def _init_worker(engine: RecommendationEngine):
+    """Receive the catalog once per worker process."""
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _score_chunk(jobs: List[UserJob], limit: int) -> List[Tuple[int, List[Tuple[int, str]]]]:
+    """Score a chunk of users against the worker's catalog."""
+    results = []
+    # Users with identical preferences and nothing to exclude share a result
+    shared: Dict[tuple, List[Tuple[int, str]]] = {}
+    for user_id, preferences, exclude in jobs:
+        key = None
+        if not exclude:
+            key = tuple(vars(preferences).values()) if preferences else ()
+            if key in shared:
+                results.append((user_id, shared[key]))
+                continue
+        ranked = _worker_engine.recommend(preferences, exclude, limit)
+        if key is not None:
+            shared[key] = ranked
+        results.append((user_id, ranked))
+    return results
+
+
+def _load_jobs(db: Session) -> List[UserJob]:
+    """Load every user with their preferences and seen movies in bulk."""
+    preferences = {
+        row.user_id: SimpleNamespace(
+            favorite_genres=row.favorite_genres,
+            favorite_directors=row.favorite_directors,
+            favorite_actors=row.favorite_actors,
+            min_rating=row.min_rating,
+            preferred_decades=row.preferred_decades,
+        )
+        for row in db.query(
+            UserPreferences.user_id,
+            UserPreferences.favorite_genres,
+            UserPreferences.favorite_directors,
+            UserPreferences.favorite_actors,
+            UserPreferences.min_rating,
+            UserPreferences.preferred_decades,
+        )
+    }
+
+    # Movies from joined rooms and reviewed movies are excluded
+    seen: Dict[int, List[int]] = defaultdict(list)
+    room_movies = db.query(
+        room_members.c.user_id, Room.movie_id
+    ).join(Room, Room.id == room_members.c.room_id)
+    reviewed_movies = db.query(Review.user_id, Review.movie_id)
+    for user_id, movie_id in room_movies.union(reviewed_movies):
+        seen[user_id].append(movie_id)
+
+    return [
+        (user_id, preferences.get(user_id), seen.get(user_id, []))
+        for (user_id,) in db.query(User.id).order_by(User.id)
+    ]
+
+
+def _write_chunk(db: Session, results: List[Tuple[int, List[Tuple[int, str]]]], run: dict):
+    """
+    Replace the stored recommendations for a chunk of users; run holds the
+    computed_at/catalog_version the API checks them against.
+    """
+    table = PrecomputedRecommendation.__table__
+    db.execute(table.delete().where(table.c.user_id.in_([user_id for user_id, _ in results])))
+    rows = [
+        {"user_id": user_id, "rank": rank, "movie_id": movie_id, "reason": reason[:500], **run}
+        for user_id, ranked in results
+        for rank, (movie_id, reason) in enumerate(ranked)
+    ]
+    if rows:
+        db.execute(table.insert(), rows)
+    db.commit()
+
+
+def precompute_recommendations(
+    db: Session,
+    workers: Optional[int] = None,
+    chunk_size: int = 1000,
+    limit: int = DEFAULT_LIMIT,
+    progress=print
+) -> dict:
+    """
+    Score every user in parallel and bulk-write precomputed_recommendations.
+    Returns run statistics including throughput in users/sec.
+    """
+    started = time.perf_counter()
+    # Taken before anything is read, so inputs changed during the run count as newer
+    run = {
+        "computed_at": db.execute(select(func.now())).scalar(),
+        "catalog_version": db.query(func.max(Movie.id)).scalar() or 0,
+    }
+    engine = RecommendationEngine()
+    engine.rebuild(db)
+    jobs = _load_jobs(db)
+    loaded = time.perf_counter()
+    progress(f"Loaded {engine.size} movies and {len(jobs)} users in {loaded - started:.1f}s.")
+
+    workers = workers or os.cpu_count() or 1
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    done = 0
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(engine,)
+    ) as pool:
+        for results in pool.map(_score_chunk, chunks, [limit] * len(chunks)):
+            _write_chunk(db, results, run)
+            done += len(results)
+            elapsed = time.perf_counter() - loaded
+            progress(f"  {done}/{len(jobs)} users ({done / elapsed:,.0f} users/sec)")
+
+    scoring_seconds = time.perf_counter() - loaded
+    return {
+        "users": len(jobs),
+        "movies": engine.size,
+        "workers": workers,
+        "load_seconds": round(loaded - started, 3),
+        "scoring_seconds": round(scoring_seconds, 3),
+        "users_per_second": round(len(jobs) / scoring_seconds, 1) if scoring_seconds else 0.0,
+    }
@@ -0,0 +1,389 @@
+"""Bulk catalog and review ingest from NDJSON or CSV streams."""
+import csv
+import json
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import bindparam, func, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import Movie, Review, User, normalize_title, parse_rating_value
+from app.schemas import MovieCreate, ReviewImport
+from app.services import events
+from app.services.catalog_service import CatalogService
+from app.services.rating_service import RatingService
+from app.services.search_service import (
+    SearchService, TITLE_SIMILARITY_THRESHOLD, title_numbers, title_similarity, title_trigrams
+)
+
+SUPPORTED_FORMATS = ("ndjson", "csv")
+DEFAULT_BATCH_SIZE = 1000
+# Upload bodies larger than this are spooled to disk while they are received
+BULK_SPOOL_BYTES = 8 * 1024 * 1024
+# Validation/parse errors kept in the report; the rest are only counted
+MAX_ERRORS = 100
+
+_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+_batch_adapter = TypeAdapter(List[MovieCreate])
+_review_adapter = TypeAdapter(List[ReviewImport])
+
+# (line number, record or None, parse error or None)
+ParsedRecord = Tuple[int, Optional[dict], Optional[str]]
+
+
+def detect_format(name: Optional[str] = None, content_type: Optional[str] = None) -> Optional[str]:
+    """Guess the input format from a file name or Content-Type header."""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    name = (name or "").lower()
+    if content_type in ("text/csv", "application/csv") or name.endswith(".csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/json") \
+            or name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return None
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[ParsedRecord]:
+    """Parse records from a text stream one line at a time."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty cells mean "no value", not an empty string
+            yield reader.line_num, {key: value or None for key, value in row.items() if key}, None
+        return
+
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+def _validate(
+    batch: List[Tuple[int, dict]],
+    adapter: TypeAdapter = _batch_adapter
+) -> Tuple[List[Tuple[int, Any]], List[dict]]:
+    """
+    Validate a batch with adapter (MovieCreate by default) in one call;
+    when some records fail, their indexes are taken from the error
+    locations and the rest are validated again.
+    Returns (valid (line, model) pairs, errors).
+    """
+    try:
+        movies = adapter.validate_python([record for _, record in batch])
+        return [(line_no, movie) for (line_no, _), movie in zip(batch, movies)], []
+    except ValidationError as e:
+        failed = {}
+        for error in e.errors():
+            index, *field = error["loc"]
+            location = ".".join(str(part) for part in field)
+            failed.setdefault(index, f"{location}: {error['msg']}" if location else error["msg"])
+
+    errors = [{"line": batch[index][0], "error": message} for index, message in sorted(failed.items())]
+    remaining = [item for index, item in enumerate(batch) if index not in failed]
+    if not remaining:
+        return [], errors
+    movies = adapter.validate_python([record for _, record in remaining])
+    return [(line_no, movie) for (line_no, _), movie in zip(remaining, movies)], errors
+
+
+def _row(movie: MovieCreate, title_key: str) -> dict:
+    """Column values for a Core insert, which skips the model's @validates hooks."""
+    values = movie.model_dump()
+    values["title_key"] = title_key
+    values["imdb_rating_value"] = parse_rating_value(movie.imdb_rating)
+    return values
+
+
+def _similar_in_batch(
+    batch_trigrams: Dict[int, List[Tuple[set, set, int]]],
+    title_key: str,
+    year: int
+) -> List[Tuple[int, float]]:
+    """
+    Earlier rows of the same batch and year with a near-identical title
+    (and the same numbering, as SearchService.similar_titles).
+    Returns list of tuples: (line number, similarity)
+    """
+    wanted = title_trigrams(title_key)
+    numbers = title_numbers(title_key)
+    for trigrams, row_numbers, line_no in batch_trigrams.get(year, []):
+        score = title_similarity(wanted, trigrams)
+        if score >= TITLE_SIMILARITY_THRESHOLD and row_numbers == numbers:
+            return [(line_no, score)]
+    return []
+
+
+def ingest_movies(
+    db: Session,
+    records: Iterable[ParsedRecord],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[dict], None]] = None,
+    fuzzy: bool = False
+) -> dict:
+    """
+    Validate and insert movies in batches of batch_size, one multi-row
+    INSERT ... ON CONFLICT DO NOTHING per batch, committing as it goes.
+    Movies whose normalized title and year, or TMDB ID, already exist are
+    skipped by the unique indexes. With fuzzy, inserted movies with a
+    near-identical same-year title (trigram index, one lookup per row) are
+    listed in near_duplicate_lines for review; they are not skipped.
+    progress is called after each batch.
+    Returns the ingest stats.
+    """
+    insert = _INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        raise ValueError(f"Bulk ingest is not supported on {db.get_bind().dialect.name}")
+    statement = insert(Movie.__table__).on_conflict_do_nothing().returning(
+        Movie.id, Movie.genre, Movie.director, Movie.cast, Movie.title_key, Movie.year
+    )
+
+    stats = {
+        "processed": 0,
+        "inserted": 0,
+        "duplicates": 0,
+        "near_duplicates": 0,
+        "invalid": 0,
+        "errors": [],
+        "near_duplicate_lines": [],
+        "seconds": 0.0,
+        "rows_per_second": 0.0,
+    }
+    movie_ids: List[int] = []
+    started = time.perf_counter()
+    records = iter(records)
+
+    def report(errors: List[dict]):
+        stats["invalid"] += len(errors)
+        stats["errors"].extend(errors[:MAX_ERRORS - len(stats["errors"])])
+
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+        stats["processed"] += len(chunk)
+        report([{"line": line_no, "error": error} for line_no, _, error in chunk if error])
+        valid, errors = _validate([(line_no, record) for line_no, record, error in chunk if not error])
+        report(errors)
+
+        # Duplicates inside the batch are dropped here, ones already stored by the index
+        rows, keys = [], set()
+        batch_trigrams: Dict[int, List[Tuple[set, int]]] = {}
+        near_duplicates = []  # (title key, near_duplicate_lines entry)
+        for line_no, movie in valid:
+            title_key = normalize_title(movie.title)
+            key = (title_key, movie.year or 0)
+            if key in keys or (movie.tmdb_id is not None and movie.tmdb_id in keys):
+                continue
+            if fuzzy and movie.year is not None:
+                in_batch = _similar_in_batch(batch_trigrams, title_key, movie.year)
+                similar = in_batch or SearchService.similar_titles(db, title_key, movie.year)
+                if similar:
+                    match, score = similar[0]
+                    near_duplicates.append((key, {
+                        "line": line_no,
+                        # an earlier line of this batch, or a stored movie
+                        "similar_to_line" if in_batch else "similar_to": match,
+                        "similarity": round(score, 2),
+                    }))
+                batch_trigrams.setdefault(movie.year, []).append(
+                    (title_trigrams(title_key), title_numbers(title_key), line_no)
+                )
+            keys.add(key)
+            if movie.tmdb_id is not None:
+                keys.add(movie.tmdb_id)
+            rows.append(_row(movie, title_key))
+
+        inserted = db.execute(statement, rows).all() if rows else []
+        CatalogService.sync_movie_terms(db, inserted)
+        db.commit()
+
+        movie_ids.extend(row.id for row in inserted)
+        stats["inserted"] += len(inserted)
+        # Only movies that were inserted (not exact duplicates) are reported
+        inserted_keys = {(row.title_key, row.year or 0) for row in inserted}
+        for key, near in near_duplicates:
+            if key in inserted_keys:
+                stats["near_duplicates"] += 1
+                if len(stats["near_duplicate_lines"]) < MAX_ERRORS:
+                    stats["near_duplicate_lines"].append(near)
+        stats["duplicates"] += len(valid) - len(inserted)
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        stats["rows_per_second"] = round(stats["processed"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        if progress:
+            progress(stats)
+
+    if movie_ids:
+        events.emit(events.MOVIES_IMPORTED, db=db, movie_ids=movie_ids)
+    return stats
+
+
+def _resolve_reviews(
+    db: Session,
+    valid: List[Tuple[int, ReviewImport]],
+    user_id: Optional[int]
+) -> Tuple[Dict[Tuple[int, int], Tuple[int, ReviewImport]], List[dict]]:
+    """
+    Resolve a batch's movies (by ID or TMDB ID) and users with one query
+    each. The last review per movie and user wins.
+    Returns ({(movie_id, user_id): (line, review)}, errors).
+    """
+    movie_ids = {review.movie_id for _, review in valid if review.movie_id is not None}
+    tmdb_ids = {review.tmdb_id for _, review in valid if review.movie_id is None}
+    known_movies, by_tmdb = set(), {}
+    if movie_ids or tmdb_ids:
+        for movie_id, tmdb_id in db.query(Movie.id, Movie.tmdb_id).filter(
+            or_(Movie.id.in_(movie_ids), Movie.tmdb_id.in_(tmdb_ids))
+        ):
+            known_movies.add(movie_id)
+            if tmdb_id is not None:
+                by_tmdb[tmdb_id] = movie_id
+    user_ids = {review.user_id for _, review in valid if review.user_id is not None}
+    known_users = {uid for (uid,) in db.query(User.id).filter(User.id.in_(user_ids))} if user_ids else set()
+
+    resolved, errors = {}, []
+    for line_no, review in valid:
+        movie_id = review.movie_id if review.movie_id is not None else by_tmdb.get(review.tmdb_id)
+        owner = review.user_id if review.user_id is not None else user_id
+        if movie_id not in known_movies:
+            error = f"Unknown movie {review.movie_id}" if review.movie_id is not None else f"Unknown TMDB ID {review.tmdb_id}"
+        elif owner is None:
+            error = "user_id: Field required"
+        elif user_id is not None and owner != user_id:
+            error = "user_id: reviews can only be imported for yourself"
+        elif owner not in known_users and owner != user_id:
+            error = f"Unknown user {owner}"
+        else:
+            resolved[(movie_id, owner)] = (line_no, review)
+            continue
+        errors.append({"line": line_no, "error": error})
+    return resolved, errors
+
+
+def ingest_reviews(
+    db: Session,
+    records: Iterable[ParsedRecord],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[dict], None]] = None,
+    user_id: Optional[int] = None
+) -> dict:
+    """
+    Validate and upsert reviews in batches of batch_size, one
+    INSERT ... ON CONFLICT (movie_id, user_id) DO UPDATE per batch,
+    committing as it goes. A review that already exists is updated unless
+    its rating and text are unchanged; within a batch, the last row for a
+    movie and user wins. Each batch applies its rating
+    changes to the movie aggregates once per affected movie, in the same
+    transaction. With user_id, every review is the given user's (records
+    may not name another). progress is called after each batch.
+    Returns the ingest stats, with the affected movie IDs in movie_ids.
+    """
+    insert = _INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        raise ValueError(f"Bulk ingest is not supported on {db.get_bind().dialect.name}")
+    table = Review.__table__
+    # New reviews keep their original created_at when the record has one
+    statement = insert(table).values(created_at=func.coalesce(bindparam("original_created_at"), func.now()))
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.movie_id, table.c.user_id],
+        set_={
+            "rating": statement.excluded.rating,
+            "review_text": statement.excluded.review_text,
+            "updated_at": func.now(),
+            "version": table.c.version + 1,
+        },
+        where=or_(
+            table.c.rating != statement.excluded.rating,
+            table.c.review_text.is_distinct_from(statement.excluded.review_text),
+        )
+    ).returning(table.c.movie_id, table.c.user_id, table.c.rating)
+
+    stats = {
+        "processed": 0,
+        "created": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "superseded": 0,
+        "invalid": 0,
+        "errors": [],
+        "seconds": 0.0,
+        "rows_per_second": 0.0,
+    }
+    # (user_id, movie_id, old_rating, new_rating) of every created or updated review
+    changes: List[Tuple[int, int, Optional[int], int]] = []
+    movie_ids = set()
+    started = time.perf_counter()
+    records = iter(records)
+
+    def report(errors: List[dict]):
+        stats["invalid"] += len(errors)
+        stats["errors"].extend(errors[:MAX_ERRORS - len(stats["errors"])])
+
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+        stats["processed"] += len(chunk)
+        report([{"line": line_no, "error": error} for line_no, _, error in chunk if error])
+        valid, errors = _validate(
+            [(line_no, record) for line_no, record, error in chunk if not error], _review_adapter
+        )
+        report(errors)
+        resolved, errors = _resolve_reviews(db, valid, user_id)
+        report(errors)
+        # Earlier rows of a batch for the same movie and user
+        stats["superseded"] += len(valid) - len(errors) - len(resolved)
+
+        written, old_ratings = [], {}
+        if resolved:
+            # Ratings before the upsert, for the aggregate deltas
+            old_ratings = {
+                (movie_id, owner): rating
+                for movie_id, owner, rating in db.query(Review.movie_id, Review.user_id, Review.rating).filter(
+                    tuple_(Review.movie_id, Review.user_id).in_(list(resolved))
+                )
+            }
+            rows = [
+                {
+                    "movie_id": movie_id,
+                    "user_id": owner,
+                    "rating": review.rating,
+                    "review_text": review.review_text,
+                    "original_created_at": review.created_at,
+                }
+                for (movie_id, owner), (_, review) in resolved.items()
+            ]
+            written = db.execute(statement, rows).all()
+            batch_changes = [
+                (owner, movie_id, old_ratings.get((movie_id, owner)), rating)
+                for movie_id, owner, rating in written
+            ]
+            RatingService.apply_changes(db, [(movie_id, old, new) for _, movie_id, old, new in batch_changes])
+            db.commit()
+            changes.extend(batch_changes)
+            movie_ids.update(movie_id for _, movie_id, _, _ in batch_changes)
+
+        created = sum(1 for movie_id, owner, _ in written if (movie_id, owner) not in old_ratings)
+        stats["created"] += created
+        stats["updated"] += len(written) - created
+        stats["unchanged"] += len(resolved) - len(written)
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        stats["rows_per_second"] = round(stats["processed"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        if progress:
+            progress(stats)
+
+    if changes:
+        events.emit(events.REVIEWS_IMPORTED, db=db, changes=changes)
+    stats["movie_ids"] = sorted(movie_ids)
+    return stats
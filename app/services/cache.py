@@ -0,0 +1,140 @@
+"""Bounded in-process caches."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a TTL.
+
+    Entries can be tagged with a group (e.g. a user ID) so that every entry
+    derived from the same inputs can be invalidated at once. Group versions
+    let callers drop results computed from inputs that changed mid-flight.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple[float, Any, Optional[Hashable]]]" = OrderedDict()
+        self._groups: Dict[Hashable, Set[Hashable]] = {}
+        self._versions: Dict[Hashable, int] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, key: Hashable):
+        _, _, group = self._entries.pop(key)
+        if group is not None:
+            keys = self._groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[group]
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def version(self, group: Optional[Hashable] = None) -> tuple[int, int]:
+        """Current version of a group; changes whenever it is invalidated."""
+        with self._lock:
+            return self._generation, self._versions.get(group, 0)
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        group: Optional[Hashable] = None,
+        version: Optional[tuple[int, int]] = None
+    ) -> bool:
+        """
+        Store a value. When version is given, the value is only stored if
+        the group has not been invalidated since that version was read.
+        """
+        with self._lock:
+            if version is not None and version != (self._generation, self._versions.get(group, 0)):
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, group)
+            if group is not None:
+                self._groups.setdefault(group, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def update(self, key: Hashable, func: Callable[[Any], Any]) -> bool:
+        """
+        Replace a cached value with func(value) in place, keeping its TTL.
+        Returns False (and does nothing) when the key is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return False
+            expires_at, value, group = entry
+            self._entries[key] = (expires_at, func(value), group)
+            return True
+
+    def delete(self, key: Hashable):
+        """Remove a single entry if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_group(self, group: Hashable):
+        """Remove every entry tagged with group."""
+        with self._lock:
+            self._versions[group] = self._versions.get(group, 0) + 1
+            for key in list(self._groups.get(group, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._groups.clear()
+            self._versions.clear()
+            self._generation += 1
+
+    def values(self) -> list:
+        """Snapshot of the cached values, e.g. for measuring memory use."""
+        with self._lock:
+            return [value for _, value, _ in self._entries.values()]
+
+    def stats(self) -> dict:
+        """Hit/miss counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
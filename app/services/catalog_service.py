@@ -0,0 +1,234 @@
+"""Catalog maintenance service for normalized movie genres and people."""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, bindparam, func, or_
+from sqlalchemy.orm import Session, Query
+
+from app.models import (
+    Movie, Genre, Person, movie_genres, movie_people, normalize_title, parse_rating_value
+)
+from app.services.recommendation_engine import normalize_name, split_terms
+from app.services.search_service import SearchService
+
+ROLE_DIRECTOR = "director"
+ROLE_CAST = "cast"
+
+
+class CatalogService:
+    """Service keeping the genre/people join tables in sync with movies."""
+
+    @staticmethod
+    def _get_or_create(db: Session, model, names: Iterable[str]) -> Dict[str, int]:
+        """Map normalized names to row IDs, inserting missing rows."""
+        by_key: Dict[str, str] = {}
+        for name in names:
+            by_key.setdefault(normalize_name(name), " ".join(name.split()))
+        if not by_key:
+            return {}
+
+        ids = dict(
+            db.query(model.name_key, model.id).filter(
+                model.name_key.in_(list(by_key))
+            ).all()
+        )
+        missing = [
+            {"name": name, "name_key": key}
+            for key, name in by_key.items() if key not in ids
+        ]
+        if missing:
+            db.execute(model.__table__.insert(), missing)
+            ids.update(
+                db.query(model.name_key, model.id).filter(
+                    model.name_key.in_([row["name_key"] for row in missing])
+                ).all()
+            )
+        return ids
+
+    @staticmethod
+    def sync_movie_terms(db: Session, movies: List[Movie]):
+        """
+        Rewrite the movie_genres/movie_people rows for the given movies from
+        their comma-separated genre, director and cast strings.
+        Movies must already have IDs (flush first); the caller commits.
+        """
+        if not movies:
+            return
+
+        genre_ids = CatalogService._get_or_create(
+            db, Genre, (g for m in movies for g in split_terms(m.genre))
+        )
+        person_ids = CatalogService._get_or_create(
+            db, Person,
+            (p for m in movies for p in split_terms(m.director) + split_terms(m.cast))
+        )
+
+        genre_rows, people_rows = [], []
+        for movie in movies:
+            seen_genres = set()
+            for genre in split_terms(movie.genre):
+                genre_id = genre_ids[normalize_name(genre)]
+                if genre_id not in seen_genres:
+                    seen_genres.add(genre_id)
+                    genre_rows.append({"movie_id": movie.id, "genre_id": genre_id})
+            for role, value in ((ROLE_DIRECTOR, movie.director), (ROLE_CAST, movie.cast)):
+                seen_people = set()
+                for position, name in enumerate(split_terms(value)):
+                    person_id = person_ids[normalize_name(name)]
+                    if person_id not in seen_people:
+                        seen_people.add(person_id)
+                        people_rows.append({
+                            "movie_id": movie.id,
+                            "person_id": person_id,
+                            "role": role,
+                            "position": position,
+                        })
+
+        movie_ids = [movie.id for movie in movies]
+        db.execute(movie_genres.delete().where(movie_genres.c.movie_id.in_(movie_ids)))
+        db.execute(movie_people.delete().where(movie_people.c.movie_id.in_(movie_ids)))
+        if genre_rows:
+            db.execute(movie_genres.insert(), genre_rows)
+        if people_rows:
+            db.execute(movie_people.insert(), people_rows)
+
+    @staticmethod
+    def backfill_movie_terms(db: Session, batch_size: int = 1000) -> int:
+        """
+        Populate the join tables for every existing movie.
+        Returns the number of movies processed.
+        """
+        processed = 0
+        last_id = 0
+        while True:
+            batch = db.query(Movie).filter(
+                Movie.id > last_id
+            ).order_by(Movie.id).limit(batch_size).all()
+            if not batch:
+                break
+            CatalogService.sync_movie_terms(db, batch)
+            db.commit()
+            processed += len(batch)
+            last_id = batch[-1].id
+            db.expunge_all()
+        return processed
+
+    @staticmethod
+    def backfill_rating_values(db: Session, batch_size: int = 5000) -> int:
+        """
+        Fill imdb_rating_value/average_rating_value from the string columns.
+        Returns the number of movies processed.
+        """
+        table = Movie.__table__
+        update = table.update().where(table.c.id == bindparam("movie_id")).values(
+            imdb_rating_value=bindparam("imdb_value"),
+            average_rating_value=bindparam("average_value"),
+        )
+        processed = 0
+        last_id = 0
+        while True:
+            rows = db.query(Movie.id, Movie.imdb_rating, Movie.average_rating).filter(
+                Movie.id > last_id
+            ).order_by(Movie.id).limit(batch_size).all()
+            if not rows:
+                break
+            db.execute(update, [
+                {
+                    "movie_id": movie_id,
+                    "imdb_value": parse_rating_value(imdb_rating),
+                    "average_value": parse_rating_value(average_rating),
+                }
+                for movie_id, imdb_rating, average_rating in rows
+            ])
+            db.commit()
+            processed += len(rows)
+            last_id = rows[-1].id
+        return processed
+
+    @staticmethod
+    def backfill_title_keys(db: Session, batch_size: int = 5000) -> tuple[int, List[int]]:
+        """
+        Fill title_key for movies created before it existed, leaving it empty
+        on rows that duplicate an earlier movie's normalized title and year.
+        Returns (movies processed, IDs of the duplicates left unkeyed).
+        """
+        table = Movie.__table__
+        update = table.update().where(table.c.id == bindparam("movie_id")).values(
+            title_key=bindparam("key")
+        )
+        taken = {
+            (key, year or 0)
+            for key, year in db.query(Movie.title_key, Movie.year).filter(
+                Movie.title_key.isnot(None)
+            )
+        }
+        processed = 0
+        duplicates: List[int] = []
+        last_id = 0
+        while True:
+            rows = db.query(Movie.id, Movie.title, Movie.year).filter(
+                Movie.id > last_id, Movie.title_key.is_(None)
+            ).order_by(Movie.id).limit(batch_size).all()
+            if not rows:
+                break
+            params = []
+            for movie_id, title, year in rows:
+                key = normalize_title(title)
+                if (key, year or 0) in taken:
+                    duplicates.append(movie_id)
+                else:
+                    taken.add((key, year or 0))
+                    params.append({"movie_id": movie_id, "key": key})
+            if params:
+                db.execute(update, params)
+            db.commit()
+            processed += len(rows)
+            last_id = rows[-1].id
+        return processed, duplicates
+
+    @staticmethod
+    def find_duplicate(
+        db: Session,
+        title: str,
+        year: Optional[int] = None,
+        tmdb_id: Optional[int] = None,
+        fuzzy: bool = True
+    ) -> Optional[Movie]:
+        """
+        Existing movie with the same normalized title and year, or the same
+        TMDB ID. Both lookups are served by the unique dedupe indexes.
+        With fuzzy, falls back to the most similar same-year title from the
+        trigram index ("Matrix, The" for "The Matrix").
+        """
+        title_key = normalize_title(title)
+        condition = (Movie.title_key == title_key) & (
+            func.coalesce(Movie.year, 0) == (year or 0)
+        )
+        if tmdb_id is not None:
+            condition = or_(condition, Movie.tmdb_id == tmdb_id)
+        existing = db.query(Movie).filter(condition).first()
+        if existing is not None or not fuzzy:
+            return existing
+
+        similar = SearchService.similar_titles(db, title_key, year)
+        return db.get(Movie, similar[0][0]) if similar else None
+
+    @staticmethod
+    def filter_by_genre(query: Query, genre: str) -> Query:
+        """Restrict a movie query to an exact genre via the indexed join table."""
+        genre_id = select(Genre.id).where(
+            Genre.name_key == normalize_name(genre)
+        ).scalar_subquery()
+        return query.join(
+            movie_genres, movie_genres.c.movie_id == Movie.id
+        ).filter(movie_genres.c.genre_id == genre_id)
+
+    @staticmethod
+    def filter_by_person(query: Query, name: str, role: str) -> Query:
+        """Restrict a movie query to a director or cast member via the join table."""
+        person_id = select(Person.id).where(
+            Person.name_key == normalize_name(name)
+        ).scalar_subquery()
+        people = movie_people.alias(f"movie_people_{role}")
+        return query.join(
+            people, people.c.movie_id == Movie.id
+        ).filter(people.c.person_id == person_id, people.c.role == role)
@@ -0,0 +1,250 @@
+"""Item-item collaborative filtering over review ratings."""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from app.models import Review
+from app.services import events
+
+# Ratings are centred on the middle of the 1-10 scale so that low ratings
+# count against a movie. A fixed offset (rather than a per-user mean) keeps
+# incremental updates exact.
+RATING_OFFSET = 5.5
+
+# Pending similarity deltas are folded into the sparse matrix past this size
+FOLD_THRESHOLD = 50_000
+
+
+class ItemItemModel:
+    """
+    Item-item cosine similarity model built from ``Review.rating``.
+
+    Keeps the item co-occurrence matrix ``R.T @ R`` of centred ratings as a
+    sparse CSC matrix plus per-item norms. Review writes apply exact deltas
+    for the affected item pairs instead of rebuilding the matrix.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.movie_ids: List[int] = []
+        self._col_by_movie: Dict[int, int] = {}
+        self._cooccurrence = sparse.csc_matrix((0, 0), dtype=np.float64)
+        self._norms = np.zeros(0, dtype=np.float64)
+        self._pending: Dict[int, Dict[int, float]] = {}  # column -> {row: delta}
+        self._pending_size = 0
+        self._loaded = False
+
+    @property
+    def size(self) -> int:
+        return len(self.movie_ids)
+
+    def _column(self, movie_id: int) -> int:
+        """Column index for a movie, growing the model for unseen movies."""
+        col = self._col_by_movie.get(movie_id)
+        if col is None:
+            col = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+            self._col_by_movie[movie_id] = col
+            self._norms = np.append(self._norms, 0.0)
+        return col
+
+    def rebuild(self, db: Session):
+        """Build the co-occurrence matrix from every review."""
+        rows = db.query(Review.user_id, Review.movie_id, Review.rating).all()
+
+        with self._lock:
+            self._reset()
+            user_index: Dict[int, int] = {}
+            user_rows = np.empty(len(rows), dtype=np.int64)
+            item_cols = np.empty(len(rows), dtype=np.int64)
+            values = np.empty(len(rows), dtype=np.float64)
+            for k, (user_id, movie_id, rating) in enumerate(rows):
+                user_rows[k] = user_index.setdefault(user_id, len(user_index))
+                item_cols[k] = self._column(movie_id)
+                values[k] = rating - RATING_OFFSET
+
+            ratings = sparse.csr_matrix(
+                (values, (user_rows, item_cols)),
+                shape=(len(user_index), self.size)
+            )
+            cooccurrence = (ratings.T @ ratings).tocsc()
+            self._norms = np.asarray(cooccurrence.diagonal(), dtype=np.float64)
+            cooccurrence.setdiag(0)
+            cooccurrence.eliminate_zeros()
+            self._cooccurrence = cooccurrence
+            self._loaded = True
+
+    def invalidate(self):
+        """Drop the model; the next ensure_loaded() rebuilds it."""
+        with self._lock:
+            self._reset()
+
+    def ensure_loaded(self, db: Session):
+        """Build the model on first use."""
+        with self._lock:
+            if not self._loaded:
+                self.rebuild(db)
+
+    def _add_pending(self, row: int, col: int, delta: float):
+        column = self._pending.setdefault(col, {})
+        if row not in column:
+            self._pending_size += 1
+        column[row] = column.get(row, 0.0) + delta
+
+    def _fold_pending(self):
+        """Merge pending deltas into the sparse matrix."""
+        if not self._pending:
+            return
+        rows, cols, deltas = [], [], []
+        for col, column in self._pending.items():
+            for row, delta in column.items():
+                rows.append(row)
+                cols.append(col)
+                deltas.append(delta)
+        shape = (self.size, self.size)
+        base = self._cooccurrence.copy()
+        base.resize(shape)
+        merged = base + sparse.csc_matrix((deltas, (rows, cols)), shape=shape)
+        merged = merged.tocsc()
+        merged.eliminate_zeros()
+        self._cooccurrence = merged
+        self._pending = {}
+        self._pending_size = 0
+
+    def update_rating(
+        self,
+        db: Session,
+        user_id: int,
+        movie_id: int,
+        old_rating: Optional[int],
+        new_rating: Optional[int]
+    ):
+        """
+        Apply a review change: old_rating is None for a new review and
+        new_rating is None for a deleted one.
+        """
+        with self._lock:
+            if not self._loaded:
+                return
+
+            old = old_rating - RATING_OFFSET if old_rating is not None else 0.0
+            new = new_rating - RATING_OFFSET if new_rating is not None else 0.0
+            delta = new - old
+            if delta == 0:
+                return
+
+            col = self._column(movie_id)
+            others = db.query(Review.movie_id, Review.rating).filter(
+                Review.user_id == user_id,
+                Review.movie_id != movie_id
+            ).all()
+            for other_movie_id, rating in others:
+                other = self._column(other_movie_id)
+                contribution = delta * (rating - RATING_OFFSET)
+                self._add_pending(col, other, contribution)
+                self._add_pending(other, col, contribution)
+            self._norms[col] += new * new - old * old
+
+            if self._pending_size > FOLD_THRESHOLD:
+                self._fold_pending()
+
+    def recommend(
+        self,
+        db: Session,
+        user_id: int,
+        exclude_movie_ids: Iterable[int],
+        limit: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Score every movie against the user's ratings.
+        Returns list of tuples: (movie_id, most_similar_rated_movie_id)
+        """
+        user_ratings = db.query(Review.movie_id, Review.rating).filter(
+            Review.user_id == user_id
+        ).all()
+
+        with self._lock:
+            rated = [
+                (self._col_by_movie[movie_id], rating - RATING_OFFSET)
+                for movie_id, rating in user_ratings
+                if movie_id in self._col_by_movie
+            ]
+            if not rated or self.size == 0:
+                return []
+
+            n = self.size
+            with np.errstate(divide="ignore"):
+                inv_norms = np.where(self._norms > 0, 1.0 / np.sqrt(self._norms), 0.0)
+
+            cols = np.asarray([col for col, _ in rated], dtype=np.int64)
+            weights = np.asarray([value for _, value in rated]) * inv_norms[cols]
+
+            # Sparse dot-product over the columns of the movies the user rated
+            base_n = self._cooccurrence.shape[0]
+            in_base = cols < base_n
+            block = self._cooccurrence[:, cols[in_base]]
+            scores = np.zeros(n, dtype=np.float64)
+            scores[:base_n] = block @ weights[in_base]
+            for col, weight in zip(cols, weights):
+                for row, delta in self._pending.get(int(col), {}).items():
+                    scores[row] += delta * weight
+            scores *= inv_norms
+
+            eligible = scores > 0
+            eligible[cols] = False
+            for movie_id in exclude_movie_ids:
+                col = self._col_by_movie.get(movie_id)
+                if col is not None:
+                    eligible[col] = False
+
+            candidates = np.flatnonzero(eligible)
+            if len(candidates) > limit:
+                part = np.argpartition(-scores[candidates], limit - 1)[:limit]
+                candidates = candidates[part]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            # Explain each pick by the rated movie contributing the most
+            block_rows = block.tocsr()
+            base_cols = cols[in_base]
+            results = []
+            for row in candidates:
+                because = int(cols[0])
+                if row < base_n and len(base_cols):
+                    contributions = block_rows[row].toarray().ravel() * weights[in_base]
+                    because = int(base_cols[int(np.argmax(contributions))])
+                results.append((self.movie_ids[row], self.movie_ids[because]))
+            return results
+
+
+# Shared model instance used by the API process
+item_item_model = ItemItemModel()
+
+
+@events.subscribe(events.REVIEW_CHANGED)
+def _apply_review_change(
+    db: Session,
+    user_id: int,
+    movie_id: int,
+    old_rating: Optional[int],
+    new_rating: Optional[int],
+    **_
+):
+    item_item_model.update_rating(db, user_id, movie_id, old_rating, new_rating)
+
+
+@events.subscribe(events.REVIEWS_IMPORTED)
+def _apply_imported_reviews(db: Session, changes, **_):
+    # update_rating() pairs a change with the user's other reviews as they are
+    # now, so a second change by the same user would count their pair twice
+    users = [user_id for user_id, _, _, _ in changes]
+    if len(changes) > events.REBUILD_THRESHOLD or len(set(users)) < len(users):
+        item_item_model.invalidate()
+        return
+    for user_id, movie_id, old_rating, new_rating in changes:
+        item_item_model.update_rating(db, user_id, movie_id, old_rating, new_rating)
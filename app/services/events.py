@@ -0,0 +1,33 @@
+"""In-process domain events used to keep caches and indexes in sync."""
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+# Event types
+MOVIE_CREATED = "movie_created"            # db, movie
+REVIEW_CHANGED = "review_changed"          # db, user_id, review_id, movie_id, old_rating, new_rating
+PREFERENCES_UPDATED = "preferences_updated"  # db, user_id
+ROOM_MEMBERSHIP_CHANGED = "room_membership_changed"  # db, user_id, room_id, movie_id, joined
+MOVIES_IMPORTED = "movies_imported"        # db, movie_ids
+REVIEWS_IMPORTED = "reviews_imported"      # db, changes: [(user_id, movie_id, old_rating, new_rating)]
+
+# Imports larger than this rebuild in-memory indexes instead of appending to them
+REBUILD_THRESHOLD = 500
+
+_handlers: Dict[str, List[Callable]] = defaultdict(list)
+
+
+def subscribe(event_type: str):
+    """Decorator registering a handler for an event type."""
+    def decorator(handler: Callable) -> Callable:
+        _handlers[event_type].append(handler)
+        return handler
+    return decorator
+
+
+def emit(event_type: str, **payload):
+    """
+    Call every handler registered for an event type.
+    Events are emitted after the triggering write has been committed.
+    """
+    for handler in list(_handlers[event_type]):
+        handler(**payload)
@@ -0,0 +1,98 @@
+"""Streaming catalog export as NDJSON or CSV."""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.models import Movie, Review, Room
+
+EXPORT_FORMATS = ("ndjson", "csv")
+DEFAULT_BATCH_SIZE = 1000
+
+# Flat rows per entity: related rows are referenced by ID, never nested
+EXPORT_COLUMNS = {
+    "movies": [
+        Movie.id, Movie.title, Movie.year, Movie.genre, Movie.director, Movie.cast,
+        Movie.plot, Movie.rating, Movie.imdb_rating, Movie.average_rating,
+        Movie.poster_url, Movie.trailer_url, Movie.tmdb_id,
+        Movie.created_at, Movie.updated_at,
+    ],
+    "reviews": [
+        Review.id, Review.movie_id, Review.user_id, Review.rating, Review.review_text,
+        Review.created_at, Review.updated_at,
+    ],
+    "rooms": [
+        Room.id, Room.name, Room.description, Room.movie_id, Room.creator_id,
+        Room.max_members, Room.created_at, Room.updated_at,
+    ],
+}
+# Private rooms are never exported
+EXPORT_FILTERS = {
+    "rooms": [Room.is_private == False],
+}
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def export_rows(
+    bind: Engine,
+    entity: str,
+    fmt: str = "ndjson",
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """
+    Encoded export of every row of entity, in ID order, one chunk per batch.
+    Rows are read through a server-side cursor (stream_results/yield_per),
+    so memory use stays flat however large the table is.
+    Opens its own connection, which is closed when the iterator finishes.
+    """
+    columns = EXPORT_COLUMNS[entity]
+    names = [column.key for column in columns]
+    query = select(*columns).where(*EXPORT_FILTERS.get(entity, [])).order_by(columns[0])
+
+    with bind.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            for rows in result.partitions():
+                writer.writerows([_csv_value(value) for value in row] for row in rows)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+        else:
+            for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(names, row)), default=_json_default) + "\n"
+                    for row in rows
+                ).encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a byte stream chunk by chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,243 @@
+"""In-memory genre/decade/year facet counts for the movie filters."""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
+
+from app.models import Movie, Genre, movie_genres
+from app.services import events
+from app.services.cache import TTLCache
+
+# Bitsets of movies matching a database-backed filter (search text,
+# director, ...), keyed by (filter, value)
+filter_cache = TTLCache(maxsize=1000, ttl=600)
+
+
+def _bitset(rows: Iterable[int], size: int) -> int:
+    """Bitset with the given row bits set, built in linear time."""
+    buffer = bytearray((size + 7) // 8)
+    for row in rows:
+        buffer[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def decade_label(year: int) -> str:
+    return f"{year - year % 10}s"
+
+
+class FacetIndex:
+    """
+    One bitset per genre and per year over the catalog (bit n = the nth
+    movie loaded). Counts are popcounts, and counts restricted to a filter
+    are popcounts of the facet bitset ANDed with the filter's bitset, so no
+    GROUP BY runs per request.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.movie_ids: List[int] = []
+        self._row_by_id: Dict[int, int] = {}
+        self._row_genres: List[Tuple[int, ...]] = []
+        self._row_years: List[Optional[int]] = []
+        self._genre_names: Dict[int, str] = {}
+        self._genre_bits: Dict[int, int] = {}
+        self._year_bits: Dict[int, int] = {}
+        self._all_bits = 0
+        self._max_movie_id = 0
+        self._loaded = False
+
+    @property
+    def size(self) -> int:
+        return len(self.movie_ids)
+
+    def rebuild(self, db: Session):
+        """Load the year and genres of every movie."""
+        movies = db.query(Movie.id, Movie.year).order_by(Movie.id).all()
+        genre_rows = db.query(movie_genres.c.movie_id, movie_genres.c.genre_id).all()
+        names = dict(db.query(Genre.id, Genre.name).all())
+
+        with self._lock:
+            self._reset()
+            genres_by_movie: Dict[int, List[int]] = {}
+            for movie_id, genre_id in genre_rows:
+                genres_by_movie.setdefault(movie_id, []).append(genre_id)
+
+            rows_by_genre: Dict[int, List[int]] = {}
+            rows_by_year: Dict[int, List[int]] = {}
+            for row, (movie_id, year) in enumerate(movies):
+                genre_ids = tuple(genres_by_movie.get(movie_id, ()))
+                self.movie_ids.append(movie_id)
+                self._row_by_id[movie_id] = row
+                self._row_genres.append(genre_ids)
+                self._row_years.append(year)
+                for genre_id in genre_ids:
+                    rows_by_genre.setdefault(genre_id, []).append(row)
+                if year is not None:
+                    rows_by_year.setdefault(year, []).append(row)
+
+            size = self.size
+            self._genre_names = names
+            self._genre_bits = {g: _bitset(rows, size) for g, rows in rows_by_genre.items()}
+            self._year_bits = {y: _bitset(rows, size) for y, rows in rows_by_year.items()}
+            self._all_bits = (1 << size) - 1
+            self._max_movie_id = movies[-1].id if movies else 0
+            self._loaded = True
+        filter_cache.clear()
+
+    def invalidate(self):
+        """Drop the loaded data; the next ensure_loaded() rebuilds it."""
+        with self._lock:
+            self._reset()
+        filter_cache.clear()
+
+    def ensure_loaded(self, db: Session):
+        """Load the index on first use and pick up movies added elsewhere."""
+        with self._lock:
+            if not self._loaded:
+                self.rebuild(db)
+                return
+
+            max_id = db.query(func.max(Movie.id)).scalar() or 0
+            if max_id > self._max_movie_id:
+                self.add_movies(db, [
+                    movie_id for (movie_id,) in db.query(Movie.id).filter(
+                        Movie.id > self._max_movie_id
+                    ).order_by(Movie.id)
+                ])
+
+    def add_movies(self, db: Session, movie_ids: List[int]):
+        """
+        Index new movies, or re-index changed ones (their old genre and
+        year bits are cleared first).
+        """
+        with self._lock:
+            if not self._loaded or not movie_ids:
+                return
+            years = dict(db.query(Movie.id, Movie.year).filter(Movie.id.in_(movie_ids)).all())
+            genres: Dict[int, List[int]] = {}
+            for movie_id, genre_id in db.query(
+                movie_genres.c.movie_id, movie_genres.c.genre_id
+            ).filter(movie_genres.c.movie_id.in_(movie_ids)):
+                genres.setdefault(movie_id, []).append(genre_id)
+            missing_names = {g for ids in genres.values() for g in ids} - self._genre_names.keys()
+            if missing_names:
+                self._genre_names.update(
+                    db.query(Genre.id, Genre.name).filter(Genre.id.in_(missing_names)).all()
+                )
+
+            for movie_id in movie_ids:
+                if movie_id not in years:
+                    continue
+                row = self._row_by_id.get(movie_id)
+                if row is None:
+                    row = self.size
+                    self.movie_ids.append(movie_id)
+                    self._row_by_id[movie_id] = row
+                    self._row_genres.append(())
+                    self._row_years.append(None)
+                    self._all_bits |= 1 << row
+                    self._max_movie_id = max(self._max_movie_id, movie_id)
+                bit = 1 << row
+
+                for genre_id in self._row_genres[row]:
+                    self._genre_bits[genre_id] &= ~bit
+                if self._row_years[row] is not None:
+                    self._year_bits[self._row_years[row]] &= ~bit
+
+                self._row_genres[row] = tuple(genres.get(movie_id, ()))
+                self._row_years[row] = years[movie_id]
+                for genre_id in self._row_genres[row]:
+                    self._genre_bits[genre_id] = self._genre_bits.get(genre_id, 0) | bit
+                if years[movie_id] is not None:
+                    self._year_bits[years[movie_id]] = self._year_bits.get(years[movie_id], 0) | bit
+        filter_cache.clear()
+
+    def genre_bits(self, name: str) -> int:
+        """Bitset of movies in a genre (exact, case-insensitive name)."""
+        key = " ".join(name.split()).casefold()
+        with self._lock:
+            bits = 0
+            for genre_id, genre_name in self._genre_names.items():
+                if genre_name.casefold() == key:
+                    bits |= self._genre_bits.get(genre_id, 0)
+            return bits
+
+    def year_bits(self, first_year: int, last_year: int) -> int:
+        """Bitset of movies released between first_year and last_year."""
+        with self._lock:
+            bits = 0
+            for year, year_bits in self._year_bits.items():
+                if first_year <= year <= last_year:
+                    bits |= year_bits
+            return bits
+
+    def query_bits(self, key: Tuple, query: Query) -> int:
+        """
+        Bitset of the movie IDs returned by query (a Movie.id query),
+        cached under key until the catalog changes. The query runs before
+        the index lock is taken, so a slow one does not block other readers.
+        """
+        bits = filter_cache.get(key)
+        if bits is None:
+            version = filter_cache.version()
+            movie_ids = [movie_id for (movie_id,) in query.order_by(None)]
+            with self._lock:
+                row_by_id = self._row_by_id
+                bits = _bitset(
+                    (row_by_id[movie_id] for movie_id in movie_ids if movie_id in row_by_id),
+                    self.size
+                )
+            filter_cache.set(key, bits, version=version)
+        return bits
+
+    def counts(self, restrict: Optional[int] = None) -> dict:
+        """
+        Movie counts per genre, decade and year, optionally restricted to
+        the movies in a filter bitset. Facet values with no movies are left out.
+        """
+        with self._lock:
+            mask = self._all_bits if restrict is None else restrict & self._all_bits
+
+            genres = []
+            for genre_id, bits in self._genre_bits.items():
+                count = (bits & mask).bit_count()
+                if count:
+                    genres.append({"value": self._genre_names.get(genre_id, str(genre_id)), "count": count})
+            genres.sort(key=lambda facet: (-facet["count"], facet["value"]))
+
+            years = {}
+            decades: Dict[str, int] = {}
+            for year, bits in self._year_bits.items():
+                count = (bits & mask).bit_count()
+                if count:
+                    years[year] = count
+                    label = decade_label(year)
+                    decades[label] = decades.get(label, 0) + count
+
+            return {
+                "total": mask.bit_count(),
+                "genres": genres,
+                "decades": [{"value": label, "count": decades[label]} for label in sorted(decades, reverse=True)],
+                "years": [{"value": year, "count": years[year]} for year in sorted(years, reverse=True)],
+            }
+
+
+# Shared index used by the API process
+facet_index = FacetIndex()
+
+
+@events.subscribe(events.MOVIE_CREATED)
+def _add_created_movie(db: Session, movie: Movie, **_):
+    facet_index.add_movies(db, [movie.id])
+
+
+@events.subscribe(events.MOVIES_IMPORTED)
+def _add_imported_movies(db: Session, movie_ids, **_):
+    if len(movie_ids) > events.REBUILD_THRESHOLD:
+        facet_index.invalidate()
+    else:
+        facet_index.add_movies(db, movie_ids)
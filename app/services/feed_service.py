@@ -0,0 +1,306 @@
+"""
+"Reviews from my rooms" feeds.
+
+A new review is fanned out on write: one feed_entries row (reader, review)
+per user sharing a room with its author, so reading a feed is a single
+range scan of the reader's timeline. Each timeline's length is kept in
+feed_timelines, and a fan-out cuts the timelines it pushed past
+FEED_MAX_LENGTH + FEED_TRIM_SLACK back to FEED_MAX_LENGTH. Rooms with more than FEED_FANOUT_MAX_MEMBERS
+members are not fanned out; their members' reviews are merged in when a
+member reads their feed.
+
+Timelines are not rewritten when membership changes: a new member sees
+reviews written after they joined, and entries from former roommates
+age out.
+"""
+import os
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, delete, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import FeedEntry, FeedTimeline, Review, room_members
+from app.pagination import KeysetOrder, REVIEW_NEWEST_ORDER, encode_cursor, keyset_paginate
+from app.services import events
+from app.services.room_service import RoomService
+
+load_dotenv()
+
+FEED_MAX_LENGTH = int(os.getenv("FEED_MAX_LENGTH", "500"))
+FEED_FANOUT_MAX_MEMBERS = int(os.getenv("FEED_FANOUT_MAX_MEMBERS", "1000"))
+FEED_TRIM_SLACK = int(os.getenv("FEED_TRIM_SLACK", "100"))
+
+FEED_ORDER: KeysetOrder = ((FeedEntry.created_at, True), (FeedEntry.review_id, True))
+
+# (user_id, movie_id) pairs per fan-out statement of an import
+_IMPORT_CHUNK = 500
+
+_UPSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+class LargeRooms:
+    """IDs of the rooms too large to fan out, kept in step with membership changes."""
+
+    def __init__(self, max_members: int):
+        self.max_members = max_members
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._ids = set()
+        self._loaded = False
+
+    def ensure_loaded(self, db: Session) -> FrozenSet[int]:
+        """The large room IDs, loaded with one grouped query on first use."""
+        with self._lock:
+            if not self._loaded:
+                self._ids = {
+                    room_id for (room_id,) in db.query(room_members.c.room_id).group_by(
+                        room_members.c.room_id
+                    ).having(func.count(room_members.c.user_id) > self.max_members)
+                }
+                self._loaded = True
+            return frozenset(self._ids)
+
+    def update(self, db: Session, room_id: int):
+        """Re-check one room's size after a member joined or left."""
+        with self._lock:
+            if not self._loaded:
+                return
+            if RoomService.member_counts(db, [room_id])[room_id] > self.max_members:
+                self._ids.add(room_id)
+            else:
+                self._ids.discard(room_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+
+# Shared large-room set used by the API process
+large_rooms = LargeRooms(FEED_FANOUT_MAX_MEMBERS)
+
+
+class FeedService:
+    """Writes and reads per-user feed timelines."""
+
+    @staticmethod
+    def fan_out(db: Session, reviews) -> int:
+        """
+        Add the reviews matching the reviews filter (a Review criterion) to
+        the timelines of their authors' roommates, with one INSERT ... SELECT,
+        then trim the timelines this pushed past FEED_MAX_LENGTH +
+        FEED_TRIM_SLACK. Commits.
+        Returns the number of entries written.
+        """
+        author_rooms = room_members.alias("author_rooms")
+        readers = room_members.alias("readers")
+        recipients = select(readers.c.user_id, Review.id, Review.created_at).join(
+            author_rooms, author_rooms.c.user_id == Review.user_id
+        ).join(
+            readers, readers.c.room_id == author_rooms.c.room_id
+        ).where(reviews, readers.c.user_id != Review.user_id)
+        large = large_rooms.ensure_loaded(db)
+        if large:
+            recipients = recipients.where(author_rooms.c.room_id.notin_(large))
+        recipients = recipients.distinct()
+
+        table = FeedEntry.__table__
+        recipient_ids = db.execute(
+            table.insert().from_select(
+                ["user_id", "review_id", "created_at"], recipients
+            ).returning(table.c.user_id)
+        ).scalars().all()
+        for user_id in FeedService._add_lengths(db, Counter(recipient_ids)):
+            FeedService._trim_timeline(db, user_id)
+        db.commit()
+        return len(recipient_ids)
+
+    @staticmethod
+    def _add_lengths(db: Session, deltas: Dict[int, int]) -> List[int]:
+        """
+        Add entry counts to the users' timeline lengths. Does not commit.
+        Returns the users whose timelines are now past FEED_MAX_LENGTH +
+        FEED_TRIM_SLACK.
+        """
+        if not deltas:
+            return []
+        table = FeedTimeline.__table__
+        rows = [{"user_id": user_id, "length": delta} for user_id, delta in deltas.items()]
+        upsert = _UPSERTS.get(db.get_bind().dialect.name)
+        if upsert is not None:
+            statement = upsert(table)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.user_id],
+                set_={"length": table.c.length + statement.excluded.length}
+            ), rows)
+        else:
+            for row in rows:
+                if not db.execute(table.update().where(table.c.user_id == row["user_id"]).values(
+                    length=table.c.length + row["length"]
+                )).rowcount:
+                    db.execute(table.insert().values(**row))
+
+        user_ids = list(deltas)
+        over = []
+        for start in range(0, len(user_ids), _IMPORT_CHUNK):
+            over += db.execute(select(table.c.user_id).where(
+                table.c.user_id.in_(user_ids[start:start + _IMPORT_CHUNK]),
+                table.c.length > FEED_MAX_LENGTH + FEED_TRIM_SLACK
+            )).scalars().all()
+        return over
+
+    @staticmethod
+    def _trim_timeline(db: Session, user_id: int) -> int:
+        """
+        Drop the user's entries past FEED_MAX_LENGTH and update the
+        timeline's length. Does not commit. Returns the entries deleted.
+        """
+        table = FeedEntry.__table__
+        # The timeline's first entry past the cap; uncorrelated, so evaluated once
+        past_cap = select(table.c.created_at, table.c.review_id).where(
+            table.c.user_id == user_id
+        ).order_by(
+            table.c.created_at.desc(), table.c.review_id.desc()
+        ).offset(FEED_MAX_LENGTH).limit(1).subquery()
+        cutoff_at = select(past_cap.c.created_at).scalar_subquery()
+        cutoff_id = select(past_cap.c.review_id).scalar_subquery()
+        deleted = db.execute(delete(table).where(
+            table.c.user_id == user_id,
+            or_(
+                table.c.created_at < cutoff_at,
+                and_(table.c.created_at == cutoff_at, table.c.review_id <= cutoff_id),
+            )
+        )).rowcount
+        if deleted:
+            timelines = FeedTimeline.__table__
+            db.execute(timelines.update().where(timelines.c.user_id == user_id).values(
+                length=timelines.c.length - deleted
+            ))
+        return deleted
+
+    @staticmethod
+    def trim(db: Session, slack: int = FEED_TRIM_SLACK, batch_size: int = 1000) -> int:
+        """
+        Cut every timeline holding more than FEED_MAX_LENGTH + slack entries
+        back to FEED_MAX_LENGTH, one batch of users per transaction, counting
+        entries rather than trusting feed_timelines.
+        Returns the number of entries deleted.
+        """
+        table = FeedEntry.__table__
+        user_ids = db.execute(
+            select(table.c.user_id).group_by(table.c.user_id).having(func.count() > FEED_MAX_LENGTH + slack)
+        ).scalars().all()
+        deleted = 0
+        for start in range(0, len(user_ids), batch_size):
+            for user_id in user_ids[start:start + batch_size]:
+                deleted += FeedService._trim_timeline(db, user_id)
+            db.commit()
+        return deleted
+
+    @staticmethod
+    def remove_review(db: Session, review_id: int):
+        """Delete a review's entries, in the caller's transaction (does not commit)."""
+        table = FeedEntry.__table__
+        user_ids = db.execute(
+            delete(table).where(table.c.review_id == review_id).returning(table.c.user_id)
+        ).scalars().all()
+        timelines = FeedTimeline.__table__
+        for start in range(0, len(user_ids), _IMPORT_CHUNK):
+            db.execute(timelines.update().where(
+                timelines.c.user_id.in_(user_ids[start:start + _IMPORT_CHUNK])
+            ).values(length=timelines.c.length - 1))
+
+    @staticmethod
+    def get_feed(
+        db: Session,
+        user_id: int,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Review], Optional[str]]:
+        """
+        One page of the user's feed, newest first, with review authors loaded.
+        Reviews from the user's large rooms are merged in by a second query.
+        Returns (reviews, cursor of the next page or None).
+        """
+        entries = keyset_paginate(
+            db.query(FeedEntry).options(
+                joinedload(FeedEntry.review, innerjoin=True).joinedload(Review.user)
+            ).filter(FeedEntry.user_id == user_id),
+            FEED_ORDER, limit, cursor=cursor
+        )
+        reviews = [entry.review for entry in entries]
+
+        large = large_rooms.ensure_loaded(db)
+        if large:
+            room_ids = [
+                room_id for (room_id,) in db.query(room_members.c.room_id).filter(
+                    room_members.c.user_id == user_id, room_members.c.room_id.in_(large)
+                )
+            ]
+            if room_ids:
+                members = select(room_members.c.user_id).where(room_members.c.room_id.in_(room_ids))
+                pulled = keyset_paginate(
+                    db.query(Review).options(joinedload(Review.user)).filter(
+                        Review.user_id.in_(members), Review.user_id != user_id
+                    ),
+                    REVIEW_NEWEST_ORDER, limit, cursor=cursor
+                )
+                merged = {review.id: review for review in reviews + pulled}
+                reviews = sorted(merged.values(), key=lambda review: (review.created_at, review.id), reverse=True)
+                reviews = reviews[:limit]
+
+        next_cursor = None
+        if len(reviews) == limit:
+            next_cursor = encode_cursor([reviews[-1].created_at, reviews[-1].id])
+        return reviews, next_cursor
+
+    @staticmethod
+    def rebuild(db: Session, batch_size: int = 5000) -> int:
+        """
+        Rebuild every timeline from the reviews table, fanning reviews out
+        one range of review IDs per transaction, then trim every timeline
+        to FEED_MAX_LENGTH.
+        Returns the number of entries kept.
+        """
+        db.execute(delete(FeedEntry.__table__))
+        db.execute(delete(FeedTimeline.__table__))
+        db.commit()
+        large_rooms.invalidate()
+        written = 0
+        last_id = 0
+        while True:
+            ids = db.execute(
+                select(Review.id).where(Review.id > last_id).order_by(Review.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            written += FeedService.fan_out(db, Review.id.between(ids[0], ids[-1]))
+            last_id = ids[-1]
+        return written - FeedService.trim(db, slack=0)
+
+
+@events.subscribe(events.REVIEW_CHANGED)
+def _fan_out_review(db: Session, review_id: int, old_rating, new_rating, **_):
+    # Edits keep their entries (the review row is read with the feed)
+    if old_rating is None and new_rating is not None:
+        FeedService.fan_out(db, Review.id == review_id)
+
+
+@events.subscribe(events.REVIEWS_IMPORTED)
+def _fan_out_imported_reviews(db: Session, changes, **_):
+    created = [(user_id, movie_id) for user_id, movie_id, old_rating, _ in changes if old_rating is None]
+    for start in range(0, len(created), _IMPORT_CHUNK):
+        FeedService.fan_out(
+            db, tuple_(Review.user_id, Review.movie_id).in_(created[start:start + _IMPORT_CHUNK])
+        )
+
+
+@events.subscribe(events.ROOM_MEMBERSHIP_CHANGED)
+def _recheck_room_size(db: Session, room_id: int, **_):
+    large_rooms.update(db, room_id)
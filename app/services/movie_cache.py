@@ -0,0 +1,334 @@
+"""Read-through cache of validated MovieResponse data."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from app.models import Movie
+from app.schemas import MovieResponse
+from app.services import events
+from app.services.cache import TTLCache
+
+load_dotenv()
+
+
+@dataclass
+class CachedMovie:
+    """
+    A validated MovieResponse plus the row's version markers, so cached
+    movies can stand in for Movie rows when computing ETags.
+    """
+    __tablename__ = "movies"
+
+    id: int
+    version: Optional[int]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    data: MovieResponse
+
+    @classmethod
+    def from_movie(cls, movie: Movie) -> "CachedMovie":
+        return cls(
+            id=movie.id,
+            version=movie.version,
+            created_at=movie.created_at,
+            updated_at=movie.updated_at,
+            data=MovieResponse.model_validate(movie),
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "version": self.version,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "data": self.data.model_dump(mode="json"),
+        })
+
+    @classmethod
+    def from_json(cls, movie_id: int, raw: str) -> "CachedMovie":
+        payload = json.loads(raw)
+        return cls(
+            id=movie_id,
+            version=payload["version"],
+            created_at=datetime.fromisoformat(payload["created_at"]) if payload["created_at"] else None,
+            updated_at=datetime.fromisoformat(payload["updated_at"]) if payload["updated_at"] else None,
+            data=MovieResponse.model_validate(payload["data"]),
+        )
+
+
+class InProcessBackend:
+    """LRU + TTL cache in this process's memory (the default)."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get_many(self, movie_ids: Iterable[int]) -> Dict[int, CachedMovie]:
+        found = {}
+        for movie_id in movie_ids:
+            cached = self._cache.get(movie_id)
+            if cached is not None:
+                found[movie_id] = cached
+        return found
+
+    def versions(self, movie_ids: Iterable[int]) -> dict:
+        return {movie_id: self._cache.version(movie_id) for movie_id in movie_ids}
+
+    def set_many(self, movies: List[CachedMovie], versions: dict):
+        for movie in movies:
+            # Skipped if the movie was invalidated while it was being loaded
+            self._cache.set(movie.id, movie, group=movie.id, version=versions.get(movie.id))
+
+    def delete(self, movie_id: int):
+        self._cache.invalidate_group(movie_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        # Approximate: size of the cached payloads as JSON
+        stats["memory_bytes"] = sum(len(movie.to_json()) for movie in self._cache.values())
+        return stats
+
+
+class SharedSQLiteBackend:
+    """
+    LRU + TTL cache in a local SQLite file shared by every worker process
+    on the host, so invalidations made by one worker are seen by all.
+
+    Rows keep the movie's version, and an invalidation leaves an expired
+    tombstone recording when it happened. A write only lands if it is at
+    least as new as the cached version and its load started after the
+    last invalidation, so a reader that loaded a movie before a
+    concurrent write committed cannot put the stale row back.
+    """
+
+    _COLUMNS = {"movie_id", "value", "version", "expires_at", "accessed_at", "invalidated_at"}
+
+    name = "sqlite"
+
+    def __init__(self, path: str, maxsize: int, ttl: float):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        with self._connection() as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(movie_cache)")}
+            if columns and columns != self._COLUMNS:
+                # Cache file from an older version: its rows can be dropped
+                conn.execute("DROP TABLE movie_cache")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS movie_cache ("
+                "movie_id INTEGER PRIMARY KEY, value TEXT, version INTEGER, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+                "invalidated_at REAL NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_movie_cache_accessed_at ON movie_cache (accessed_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hits: int = 0, misses: int = 0, evictions: int = 0, invalidations: int = 0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+            self.invalidations += invalidations
+
+    def get_many(self, movie_ids: Iterable[int]) -> Dict[int, CachedMovie]:
+        movie_ids = list(movie_ids)
+        if not movie_ids:
+            return {}
+        now = time.time()
+        conn = self._connection()
+        placeholders = ",".join("?" * len(movie_ids))
+        rows = conn.execute(
+            f"SELECT movie_id, value FROM movie_cache "
+            f"WHERE movie_id IN ({placeholders}) AND expires_at > ?",
+            [*movie_ids, now]
+        ).fetchall()
+        if rows:
+            conn.execute(
+                f"UPDATE movie_cache SET accessed_at = ? WHERE movie_id IN ({','.join('?' * len(rows))})",
+                [now, *[movie_id for movie_id, _ in rows]]
+            )
+        self._count(hits=len(rows), misses=len(movie_ids) - len(rows))
+        return {movie_id: CachedMovie.from_json(movie_id, value) for movie_id, value in rows}
+
+    def versions(self, movie_ids: Iterable[int]) -> dict:
+        # When the load started; set_many drops movies invalidated since
+        started = time.time()
+        return {movie_id: started for movie_id in movie_ids}
+
+    def set_many(self, movies: List[CachedMovie], versions: dict):
+        if not movies:
+            return
+        now = time.time()
+        conn = self._connection()
+        conn.executemany(
+            "INSERT INTO movie_cache (movie_id, value, version, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (movie_id) DO UPDATE SET value = excluded.value, version = excluded.version, "
+            "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at "
+            "WHERE coalesce(excluded.version, 0) >= coalesce(movie_cache.version, 0) "
+            "AND movie_cache.invalidated_at < ?",
+            [
+                (movie.id, movie.to_json(), movie.version, now + self.ttl, now, versions.get(movie.id, now))
+                for movie in movies
+            ]
+        )
+        (size,) = conn.execute("SELECT COUNT(*) FROM movie_cache").fetchone()
+        if size > self.maxsize:
+            # Evict the least recently used tenth in one statement
+            excess = size - self.maxsize + self.maxsize // 10
+            conn.execute(
+                "DELETE FROM movie_cache WHERE movie_id IN "
+                "(SELECT movie_id FROM movie_cache ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+            self._count(evictions=excess)
+
+    def delete(self, movie_id: int):
+        # Tombstone: expired (and first to be evicted) but remembers the invalidation
+        self._connection().execute(
+            "INSERT INTO movie_cache (movie_id, value, version, expires_at, accessed_at, invalidated_at) "
+            "VALUES (?, NULL, NULL, 0, 0, ?) "
+            "ON CONFLICT (movie_id) DO UPDATE SET value = NULL, expires_at = 0, accessed_at = 0, "
+            "invalidated_at = excluded.invalidated_at",
+            (movie_id, time.time())
+        )
+        self._count(invalidations=1)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM movie_cache")
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        (size,) = conn.execute("SELECT COUNT(*) FROM movie_cache WHERE value IS NOT NULL").fetchone()
+        (page_count,) = conn.execute("PRAGMA page_count").fetchone()
+        (page_size,) = conn.execute("PRAGMA page_size").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                # Counters are for this process; the store is shared
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "memory_bytes": page_count * page_size,
+            }
+
+
+class _WithMovie:
+    """Attribute proxy replacing an ORM object's movie with cached data."""
+
+    def __init__(self, obj, movie: Optional[MovieResponse]):
+        self._obj = obj
+        self.movie = movie
+
+    def __getattr__(self, name):
+        return getattr(self._obj, name)
+
+
+def with_movies(items: Iterable, movies: Dict[int, CachedMovie]) -> list:
+    """Rooms/reviews whose movie attribute is taken from movies (see MovieCache.get_many)."""
+    return [
+        _WithMovie(item, movies[item.movie_id].data if item.movie_id in movies else None)
+        for item in items
+    ]
+
+
+def responses_with_movies(schema, items: Iterable, movies: Dict[int, CachedMovie]) -> list:
+    """
+    Validate rooms/reviews into schema, taking each nested movie from
+    movies instead of lazy-loading the row.
+    """
+    return [schema.model_validate(item) for item in with_movies(items, movies)]
+
+
+class MovieCache:
+    """Read-through movie cache in front of the movies table."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get_many(self, db: Session, movie_ids: Iterable[int]) -> Dict[int, CachedMovie]:
+        """Cached movies by ID, loading any misses in one query."""
+        movie_ids = list(dict.fromkeys(movie_ids))
+        found = self.backend.get_many(movie_ids)
+        missing = [movie_id for movie_id in movie_ids if movie_id not in found]
+        if missing:
+            versions = self.backend.versions(missing)
+            loaded = [
+                CachedMovie.from_movie(movie)
+                for movie in db.query(Movie).filter(Movie.id.in_(missing)).all()
+            ]
+            self.backend.set_many(loaded, versions)
+            found.update((movie.id, movie) for movie in loaded)
+        return found
+
+    def get(self, db: Session, movie_id: int) -> Optional[CachedMovie]:
+        return self.get_many(db, [movie_id]).get(movie_id)
+
+    def invalidate(self, movie_id: int):
+        self.backend.delete(movie_id)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        return {"backend": self.backend.name, **self.backend.stats()}
+
+
+def _create_backend():
+    maxsize = int(os.getenv("MOVIE_CACHE_SIZE", "10000"))
+    ttl = float(os.getenv("MOVIE_CACHE_TTL", "300"))
+    if os.getenv("MOVIE_CACHE_BACKEND", "memory") == "sqlite":
+        return SharedSQLiteBackend(os.getenv("MOVIE_CACHE_PATH", "./movie_cache.db"), maxsize, ttl)
+    return InProcessBackend(maxsize, ttl)
+
+
+# Shared cache used by the API process
+movie_cache = MovieCache(_create_backend())
+
+
+@events.subscribe(events.MOVIE_CREATED)
+def _refresh_created_movie(movie: Movie, **_):
+    movie_cache.invalidate(movie.id)
+
+
+@events.subscribe(events.REVIEW_CHANGED)
+def _invalidate_rated_movie(movie_id: int, **_):
+    # The review write has just changed the movie's rating totals
+    movie_cache.invalidate(movie_id)
+
+
+@events.subscribe(events.REVIEWS_IMPORTED)
+def _invalidate_rated_movies(changes, **_):
+    for movie_id in {movie_id for _, movie_id, _, _ in changes}:
+        movie_cache.invalidate(movie_id)
@@ -0,0 +1,282 @@
+"""Incremental maintenance of per-movie rating aggregates."""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import Movie, MovieRatingStats, Review
+
+# Ratings with their own histogram bucket (MovieRatingStats.rating_1 ... rating_10)
+RATING_BUCKETS = range(1, 11)
+
+_UPSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def _format_average(dialect_name: str, value):
+    """SQL rendering of an average as the "7.50"-style average_rating string."""
+    if dialect_name == "postgresql":
+        return func.to_char(value, "FM990.00")
+    return func.printf("%.2f", value)
+
+
+def _bucket(rating: int) -> str:
+    return f"rating_{rating}"
+
+
+# Per-movie deltas kept in movie_rating_stats: review count, rating sum and each bucket
+_DELTA_COLUMNS = ("review_count", "rating_sum") + tuple(_bucket(rating) for rating in RATING_BUCKETS)
+
+
+def _movie_deltas(changes: Iterable[Tuple[int, Optional[int], Optional[int]]]) -> Dict[int, dict]:
+    """
+    Sum review changes (movie_id, old_rating, new_rating) per movie.
+    reviewed marks movies with a new or edited review, existing those
+    where a review was already counted before.
+    """
+    deltas: Dict[int, dict] = {}
+    for movie_id, old_rating, new_rating in changes:
+        delta = deltas.get(movie_id)
+        if delta is None:
+            delta = deltas[movie_id] = dict.fromkeys(_DELTA_COLUMNS, 0)
+            delta.update(movie_id=movie_id, reviewed=0, existing=False)
+        delta["review_count"] += (new_rating is not None) - (old_rating is not None)
+        delta["rating_sum"] += (new_rating or 0) - (old_rating or 0)
+        if old_rating in RATING_BUCKETS:
+            delta[_bucket(old_rating)] -= 1
+        if new_rating in RATING_BUCKETS:
+            delta[_bucket(new_rating)] += 1
+        if new_rating is not None:
+            delta["reviewed"] = 1
+        if old_rating is not None:
+            delta["existing"] = True
+    return deltas
+
+
+class RatingService:
+    """
+    Keeps Movie.rating_sum/rating_count, the average columns and the
+    movie_rating_stats read model in step with reviews.
+    """
+
+    @staticmethod
+    def apply_change(
+        db: Session,
+        movie_id: int,
+        old_rating: Optional[int],
+        new_rating: Optional[int]
+    ):
+        """
+        Apply one review write to its movie's aggregates with atomic
+        UPDATE ... SET x = x + :delta statements, in the caller's transaction
+        (the caller commits together with the review).
+        old_rating is None for a new review, new_rating None for a deletion.
+        """
+        RatingService.apply_changes(db, [(movie_id, old_rating, new_rating)])
+
+    @staticmethod
+    def apply_changes(db: Session, changes: Iterable[Tuple[int, Optional[int], Optional[int]]]):
+        """
+        Apply many review writes, given as (movie_id, old_rating, new_rating),
+        summed per movie: one executemany UPDATE per table, with one
+        parameter set per affected movie. Does not commit.
+        """
+        deltas = list(_movie_deltas(changes).values())
+        if not deltas:
+            return
+        RatingService._apply_to_stats(db, deltas)
+
+        params = [
+            {"m_id": delta["movie_id"], "d_sum": delta["rating_sum"], "d_count": delta["review_count"]}
+            for delta in deltas
+            if delta["rating_sum"] or delta["review_count"]
+        ]
+        if not params:
+            return
+        table = Movie.__table__
+        new_sum = table.c.rating_sum + bindparam("d_sum")
+        new_count = table.c.rating_count + bindparam("d_count")
+        # SET expressions all see the old row, so the average uses the new totals explicitly
+        average = func.round(new_sum * literal(1.0) / new_count, 2)
+        db.execute(
+            table.update().where(table.c.id == bindparam("m_id")).values(
+                rating_sum=new_sum,
+                rating_count=new_count,
+                # NULL without reviews (SQLite's printf would format NULL as "0.00")
+                average_rating_value=case((new_count > 0, average), else_=None),
+                average_rating=case(
+                    (new_count > 0, _format_average(db.get_bind().dialect.name, average)), else_=None
+                ),
+            ),
+            params
+        )
+
+    @staticmethod
+    def _apply_to_stats(db: Session, deltas: List[dict]):
+        """
+        Move reviews between histogram buckets of their movies' stats rows,
+        creating a row on its movie's first review. Rows missing for older
+        reviews are left to rebuild_stats().
+        """
+        table = MovieRatingStats.__table__
+        touched = {"version": table.c.version + 1, "updated_at": func.now()}
+        update = table.update().where(table.c.movie_id == bindparam("s_id")).values(
+            **{name: table.c[name] + bindparam(f"d_{name}") for name in _DELTA_COLUMNS},
+            **touched,
+            last_reviewed_at=case((bindparam("reviewed") > 0, func.now()), else_=table.c.last_reviewed_at),
+        )
+        # Only movies whose changes are all new reviews may start a row from the deltas
+        new_rows = [delta for delta in deltas if not delta["existing"]]
+        updates = [delta for delta in deltas if delta["existing"]]
+
+        upsert = _UPSERTS.get(db.get_bind().dialect.name)
+        if new_rows and upsert is not None:
+            statement = upsert(table).values(last_reviewed_at=func.now())
+            db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[table.c.movie_id],
+                    set_={
+                        **{name: table.c[name] + statement.excluded[name] for name in _DELTA_COLUMNS},
+                        **touched,
+                        "last_reviewed_at": func.now(),
+                    }
+                ),
+                [{"movie_id": delta["movie_id"], **{name: delta[name] for name in _DELTA_COLUMNS}} for delta in new_rows]
+            )
+        else:
+            updates += new_rows
+
+        for delta in updates:
+            params = {
+                "s_id": delta["movie_id"],
+                "reviewed": delta["reviewed"],
+                **{f"d_{name}": delta[name] for name in _DELTA_COLUMNS},
+            }
+            if db.execute(update, params).rowcount or delta["existing"]:
+                continue
+            db.execute(table.insert().values(
+                movie_id=delta["movie_id"], last_reviewed_at=func.now(),
+                **{name: delta[name] for name in _DELTA_COLUMNS}
+            ))
+
+    @staticmethod
+    def get_stats(db: Session, movie_id: int) -> Optional[MovieRatingStats]:
+        """The movie's stats row, or None if it has no reviews counted yet."""
+        return db.get(MovieRatingStats, movie_id)
+
+    @staticmethod
+    def stats_response(movie_id: int, stats: Optional[MovieRatingStats]) -> dict:
+        """MovieRatingStatsResponse fields for a stats row (zeros without one)."""
+        count = stats.review_count if stats else 0
+        total = stats.rating_sum if stats else 0
+        return {
+            "movie_id": movie_id,
+            "review_count": count,
+            "rating_sum": total,
+            "average_rating": round(total / count, 2) if count else None,
+            "distribution": [
+                {"rating": rating, "count": getattr(stats, _bucket(rating)) if stats else 0}
+                for rating in RATING_BUCKETS
+            ],
+            "last_reviewed_at": stats.last_reviewed_at if stats else None,
+        }
+
+    @staticmethod
+    def rebuild_stats(db: Session, batch_size: int = 5000) -> int:
+        """
+        Recompute movie_rating_stats from the reviews table, one range of
+        movie IDs per transaction: the range's rows are deleted and
+        re-inserted from a single GROUP BY over its reviews.
+        Returns the number of movies with reviews.
+        """
+        table = MovieRatingStats.__table__
+        columns = [_bucket(rating) for rating in RATING_BUCKETS] + [
+            "movie_id", "review_count", "rating_sum", "last_reviewed_at", "updated_at"
+        ]
+        rebuilt = 0
+        last_id = 0
+        while True:
+            ids = db.execute(
+                select(Movie.id).where(Movie.id > last_id).order_by(Movie.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            in_range = Review.movie_id.between(ids[0], ids[-1])
+            aggregate = select(
+                *[func.sum(case((Review.rating == rating, 1), else_=0)) for rating in RATING_BUCKETS],
+                Review.movie_id,
+                func.count(Review.id),
+                func.sum(Review.rating),
+                func.max(func.coalesce(Review.updated_at, Review.created_at)),
+                func.now(),
+            ).where(in_range).group_by(Review.movie_id)
+
+            db.execute(delete(table).where(table.c.movie_id.between(ids[0], ids[-1])))
+            rebuilt += db.execute(table.insert().from_select(columns, aggregate)).rowcount
+            db.commit()
+            last_id = ids[-1]
+        return rebuilt
+
+    @staticmethod
+    def reconcile(db: Session, batch_size: int = 5000) -> tuple[int, int]:
+        """
+        Recompute rating_sum/rating_count from the reviews table and repair
+        movies whose counters drifted (or predate them).
+        A repair only applies if the counters did not change since they were
+        read, so concurrent review writes are never overwritten.
+        Returns (movies checked, movies repaired).
+        """
+        table = Movie.__table__
+        repair = table.update().where(
+            table.c.id == bindparam("movie_id"),
+            table.c.rating_sum == bindparam("old_sum"),
+            table.c.rating_count == bindparam("old_count"),
+        ).values(
+            rating_sum=bindparam("new_sum"),
+            rating_count=bindparam("new_count"),
+            average_rating=bindparam("average"),
+            average_rating_value=bindparam("average_value"),
+        )
+
+        checked = repaired = 0
+        last_id = 0
+        while True:
+            ids = select(Movie.id).where(Movie.id > last_id).order_by(Movie.id).limit(batch_size).subquery()
+            totals = select(
+                Review.movie_id,
+                func.sum(Review.rating).label("total"),
+                func.count(Review.id).label("reviews"),
+            ).where(Review.movie_id.in_(select(ids.c.id))).group_by(Review.movie_id).subquery()
+            # Counters and totals are read in one statement, i.e. one snapshot
+            rows = db.execute(
+                select(
+                    Movie.id, Movie.rating_sum, Movie.rating_count, Movie.average_rating,
+                    func.coalesce(totals.c.total, 0), func.coalesce(totals.c.reviews, 0),
+                ).join(ids, ids.c.id == Movie.id).outerjoin(
+                    totals, totals.c.movie_id == Movie.id
+                ).order_by(Movie.id)
+            ).all()
+            if not rows:
+                break
+
+            params = []
+            for movie_id, old_sum, old_count, old_average, total, reviews in rows:
+                drifted = (old_sum, old_count) != (total, reviews)
+                if drifted or (not reviews and old_average is not None):
+                    params.append({
+                        "movie_id": movie_id,
+                        "old_sum": old_sum,
+                        "old_count": old_count,
+                        "new_sum": total,
+                        "new_count": reviews,
+                        "average": f"{total / reviews:.2f}" if reviews else None,
+                        "average_value": round(total / reviews, 2) if reviews else None,
+                    })
+            if params:
+                result = db.execute(repair, params)
+                repaired += result.rowcount
+            db.commit()
+            checked += len(rows)
+            last_id = rows[-1][0]
+        return checked, repaired
@@ -1,150 +1,156 @@
 """Movie recommendation service."""
-from typing import List, Optional
+import os
+from typing import Dict, List, Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from dotenv import load_dotenv
 
-from app.models import Movie, UserPreferences, Room, User
+from app.models import Movie, UserPreferences, PrecomputedRecommendation
+from app.schemas import MovieResponse
+from app.services import events
+from app.services.cache import TTLCache
+from app.services.movie_cache import movie_cache
+from app.services.collaborative_filtering import item_item_model
+from app.services.recommendation_engine import recommendation_engine
+from app.services.seen_movies import seen_movies
+from app.services.similarity_index import similarity_index
+
+load_dotenv()
+
+RECOMMENDATION_STRATEGIES = ("content", "collaborative")
+
+# Ranked (movie_id, reason) lists keyed by (user_id, strategy, limit)
+recommendation_cache = TTLCache(
+    maxsize=int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("RECOMMENDATION_CACHE_TTL", "600"))
+)
 
 
 class RecommendationService:
     """Service for generating movie recommendations."""
 
+    @staticmethod
+    def _load_movies(db: Session, movie_ids: List[int]) -> Dict[int, MovieResponse]:
+        """Load movies by ID through the movie cache."""
+        return {
+            movie_id: cached.data
+            for movie_id, cached in movie_cache.get_many(db, movie_ids).items()
+        }
+
     @staticmethod
     def get_recommendations(
         db: Session,
         user_id: int,
-        limit: int = 10
-    ) -> List[tuple[Movie, str]]:
+        limit: int = 10,
+        strategy: str = "content"
+    ) -> List[tuple[MovieResponse, str]]:
         """
         Get personalized movie recommendations for a user.
-        Returns list of tuples: (Movie, reason_string)
+        Rankings are cached per user until one of their inputs changes.
+        Returns list of tuples: (MovieResponse, reason_string)
+        """
+        key = (user_id, strategy, limit)
+        ranked = recommendation_cache.get(key)
+        if ranked is None:
+            version = recommendation_cache.version(user_id)
+            if strategy == "collaborative":
+                ranked = RecommendationService._rank_collaborative(db, user_id, limit)
+            else:
+                ranked = RecommendationService._rank_content(db, user_id, limit)
+            recommendation_cache.set(key, ranked, group=user_id, version=version)
+
+        movies = RecommendationService._load_movies(
+            db, [movie_id for movie_id, _ in ranked]
+        )
+        return [
+            (movies[movie_id], reason)
+            for movie_id, reason in ranked
+            if movie_id in movies
+        ]
+
+    @staticmethod
+    def _rank_content(db: Session, user_id: int, limit: int) -> List[tuple[int, str]]:
+        """
+        Rank movies by how well they match the user's preferences.
+        Returns list of tuples: (movie_id, reason_string)
         """
         # Get user preferences
         preferences = db.query(UserPreferences).filter(
             UserPreferences.user_id == user_id
         ).first()
 
-        recommendations = []
-        
-        if preferences:
-            # Build query based on preferences
-            query = db.query(Movie)
-            
-            # Filter by favorite genres if specified
-            if preferences.favorite_genres:
-                genres = [g.strip() for g in preferences.favorite_genres.split(",")]
-                genre_filters = [
-                    Movie.genre.ilike(f"%{genre}%") for genre in genres
-                ]
-                if genre_filters:
-                    query = query.filter(or_(*genre_filters))
-            
-            # Filter by favorite directors if specified
-            if preferences.favorite_directors:
-                directors = [d.strip() for d in preferences.favorite_directors.split(",")]
-                director_filters = [
-                    Movie.director.ilike(f"%{director}%") for director in directors
-                ]
-                if director_filters:
-                    query = query.filter(or_(*director_filters))
-            
-            # Filter by favorite actors if specified
-            if preferences.favorite_actors:
-                actors = [a.strip() for a in preferences.favorite_actors.split(",")]
-                actor_filters = [
-                    Movie.cast.ilike(f"%{actor}%") for actor in actors
-                ]
-                if actor_filters:
-                    query = query.filter(or_(*actor_filters))
-            
-            # Filter by minimum rating if specified
-            # Note: We'll filter by rating in the scoring phase since imdb_rating is stored as string
-            
-            # Get movies user hasn't joined rooms for
-            user_room_movie_ids = db.query(Room.movie_id).join(
-                Room.members
-            ).filter(
-                User.id == user_id
-            ).distinct().all()
-            user_room_movie_ids = [r[0] for r in user_room_movie_ids]
-            
-            if user_room_movie_ids:
-                query = query.filter(~Movie.id.in_(user_room_movie_ids))
-            
-            movies = query.limit(limit * 2).all()  # Get more to filter
-            
-            # Score and rank movies
-            scored_movies = []
-            for movie in movies:
-                score = 0
-                reasons = []
-                
-                if preferences.favorite_genres and movie.genre:
-                    for genre in genres:
-                        if genre.lower() in movie.genre.lower():
-                            score += 3
-                            reasons.append(f"Matches your favorite genre: {genre}")
-                            break
-                
-                if preferences.favorite_directors and movie.director:
-                    for director in directors:
-                        if director.lower() in movie.director.lower():
-                            score += 5
-                            reasons.append(f"Directed by {director}")
-                            break
-                
-                if preferences.favorite_actors and movie.cast:
-                    for actor in actors:
-                        if actor.lower() in movie.cast.lower():
-                            score += 4
-                            reasons.append(f"Features {actor}")
-                            break
-                
-                if movie.imdb_rating:
-                    try:
-                        rating = float(movie.imdb_rating)
-                        # Check if meets minimum rating preference
-                        if preferences.min_rating and rating < preferences.min_rating:
-                            continue  # Skip movies below minimum rating
-                        if rating >= 7.0:
-                            score += 2
-                            reasons.append(f"Highly rated ({movie.imdb_rating}/10)")
-                    except (ValueError, TypeError):
-                        pass
-                
-                if score > 0:
-                    reason = "; ".join(reasons[:2]) if reasons else "Based on your preferences"
-                    scored_movies.append((movie, score, reason))
-            
-            # Sort by score and return top results
-            scored_movies.sort(key=lambda x: x[1], reverse=True)
-            recommendations = [(movie, reason) for movie, score, reason in scored_movies[:limit]]
-        
-        # If no preferences or not enough recommendations, add popular movies
+        # Movies from joined rooms and reviewed movies are excluded
+        seen = seen_movies.get(db, user_id)
+
+        # Serve the offline batch results while they are current and cover the request
+        precomputed = db.query(
+            PrecomputedRecommendation.movie_id,
+            PrecomputedRecommendation.reason,
+            PrecomputedRecommendation.computed_at,
+            PrecomputedRecommendation.catalog_version,
+        ).filter(
+            PrecomputedRecommendation.user_id == user_id
+        ).order_by(PrecomputedRecommendation.rank).all()
+        if precomputed and RecommendationService._precomputed_current(db, precomputed[0], preferences):
+            ranked = [(movie_id, reason) for movie_id, reason, _, _ in precomputed if movie_id not in seen]
+            if len(ranked) >= limit:
+                return ranked[:limit]
+
+        # Score the whole catalog in one vectorized pass
+        recommendation_engine.ensure_loaded(db)
+        return recommendation_engine.recommend(preferences, seen, limit)
+
+    @staticmethod
+    def _precomputed_current(db: Session, row, preferences: Optional[UserPreferences]) -> bool:
+        """
+        Whether a user's batch results are still current: no movie was added
+        and their preferences did not change since the run started. Movies
+        seen since are filtered out by the caller.
+        """
+        if row.catalog_version is None or row.computed_at is None:
+            return False
+        if preferences is not None:
+            changed_at = preferences.updated_at or preferences.created_at
+            # Timestamps have second precision: a change in the run's first second counts
+            if changed_at is not None and changed_at >= row.computed_at:
+                return False
+        return row.catalog_version >= (db.query(func.max(Movie.id)).scalar() or 0)
+
+    @staticmethod
+    def _rank_collaborative(db: Session, user_id: int, limit: int) -> List[tuple[int, str]]:
+        """
+        Rank movies by item-item similarity over review ratings.
+        Falls back to preference-based recommendations when the user has
+        too few ratings.
+        Returns list of tuples: (movie_id, reason_string)
+        """
+        seen = seen_movies.get(db, user_id)
+
+        item_item_model.ensure_loaded(db)
+        ranked = item_item_model.recommend(db, user_id, seen, limit)
+
+        titles = {
+            movie_id: cached.data.title
+            for movie_id, cached in movie_cache.get_many(
+                db, [because for _, because in ranked]
+            ).items()
+        }
+        recommendations = [
+            (movie_id, f"Fans of {titles[because]} also liked this")
+            for movie_id, because in ranked
+            if because in titles
+        ]
+
         if len(recommendations) < limit:
-            # Get popular movies (highly rated, not in user's rooms)
-            user_room_movie_ids = db.query(Room.movie_id).join(
-                Room.members
-            ).filter(
-                User.id == user_id
-            ).distinct().all()
-            user_room_movie_ids = [r[0] for r in user_room_movie_ids]
-            
-            popular_query = db.query(Movie).filter(
-                Movie.imdb_rating.isnot(None)
-            )
-            
-            if user_room_movie_ids:
-                popular_query = popular_query.filter(~Movie.id.in_(user_room_movie_ids))
-            
-            popular_movies = popular_query.order_by(
-                Movie.imdb_rating.desc()
-            ).limit(limit - len(recommendations)).all()
-            
-            for movie in popular_movies:
-                reason = f"Highly rated ({movie.imdb_rating}/10)" if movie.imdb_rating else "Popular choice"
-                recommendations.append((movie, reason))
-        
+            chosen = {movie_id for movie_id, _ in recommendations}
+            for movie_id, reason in RecommendationService._rank_content(
+                db, user_id, limit + len(chosen)
+            ):
+                if len(recommendations) >= limit:
+                    break
+                if movie_id not in chosen:
+                    recommendations.append((movie_id, reason))
+
         return recommendations[:limit]
 
     @staticmethod
@@ -152,26 +158,35 @@ class RecommendationService:
         db: Session,
         movie_id: int,
         limit: int = 5
-    ) -> List[Movie]:
-        """Get movies similar to a given movie."""
-        movie = db.query(Movie).filter(Movie.id == movie_id).first()
-        if not movie:
-            return []
-        
-        query = db.query(Movie).filter(Movie.id != movie_id)
-        
-        # Find movies with similar genres
-        if movie.genre:
-            genres = [g.strip() for g in movie.genre.split(",")]
-            genre_filters = [
-                Movie.genre.ilike(f"%{genre}%") for genre in genres
-            ]
-            if genre_filters:
-                query = query.filter(or_(*genre_filters))
-        
-        # Find movies by same director
-        if movie.director:
-            query = query.filter(Movie.director.ilike(f"%{movie.director}%"))
-        
-        return query.limit(limit).all()
+    ) -> Optional[List[MovieResponse]]:
+        """
+        Get movies similar to a given movie, most similar first.
+        Returns None while the similarity index is still being built.
+        """
+        similarity_index.ensure_loaded(db)
+        similar_ids = similarity_index.similar(movie_id, limit)
+        if similar_ids is None:
+            return None
+
+        movies = RecommendationService._load_movies(db, similar_ids)
+        return [movies[similar_id] for similar_id in similar_ids if similar_id in movies]
+
+
+@events.subscribe(events.PREFERENCES_UPDATED)
+@events.subscribe(events.ROOM_MEMBERSHIP_CHANGED)
+@events.subscribe(events.REVIEW_CHANGED)
+def _invalidate_user_recommendations(user_id: int, **_):
+    # Precomputed rows are checked for staleness when read (see _precomputed_current)
+    recommendation_cache.invalidate_group(user_id)
+
+
+@events.subscribe(events.REVIEWS_IMPORTED)
+def _invalidate_importing_users(changes, **_):
+    for user_id in {user_id for user_id, _, _, _ in changes}:
+        recommendation_cache.invalidate_group(user_id)
+
 
+@events.subscribe(events.MOVIE_CREATED)
+@events.subscribe(events.MOVIES_IMPORTED)
+def _invalidate_all_recommendations(**_):
+    recommendation_cache.clear()
@@ -0,0 +1,378 @@
+"""In-memory vectorized scoring engine for movie recommendations."""
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Movie, UserPreferences
+from app.services import events
+
+# Score weights (kept in line with the original per-row scoring loop)
+GENRE_WEIGHT = 3
+DIRECTOR_WEIGHT = 5
+ACTOR_WEIGHT = 4
+HIGH_RATING_WEIGHT = 2
+HIGH_RATING_THRESHOLD = 7.0
+
+# Length of the materialized "top N by rating" list used by the popular fallback
+TOP_RATED_SIZE = 1000
+
+
+def split_terms(value: Optional[str]) -> List[str]:
+    """Split a comma-separated field into stripped, non-empty terms."""
+    if not value:
+        return []
+    return [term.strip() for term in value.split(",") if term.strip()]
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a genre or person name for exact, case-insensitive lookup."""
+    return " ".join(name.split()).casefold()
+
+
+def parse_decades(value: Optional[str]) -> List[Tuple[int, int]]:
+    """
+    Parse preferred decades such as "1990s,2000s" (or "90s", "1990") into
+    inclusive (first_year, last_year) ranges, skipping invalid entries.
+    """
+    ranges = []
+    for term in split_terms(value):
+        digits = term.lower().rstrip("s").rstrip("'")
+        if not digits.isdigit():
+            continue
+        start = int(digits)
+        if len(digits) == 2:
+            start += 1900 if start >= 20 else 2000
+        start -= start % 10
+        ranges.append((start, start + 9))
+    return ranges
+
+
+def parse_rating(value: Optional[str]) -> float:
+    """Parse a string rating, returning NaN when missing or invalid."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return float("nan")
+
+
+class FeatureColumns:
+    """
+    Indicator columns for one comma-separated movie attribute.
+
+    Each distinct normalized term (see normalize_name) is a column, stored
+    sparsely as the array of catalog rows that have it set.
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, values: Sequence[Optional[str]]) -> "FeatureColumns":
+        """Build columns for a whole catalog in one pass."""
+        columns = cls()
+        collected: Dict[str, List[int]] = {}
+        for row, value in enumerate(values):
+            for term in {normalize_name(t) for t in split_terms(value)}:
+                collected.setdefault(term, []).append(row)
+        columns.rows = {
+            term: np.asarray(rows, dtype=np.int32)
+            for term, rows in collected.items()
+        }
+        return columns
+
+    def add(self, row: int, value: Optional[str]):
+        """Set the columns for a newly appended catalog row."""
+        for term in {normalize_name(t) for t in split_terms(value)}:
+            existing = self.rows.get(term)
+            if existing is None:
+                self.rows[term] = np.array([row], dtype=np.int32)
+            else:
+                self.rows[term] = np.append(existing, np.int32(row))
+
+    def rows_matching(self, needle: str) -> np.ndarray:
+        """
+        Rows having the term needle, matched exactly after normalization
+        (as the genre/people name_key joins do), so "Drama" does not match
+        "Docudrama".
+        """
+        matched = self.rows.get(normalize_name(needle))
+        return matched if matched is not None else np.empty(0, dtype=np.int32)
+
+
+class RecommendationEngine:
+    """
+    Catalog feature matrix used to score every movie for a user at once.
+
+    The catalog is loaded lazily on first use and extended incrementally as
+    movies are added, so a request only pays for one vectorized pass plus a
+    top-k selection.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.movie_ids = np.empty(0, dtype=np.int64)
+        self.ratings = np.empty(0, dtype=np.float32)
+        self.rating_labels: List[Optional[str]] = []
+        self.years = np.empty(0, dtype=np.int32)  # 0 when unknown
+        self._year_order = np.empty(0, dtype=np.int64)  # rows sorted by year
+        self.top_rated = np.empty(0, dtype=np.int64)  # rows, best rated first
+        self.genres = FeatureColumns()
+        self.directors = FeatureColumns()
+        self.cast = FeatureColumns()
+        self._row_by_id: Dict[int, int] = {}
+        self._max_movie_id = 0
+        self._loaded = False
+
+    def __getstate__(self):
+        # Locks can't be pickled; batch jobs ship the engine to worker processes
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @property
+    def size(self) -> int:
+        return len(self.movie_ids)
+
+    def rebuild(self, db: Session):
+        """Load the whole catalog into memory."""
+        rows = db.query(
+            Movie.id, Movie.year, Movie.genre, Movie.director, Movie.cast,
+            Movie.imdb_rating, Movie.imdb_rating_value
+        ).order_by(Movie.id).all()
+
+        # Index range scan over imdb_rating_value
+        top_rated_ids = db.query(Movie.id).filter(
+            Movie.imdb_rating_value.isnot(None)
+        ).order_by(
+            Movie.imdb_rating_value.desc(), Movie.id
+        ).limit(TOP_RATED_SIZE).all()
+
+        with self._lock:
+            self._reset()
+            self.movie_ids = np.asarray([r.id for r in rows], dtype=np.int64)
+            self.rating_labels = [r.imdb_rating for r in rows]
+            self.ratings = np.asarray(
+                [
+                    r.imdb_rating_value if r.imdb_rating_value is not None
+                    else parse_rating(r.imdb_rating)
+                    for r in rows
+                ],
+                dtype=np.float32
+            )
+            self.years = np.asarray([r.year or 0 for r in rows], dtype=np.int32)
+            self._year_order = np.argsort(self.years, kind="stable")
+            self.genres = FeatureColumns.build([r.genre for r in rows])
+            self.directors = FeatureColumns.build([r.director for r in rows])
+            self.cast = FeatureColumns.build([r.cast for r in rows])
+            self._row_by_id = {int(movie_id): row for row, movie_id in enumerate(self.movie_ids)}
+            self.top_rated = self.rows_for(movie_id for (movie_id,) in top_rated_ids)
+            self._max_movie_id = int(self.movie_ids[-1]) if rows else 0
+            self._loaded = True
+
+    def invalidate(self):
+        """Drop the loaded data; the next ensure_loaded() rebuilds it."""
+        with self._lock:
+            self._reset()
+
+    def ensure_loaded(self, db: Session):
+        """Load the catalog on first use and pick up movies added elsewhere."""
+        with self._lock:
+            if not self._loaded:
+                self.rebuild(db)
+                return
+
+            max_id = db.query(func.max(Movie.id)).scalar() or 0
+            if max_id > self._max_movie_id:
+                new_movies = db.query(Movie).filter(
+                    Movie.id > self._max_movie_id
+                ).order_by(Movie.id).all()
+                for movie in new_movies:
+                    self.add_movie(movie)
+
+    def add_movie(self, movie: Movie):
+        """Append a newly created movie to the feature matrix."""
+        with self._lock:
+            if not self._loaded or movie.id in self._row_by_id:
+                return
+
+            row = self.size
+            self.movie_ids = np.append(self.movie_ids, np.int64(movie.id))
+            rating = (
+                movie.imdb_rating_value if movie.imdb_rating_value is not None
+                else parse_rating(movie.imdb_rating)
+            )
+            self.ratings = np.append(self.ratings, np.float32(rating))
+            self.rating_labels.append(movie.imdb_rating)
+            year = movie.year or 0
+            self.years = np.append(self.years, np.int32(year))
+            position = np.searchsorted(self.years[self._year_order], year, side="right")
+            self._year_order = np.insert(self._year_order, position, row)
+            self.genres.add(row, movie.genre)
+            self.directors.add(row, movie.director)
+            self.cast.add(row, movie.cast)
+            self._row_by_id[movie.id] = row
+            self._max_movie_id = max(self._max_movie_id, movie.id)
+
+            if not np.isnan(self.ratings[row]):
+                keys = -self.ratings[self.top_rated]
+                position = np.searchsorted(keys, -self.ratings[row], side="right")
+                if position < TOP_RATED_SIZE:
+                    self.top_rated = np.insert(self.top_rated, position, row)[:TOP_RATED_SIZE]
+
+    def rows_for(self, movie_ids: Iterable[int]) -> np.ndarray:
+        """Map movie ids to catalog rows, ignoring unknown ids."""
+        rows = [self._row_by_id[m] for m in movie_ids if m in self._row_by_id]
+        return np.asarray(rows, dtype=np.int64)
+
+    def seen_mask(self, movie_ids: Iterable[int]) -> np.ndarray:
+        """Vectorized mask of catalog rows whose movie ID is in movie_ids."""
+        seen = np.sort(np.fromiter(movie_ids, dtype=np.int64))
+        if len(seen) == 0:
+            return np.zeros(self.size, dtype=bool)
+        positions = np.minimum(np.searchsorted(seen, self.movie_ids), len(seen) - 1)
+        return seen[positions] == self.movie_ids
+
+    def rows_in_years(self, ranges: List[Tuple[int, int]]) -> np.ndarray:
+        """Rows whose year falls in any of the inclusive ranges."""
+        sorted_years = self.years[self._year_order]
+        parts = [
+            self._year_order[
+                np.searchsorted(sorted_years, first, side="left"):
+                np.searchsorted(sorted_years, last, side="right")
+            ]
+            for first, last in ranges
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def _match_terms(
+        self,
+        columns: FeatureColumns,
+        terms: List[str]
+    ) -> np.ndarray:
+        """
+        For every row, the index of the first preference term it matches,
+        or len(terms) when none match.
+        """
+        first_match = np.full(self.size, len(terms), dtype=np.int16)
+        for index in reversed(range(len(terms))):
+            first_match[columns.rows_matching(terms[index])] = index
+        return first_match
+
+    @staticmethod
+    def _top_k(keys: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+        """Pick the k candidate rows with the highest keys, best first."""
+        if k <= 0 or len(candidates) == 0:
+            return candidates[:0]
+        candidate_keys = keys[candidates]
+        if len(candidates) > k:
+            part = np.argpartition(-candidate_keys, k - 1)[:k]
+            candidates = candidates[part]
+            candidate_keys = candidate_keys[part]
+        order = np.argsort(-candidate_keys, kind="stable")
+        return candidates[order]
+
+    def recommend(
+        self,
+        preferences: Optional[UserPreferences],
+        exclude_movie_ids: Iterable[int],
+        limit: int
+    ) -> List[Tuple[int, str]]:
+        """
+        Score the whole catalog for a user.
+        Returns list of tuples: (movie_id, reason_string)
+        """
+        with self._lock:
+            n = self.size
+            if n == 0:
+                return []
+
+            eligible = ~self.seen_mask(exclude_movie_ids)
+
+            # Missing ratings are NaN and rank below every real rating
+            known_ratings = np.nan_to_num(self.ratings, nan=-1.0)
+
+            results: List[Tuple[int, str]] = []
+            if preferences:
+                genres = split_terms(preferences.favorite_genres)
+                directors = split_terms(preferences.favorite_directors)
+                actors = split_terms(preferences.favorite_actors)
+
+                genre_match = self._match_terms(self.genres, genres)
+                director_match = self._match_terms(self.directors, directors)
+                actor_match = self._match_terms(self.cast, actors)
+                highly_rated = known_ratings >= HIGH_RATING_THRESHOLD
+
+                scores = (
+                    GENRE_WEIGHT * (genre_match < len(genres))
+                    + DIRECTOR_WEIGHT * (director_match < len(directors))
+                    + ACTOR_WEIGHT * (actor_match < len(actors))
+                    + HIGH_RATING_WEIGHT * highly_rated
+                ).astype(np.float32)
+
+                personal = eligible & (scores > 0)
+                if preferences.min_rating:
+                    # Movies without a rating are kept, as before
+                    personal &= ~(self.ratings < preferences.min_rating)
+
+                decades = parse_decades(getattr(preferences, "preferred_decades", None))
+                if decades:
+                    in_decades = np.zeros(n, dtype=bool)
+                    in_decades[self.rows_in_years(decades)] = True
+                    personal &= in_decades
+
+                # Break score ties by rating; ratings are < 11 so /11 < 1
+                keys = scores + np.maximum(known_ratings, 0) / 11.0
+                for row in self._top_k(keys, np.flatnonzero(personal), limit):
+                    reasons = []
+                    if genre_match[row] < len(genres):
+                        reasons.append(f"Matches your favorite genre: {genres[genre_match[row]]}")
+                    if director_match[row] < len(directors):
+                        reasons.append(f"Directed by {directors[director_match[row]]}")
+                    if actor_match[row] < len(actors):
+                        reasons.append(f"Features {actors[actor_match[row]]}")
+                    if highly_rated[row]:
+                        reasons.append(f"Highly rated ({self.rating_labels[row]}/10)")
+                    reason = "; ".join(reasons[:2]) if reasons else "Based on your preferences"
+                    results.append((int(self.movie_ids[row]), reason))
+                    eligible[row] = False
+
+            # If no preferences or not enough recommendations, add popular movies
+            needed = limit - len(results)
+            if needed > 0:
+                popular = self.top_rated[eligible[self.top_rated]][:needed]
+                if len(popular) < needed and len(self.top_rated) >= TOP_RATED_SIZE:
+                    # Top list exhausted by exclusions; select over the whole catalog
+                    candidates = np.flatnonzero(eligible & ~np.isnan(self.ratings))
+                    popular = self._top_k(known_ratings, candidates, needed)
+                for row in popular:
+                    results.append((
+                        int(self.movie_ids[row]),
+                        f"Highly rated ({self.rating_labels[row]}/10)"
+                    ))
+
+            return results
+
+
+# Shared engine instance used by the API process
+recommendation_engine = RecommendationEngine()
+
+
+@events.subscribe(events.MOVIE_CREATED)
+def _add_created_movie(movie: Movie, **_):
+    recommendation_engine.add_movie(movie)
+
+
+@events.subscribe(events.MOVIES_IMPORTED)
+def _add_imported_movies(movie_ids, **_):
+    if len(movie_ids) > events.REBUILD_THRESHOLD:
+        recommendation_engine.invalidate()
@@ -1,9 +1,10 @@
 """Room management service."""
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from typing import Dict, Iterable, List, Optional, Sequence
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, or_, func, exists
 
 from app.models import Room, User, Invitation, room_members
+from app.services import events
 
 
 class RoomService:
@@ -20,24 +21,24 @@ class RoomService:
         max_members: int = 50
     ) -> Room:
         """Create a new room."""
+        # Add creator as member
+        creator = db.query(User).filter(User.id == creator_id).first()
         room = Room(
             name=name,
             description=description,
             movie_id=movie_id,
             creator_id=creator_id,
             is_private=is_private,
-            max_members=max_members
+            max_members=max_members,
+            members=[creator] if creator else []
         )
         db.add(room)
-        db.flush()
-        
-        # Add creator as member
-        creator = db.query(User).filter(User.id == creator_id).first()
-        if creator:
-            room.members.append(creator)
-        
         db.commit()
         db.refresh(room)
+        events.emit(
+            events.ROOM_MEMBERSHIP_CHANGED, db=db, user_id=creator_id,
+            room_id=room.id, movie_id=movie_id, joined=True
+        )
         return room
 
     @staticmethod
@@ -46,7 +47,7 @@ class RoomService:
         Join a room.
         Returns (success: bool, message: str)
         """
-        room = db.query(Room).filter(Room.id == room_id).first()
+        room = db.query(Room).options(selectinload(Room.members)).filter(Room.id == room_id).first()
         if not room:
             return False, "Room not found"
         
@@ -78,6 +79,10 @@ class RoomService:
             invitation.status = "accepted"
         
         db.commit()
+        events.emit(
+            events.ROOM_MEMBERSHIP_CHANGED, db=db, user_id=user_id,
+            room_id=room_id, movie_id=room.movie_id, joined=True
+        )
         return True, "Successfully joined room"
 
     @staticmethod
@@ -86,7 +91,7 @@ class RoomService:
         Leave a room.
         Returns (success: bool, message: str)
         """
-        room = db.query(Room).filter(Room.id == room_id).first()
+        room = db.query(Room).options(selectinload(Room.members)).filter(Room.id == room_id).first()
         if not room:
             return False, "Room not found"
         
@@ -102,6 +107,10 @@ class RoomService:
         if user in room.members:
             room.members.remove(user)
             db.commit()
+            events.emit(
+                events.ROOM_MEMBERSHIP_CHANGED, db=db, user_id=user_id,
+                room_id=room_id, movie_id=room.movie_id, joined=False
+            )
             return True, "Successfully left room"
         
         return False, "Not a member of this room"
@@ -118,7 +127,7 @@ class RoomService:
         Invite a user to a room.
         Returns (invitation: Optional[Invitation], message: str)
         """
-        room = db.query(Room).filter(Room.id == room_id).first()
+        room = db.query(Room).options(selectinload(Room.members)).filter(Room.id == room_id).first()
         if not room:
             return None, "Room not found"
         
@@ -163,12 +172,35 @@ class RoomService:
         return invitation, "Invitation sent successfully"
 
     @staticmethod
-    def get_user_rooms(db: Session, user_id: int) -> List[Room]:
-        """Get all rooms a user is a member of."""
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            return []
-        return user.room_memberships
+    def get_user_rooms(db: Session, user_id: int, options: Sequence = ()) -> List[Room]:
+        """
+        Get all rooms a user is a member of.
+        options are applied to the room query (e.g. load_only).
+        """
+        return db.query(Room).options(*options).join(
+            room_members, room_members.c.room_id == Room.id
+        ).filter(room_members.c.user_id == user_id).order_by(Room.id).all()
+
+    @staticmethod
+    def member_counts(db: Session, room_ids: Iterable[int]) -> Dict[int, int]:
+        """Member count per room ID, in one grouped query."""
+        room_ids = list(set(room_ids))
+        if not room_ids:
+            return {}
+        counts = dict(
+            db.query(room_members.c.room_id, func.count(room_members.c.user_id)).filter(
+                room_members.c.room_id.in_(room_ids)
+            ).group_by(room_members.c.room_id).all()
+        )
+        return {room_id: counts.get(room_id, 0) for room_id in room_ids}
+
+    @staticmethod
+    def set_member_counts(db: Session, rooms: Iterable[Room]):
+        """Fill room.member_count (a response-only attribute) for rooms."""
+        rooms = list(rooms)
+        counts = RoomService.member_counts(db, [room.id for room in rooms])
+        for room in rooms:
+            room.member_count = counts[room.id]
 
     @staticmethod
     def get_available_rooms(
@@ -176,10 +208,14 @@ class RoomService:
         user_id: Optional[int] = None,
         movie_id: Optional[int] = None,
         search: Optional[str] = None,
-        limit: int = 20
+        limit: int = 20,
+        options: Sequence = ()
     ) -> List[Room]:
-        """Get available rooms (public rooms user hasn't joined)."""
-        query = db.query(Room).filter(Room.is_private == False)
+        """
+        Get available rooms (public rooms user hasn't joined).
+        options are applied to the room query (e.g. load_only).
+        """
+        query = db.query(Room).options(*options).filter(Room.is_private == False)
         
         if movie_id:
             query = query.filter(Room.movie_id == movie_id)
@@ -192,15 +228,14 @@ class RoomService:
                 )
             )
         
-        rooms = query.limit(limit).all()
-        
         # Filter out rooms user is already a member of
         if user_id:
-            user = db.query(User).filter(User.id == user_id).first()
-            if user:
-                rooms = [r for r in rooms if user not in r.members]
+            query = query.filter(~exists().where(
+                room_members.c.room_id == Room.id,
+                room_members.c.user_id == user_id
+            ))
         
-        return rooms
+        return query.limit(limit).all()
 
 
 
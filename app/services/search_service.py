@@ -0,0 +1,295 @@
+"""Full-text movie search over title, plot, director and cast."""
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import column, func, inspect, literal_column, or_, table, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Query, Session
+
+from app.models import Movie
+
+# bm25() column weights, in movies_fts column order: title, plot, director, cast
+BM25_WEIGHTS = (10.0, 1.0, 3.0, 3.0)
+POSTGRES_CONFIG = "english"
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE movies_fts USING fts5(
+        title, plot, director, "cast",
+        content='movies', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_fts(rowid, title, plot, director, "cast")
+        VALUES (new.id, new.title, new.plot, new.director, new."cast");
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, plot, director, "cast")
+        VALUES ('delete', old.id, old.title, old.plot, old.director, old."cast");
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_au AFTER UPDATE OF title, plot, director, "cast" ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, plot, director, "cast")
+        VALUES ('delete', old.id, old.title, old.plot, old.director, old."cast");
+        INSERT INTO movies_fts(rowid, title, plot, director, "cast")
+        VALUES (new.id, new.title, new.plot, new.director, new."cast");
+    END
+    """,
+    "INSERT INTO movies_fts(movies_fts) VALUES ('rebuild')",
+]
+
+# Stored generated column, so the vector follows every insert and update
+_POSTGRES_DDL = [
+    f"""
+    ALTER TABLE movies ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(director, '')), 'B') ||
+        setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce("cast", '')), 'B') ||
+        setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(plot, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_movies_search_vector ON movies USING GIN (search_vector)",
+]
+
+# Trigram index over normalized titles, for near-duplicate detection.
+# On SQLite the year is indexed alongside so candidates are found per year.
+_SQLITE_TRIGRAM_DDL = [
+    """
+    CREATE VIRTUAL TABLE movies_title_trgm USING fts5(
+        title_key, year, content='movies', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_title_trgm_ai AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_title_trgm(rowid, title_key, year) VALUES (new.id, new.title_key, new.year);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_title_trgm_ad AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_title_trgm(movies_title_trgm, rowid, title_key, year)
+        VALUES ('delete', old.id, old.title_key, old.year);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_title_trgm_au AFTER UPDATE OF title_key, year ON movies BEGIN
+        INSERT INTO movies_title_trgm(movies_title_trgm, rowid, title_key, year)
+        VALUES ('delete', old.id, old.title_key, old.year);
+        INSERT INTO movies_title_trgm(rowid, title_key, year) VALUES (new.id, new.title_key, new.year);
+    END
+    """,
+    "INSERT INTO movies_title_trgm(movies_title_trgm) VALUES ('rebuild')",
+]
+
+_POSTGRES_TRIGRAM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_movies_title_key_trgm ON movies USING GIN (title_key gin_trgm_ops)",
+]
+
+# Same-year titles at least this similar (trigram Jaccard, as pg_trgm) are duplicates
+TITLE_SIMILARITY_THRESHOLD = 0.6
+# Candidates fetched from the trigram index per lookup
+MAX_TITLE_CANDIDATES = 20
+
+_ROMAN_NUMERAL = re.compile(r"^m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$")
+_ROMAN_VALUES = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100, "d": 500, "m": 1000}
+
+# Whether full-text search / the title trigram index are available, per database URL
+_enabled: Dict[str, bool] = {}
+_trigram_enabled: Dict[str, bool] = {}
+
+movies_fts = table("movies_fts", column("rowid"))
+
+
+def search_terms(search: Optional[str]) -> List[str]:
+    """Split a search string into lowercase word tokens."""
+    return re.findall(r"\w+", (search or "").lower())
+
+
+def ensure_search_index(bind) -> bool:
+    """
+    Create the full-text index for the bind's dialect if it is missing:
+    an FTS5 table kept in sync by triggers on SQLite, or a generated
+    tsvector column with a GIN index on Postgres. Other databases (and
+    SQLite builds without FTS5) fall back to ILIKE search.
+    """
+    dialect = bind.dialect.name
+    enabled = False
+    if dialect == "sqlite":
+        if inspect(bind).has_table("movies_fts"):
+            enabled = True
+        else:
+            try:
+                with bind.begin() as conn:
+                    for ddl in _SQLITE_DDL:
+                        conn.execute(text(ddl))
+                enabled = True
+            except OperationalError:
+                # SQLite compiled without FTS5
+                enabled = False
+    elif dialect == "postgresql":
+        with bind.begin() as conn:
+            for ddl in _POSTGRES_DDL:
+                conn.execute(text(ddl))
+        enabled = True
+    _enabled[str(bind.url)] = enabled
+    ensure_title_trigram_index(bind)
+    return enabled
+
+
+def ensure_title_trigram_index(bind) -> bool:
+    """
+    Create the trigram index over movies.title_key if it is missing: an
+    FTS5 trigram table on SQLite, or a pg_trgm GIN index on Postgres.
+    Without it, only exact (normalized) duplicates are detected.
+    """
+    dialect = bind.dialect.name
+    enabled = False
+    if dialect == "sqlite":
+        if inspect(bind).has_table("movies_title_trgm"):
+            enabled = True
+        else:
+            try:
+                with bind.begin() as conn:
+                    for ddl in _SQLITE_TRIGRAM_DDL:
+                        conn.execute(text(ddl))
+                enabled = True
+            except OperationalError:
+                # SQLite older than 3.34 has no trigram tokenizer
+                enabled = False
+    elif dialect == "postgresql":
+        try:
+            with bind.begin() as conn:
+                for ddl in _POSTGRES_TRIGRAM_DDL:
+                    conn.execute(text(ddl))
+            enabled = True
+        except (OperationalError, ProgrammingError):
+            # pg_trgm not installed and no privilege to create it
+            enabled = False
+    _trigram_enabled[str(bind.url)] = enabled
+    return enabled
+
+
+def title_trigrams(title_key: str) -> Set[str]:
+    """Trigrams of each word padded with two leading and one trailing space, as pg_trgm."""
+    trigrams = set()
+    for word in title_key.split():
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def title_numbers(title_key: str) -> Set[int]:
+    """Numbers in a normalized title, digits or roman numerals ("vol ii" -> {2})."""
+    numbers = set()
+    for word in title_key.split():
+        if word.isdigit():
+            numbers.add(int(word))
+        elif _ROMAN_NUMERAL.match(word):
+            values = [_ROMAN_VALUES[c] for c in word]
+            numbers.add(sum(-v if v < next_v else v for v, next_v in zip(values, values[1:] + [0])))
+    return numbers
+
+
+def title_similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class SearchService:
+    """Service for full-text movie search."""
+
+    @staticmethod
+    def search_movies(query: Query, search: str) -> Query:
+        """
+        Restrict a Movie query to matches for search, most relevant first.
+        Every word is matched as a prefix, so partial input matches too.
+        """
+        terms = search_terms(search)
+        if not terms:
+            return query
+
+        bind = query.session.get_bind()
+        if not _enabled.get(str(bind.url)):
+            return query.filter(
+                *[
+                    or_(
+                        Movie.title.ilike(f"%{term}%"),
+                        Movie.plot.ilike(f"%{term}%"),
+                        Movie.director.ilike(f"%{term}%"),
+                        Movie.cast.ilike(f"%{term}%"),
+                    )
+                    for term in terms
+                ]
+            )
+
+        if bind.dialect.name == "postgresql":
+            vector = literal_column("movies.search_vector")
+            ts_query = func.to_tsquery(POSTGRES_CONFIG, " & ".join(f"{term}:*" for term in terms))
+            return query.filter(vector.op("@@")(ts_query)).order_by(
+                func.ts_rank(vector, ts_query).desc()
+            )
+
+        match = " ".join(f'"{term}"*' for term in terms)
+        return query.join(movies_fts, movies_fts.c.rowid == Movie.id).filter(
+            literal_column("movies_fts").op("MATCH")(match)
+        ).order_by(func.bm25(literal_column("movies_fts"), *BM25_WEIGHTS))
+
+    @staticmethod
+    def similar_titles(
+        db: Session,
+        title_key: str,
+        year: Optional[int],
+        threshold: float = TITLE_SIMILARITY_THRESHOLD
+    ) -> List[Tuple[int, float]]:
+        """
+        Movies released the same year whose normalized title is at least
+        threshold similar to title_key, found through the trigram index.
+        Titles without a year are never matched, nor titles numbered
+        differently ("Vol I" and "Vol II" are different films).
+        Returns list of tuples, most similar first: (movie_id, similarity)
+        """
+        wanted = title_trigrams(title_key)
+        bind = db.get_bind()
+        if year is None or not wanted or not _trigram_enabled.get(str(bind.url)):
+            return []
+
+        if bind.dialect.name == "postgresql":
+            rows = db.execute(text(
+                "SELECT id, title_key FROM movies "
+                "WHERE title_key % :key AND year = :year "
+                "ORDER BY similarity(title_key, :key) DESC LIMIT :limit"
+            ), {"key": title_key, "year": year, "limit": MAX_TITLE_CANDIDATES}).all()
+        else:
+            # The trigram tokenizer indexes raw substrings, so query the
+            # unpadded trigrams inside each word
+            inner = sorted({
+                word[i:i + 3] for word in title_key.split() for i in range(len(word) - 2)
+            })
+            if not inner:
+                return []
+            match = f'year : "{year}" AND title_key : (' + " OR ".join(f'"{trigram}"' for trigram in inner) + ")"
+            rows = db.execute(text(
+                "SELECT movies.id, movies.title_key FROM movies_title_trgm "
+                "JOIN movies ON movies.id = movies_title_trgm.rowid "
+                "WHERE movies_title_trgm MATCH :match AND movies.year = :year "
+                "ORDER BY movies_title_trgm.rank LIMIT :limit"
+            ), {"match": match, "year": year, "limit": MAX_TITLE_CANDIDATES}).all()
+
+        numbers = title_numbers(title_key)
+        scored = [
+            (movie_id, title_similarity(wanted, title_trigrams(key or "")))
+            for movie_id, key in rows
+            if title_numbers(key or "") == numbers
+        ]
+        return sorted(
+            [(movie_id, score) for movie_id, score in scored if score >= threshold],
+            key=lambda item: -item[1]
+        )
@@ -0,0 +1,90 @@
+"""Per-user "already seen" movie sets used to exclude recommendations."""
+import os
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from app.models import Room, Review, room_members
+from app.services import events
+from app.services.cache import TTLCache
+
+load_dotenv()
+
+
+class SeenMovies:
+    """
+    Movies a user has joined a room for or reviewed, cached per user as a
+    sorted int32 array. Joins and new reviews extend a cached set in place;
+    leaving a room or deleting a review drops it (the movie may still be
+    seen through another room or a review), so it is reloaded on next use.
+    """
+
+    def __init__(self, maxsize: int = 100_000, ttl: float = 3600.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, db: Session, user_id: int) -> np.ndarray:
+        """Sorted array of movie IDs the user has already seen."""
+        seen = self._cache.get(user_id)
+        if seen is None:
+            version = self._cache.version(user_id)
+            seen = self.load(db, user_id)
+            self._cache.set(user_id, seen, group=user_id, version=version)
+        return seen
+
+    @staticmethod
+    def load(db: Session, user_id: int) -> np.ndarray:
+        room_movie_ids = db.query(Room.movie_id).join(
+            room_members, room_members.c.room_id == Room.id
+        ).filter(room_members.c.user_id == user_id)
+        reviewed_movie_ids = db.query(Review.movie_id).filter(Review.user_id == user_id)
+        movie_ids = [r[0] for r in room_movie_ids.union(reviewed_movie_ids)]
+        return np.unique(np.asarray(movie_ids, dtype=np.int32))
+
+    def add(self, user_id: int, movie_id: int):
+        """Add a movie to the user's cached set."""
+        updated = self._cache.update(
+            user_id, lambda seen: np.union1d(seen, np.int32(movie_id)).astype(np.int32)
+        )
+        if not updated:
+            # Not cached: make sure a load already in flight isn't stored
+            self._cache.invalidate_group(user_id)
+
+    def invalidate(self, user_id: int):
+        self._cache.invalidate_group(user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+# Shared seen-set cache used by the API process
+seen_movies = SeenMovies(
+    maxsize=int(os.getenv("SEEN_MOVIES_CACHE_SIZE", "100000")),
+    ttl=float(os.getenv("SEEN_MOVIES_CACHE_TTL", "3600"))
+)
+
+
+@events.subscribe(events.ROOM_MEMBERSHIP_CHANGED)
+def _apply_membership_change(user_id: int, movie_id: int, joined: bool, **_):
+    if joined:
+        seen_movies.add(user_id, movie_id)
+    else:
+        seen_movies.invalidate(user_id)
+
+
+@events.subscribe(events.REVIEW_CHANGED)
+def _apply_review_change(user_id: int, movie_id: int, old_rating, new_rating, **_):
+    if new_rating is None:
+        seen_movies.invalidate(user_id)
+    elif old_rating is None:
+        seen_movies.add(user_id, movie_id)
+
+
+@events.subscribe(events.REVIEWS_IMPORTED)
+def _apply_imported_reviews(changes, **_):
+    for user_id, movie_id, old_rating, _ in changes:
+        if old_rating is None:
+            seen_movies.add(user_id, movie_id)
@@ -0,0 +1,321 @@
+"""Content-based nearest-neighbour index for similar-movie lookups."""
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Movie
+from app.services import events
+from app.services.recommendation_engine import split_terms
+
+# Neighbours kept per movie (the /similar endpoint serves at most 20)
+MAX_NEIGHBOURS = 20
+
+# Share of the similarity score contributed by each feature block
+BLOCK_WEIGHTS = {
+    "genre": 0.3,
+    "director": 0.2,
+    "cast": 0.2,
+    "plot": 0.3,
+}
+
+# Upper bound on the non-zero scores of one batch of rows while rebuilding
+BUILD_MAX_BATCH_NNZ = 4_000_000
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has he her his in is it its of on "
+    "or she that the their them they this to was were who will with".split()
+)
+
+
+def plot_terms(plot: Optional[str]) -> List[str]:
+    """Tokenize a plot summary for TF-IDF."""
+    if not plot:
+        return []
+    return [
+        word for word in _WORD_RE.findall(plot.lower())
+        if len(word) > 2 and word not in _STOPWORDS
+    ]
+
+
+class SimilarityIndex:
+    """
+    Precomputed top-N neighbours per movie.
+
+    Movies are embedded as weighted, per-block L2-normalised sparse vectors
+    (genre, director and cast indicators plus TF-IDF over the plot), so a dot
+    product is a weighted sum of per-block cosine similarities. Neighbours
+    are stored compactly as an int32 movie-ID array with float16 scores.
+
+    The full build runs in a background thread (start_rebuild) and swaps
+    the new lists in when done; requests only read the index and merge in
+    new movies one at a time.
+    """
+
+    def __init__(self, top_n: int = MAX_NEIGHBOURS):
+        self.top_n = top_n
+        self._lock = threading.RLock()
+        self._builder: Optional[threading.Thread] = None
+        self._reset()
+
+    def _reset(self):
+        self.movie_ids = np.empty(0, dtype=np.int32)
+        self.neighbours = np.full((0, self.top_n), -1, dtype=np.int32)
+        self.scores = np.zeros((0, self.top_n), dtype=np.float16)
+        self._row_by_id: Dict[int, int] = {}
+        self._columns: Dict[str, int] = {}
+        self._idf: Dict[str, float] = {}
+        self._features = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._max_movie_id = 0
+        self._loaded = False
+
+    @property
+    def size(self) -> int:
+        return len(self.movie_ids)
+
+    def _column(self, key: str) -> int:
+        col = self._columns.get(key)
+        if col is None:
+            col = self._columns[key] = len(self._columns)
+        return col
+
+    def _embed(self, movie) -> Tuple[List[int], List[float]]:
+        """Sparse feature vector (columns, values) for one movie."""
+        blocks = {
+            "genre": Counter(t.lower() for t in split_terms(movie.genre)),
+            "director": Counter(t.lower() for t in split_terms(movie.director)),
+            "cast": Counter(t.lower() for t in split_terms(movie.cast)),
+        }
+        plot = Counter(plot_terms(movie.plot))
+        unseen_idf = math.log((1 + self.size) / 2) + 1
+        blocks["plot"] = {
+            term: count * self._idf.get(term, unseen_idf)
+            for term, count in plot.items()
+        }
+
+        cols, values = [], []
+        for block, weights in blocks.items():
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            if not norm:
+                continue
+            scale = math.sqrt(BLOCK_WEIGHTS[block]) / norm
+            for term, weight in weights.items():
+                cols.append(self._column(f"{block}:{term}"))
+                values.append(weight * scale)
+        return cols, values
+
+    def _matrix(self, embedded: List[Tuple[List[int], List[float]]]) -> sparse.csr_matrix:
+        indptr = np.cumsum([0] + [len(cols) for cols, _ in embedded])
+        indices = np.fromiter((c for cols, _ in embedded for c in cols), dtype=np.int32)
+        data = np.fromiter((v for _, vals in embedded for v in vals), dtype=np.float32)
+        return sparse.csr_matrix(
+            (data, indices, indptr), shape=(len(embedded), len(self._columns))
+        )
+
+    def _top_neighbours(
+        self, rows: np.ndarray, sims: np.ndarray, exclude_row: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best top_n of the candidate rows scored by sims, ties going to the
+        lower row, padded with -1.
+        """
+        keep = (sims > 0) & (rows != exclude_row)
+        rows, sims = rows[keep], sims[keep]
+        if len(rows) > self.top_n:
+            cutoff = -np.partition(-sims, self.top_n - 1)[self.top_n - 1]
+            above = sims > cutoff
+            tied = np.flatnonzero(sims == cutoff)
+            tied = tied[np.argsort(rows[tied], kind="stable")[:self.top_n - int(above.sum())]]
+            chosen = np.concatenate((np.flatnonzero(above), tied))
+            rows, sims = rows[chosen], sims[chosen]
+        order = np.lexsort((rows, -sims))
+
+        ids = np.full(self.top_n, -1, dtype=np.int32)
+        scores = np.zeros(self.top_n, dtype=np.float16)
+        ids[:len(rows)] = self.movie_ids[rows[order]]
+        scores[:len(rows)] = sims[order]
+        return ids, scores
+
+    def _batches(self):
+        """
+        (start, end) row ranges whose sparse score block stays under
+        BUILD_MAX_BATCH_NNZ: a row scores at most the movies sharing one
+        of its features.
+        """
+        n = self.size
+        sharing = np.bincount(self._features.indices, minlength=self._features.shape[1])
+        per_row = np.add.reduceat(
+            np.append(sharing[self._features.indices], 0), self._features.indptr[:-1]
+        ) * (np.diff(self._features.indptr) > 0)
+        bound = np.concatenate(([0], np.cumsum(np.minimum(per_row, n))))
+        start = 0
+        while start < n:
+            end = int(np.searchsorted(bound, bound[start] + BUILD_MAX_BATCH_NNZ, side="right")) - 1
+            end = min(max(end, start + 1), n)
+            yield start, end
+            start = end
+
+    def rebuild(self, db: Session, deadline: Optional[float] = None):
+        """
+        Embed the whole catalog and precompute every neighbour list, then
+        swap them in. The index stays readable meanwhile. Raises
+        TimeoutError once time.monotonic() passes deadline.
+        """
+        movies = db.query(
+            Movie.id, Movie.genre, Movie.director, Movie.cast, Movie.plot
+        ).order_by(Movie.id).all()
+
+        built = SimilarityIndex(self.top_n)
+        doc_freq = Counter()
+        for movie in movies:
+            doc_freq.update(set(plot_terms(movie.plot)))
+        n = len(movies)
+        built._idf = {
+            term: math.log((1 + n) / (1 + df)) + 1
+            for term, df in doc_freq.items()
+        }
+
+        built.movie_ids = np.asarray([m.id for m in movies], dtype=np.int32)
+        built._row_by_id = {m.id: row for row, m in enumerate(movies)}
+        built._features = built._matrix([built._embed(m) for m in movies])
+        built.neighbours = np.full((n, self.top_n), -1, dtype=np.int32)
+        built.scores = np.zeros((n, self.top_n), dtype=np.float16)
+
+        # Sparse top-k: a batch's scores are never materialized densely
+        features_t = built._features.T.tocsc()
+        for start, end in built._batches():
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"similarity index build passed its deadline at row {start} of {n}")
+            block = built._features[start:end] @ features_t
+            for offset in range(end - start):
+                lo, hi = block.indptr[offset], block.indptr[offset + 1]
+                row = start + offset
+                built.neighbours[row], built.scores[row] = built._top_neighbours(
+                    block.indices[lo:hi], block.data[lo:hi], row
+                )
+
+        built._max_movie_id = int(built.movie_ids[-1]) if n else 0
+        built._loaded = True
+        with self._lock:
+            self.movie_ids = built.movie_ids
+            self.neighbours = built.neighbours
+            self.scores = built.scores
+            self._row_by_id = built._row_by_id
+            self._columns = built._columns
+            self._idf = built._idf
+            self._features = built._features
+            self._max_movie_id = built._max_movie_id
+            self._loaded = True
+
+    def _rebuild_with_session(self, session_factory):
+        db = session_factory()
+        try:
+            self.rebuild(db)
+        finally:
+            db.close()
+
+    def start_rebuild(self, session_factory=SessionLocal) -> threading.Thread:
+        """Rebuild in a background thread, unless a rebuild is already running."""
+        with self._lock:
+            if self._builder is None or not self._builder.is_alive():
+                self._builder = threading.Thread(
+                    target=self._rebuild_with_session, args=(session_factory,),
+                    name="similarity-index-build", daemon=True
+                )
+                self._builder.start()
+            return self._builder
+
+    def invalidate(self):
+        """Drop the loaded data; requests get nothing until the next rebuild."""
+        with self._lock:
+            self._reset()
+
+    def ensure_loaded(self, db: Session):
+        """
+        Pick up movies added elsewhere. Never builds in the caller: an
+        unbuilt index, or more than REBUILD_THRESHOLD new movies, starts a
+        background rebuild instead.
+        """
+        if not self._loaded:
+            self.start_rebuild()
+            return
+
+        max_id = db.query(func.max(Movie.id)).scalar() or 0
+        if max_id > self._max_movie_id:
+            new_movies = db.query(Movie).filter(
+                Movie.id > self._max_movie_id
+            ).order_by(Movie.id).limit(events.REBUILD_THRESHOLD + 1).all()
+            if len(new_movies) > events.REBUILD_THRESHOLD:
+                self.start_rebuild()
+                return
+            for movie in new_movies:
+                self.add_movie(movie)
+
+    def add_movie(self, movie: Movie):
+        """Embed a new movie and merge it into existing neighbour lists."""
+        with self._lock:
+            if not self._loaded or movie.id in self._row_by_id:
+                return
+
+            row = self.size
+            vector = self._matrix([self._embed(movie)])
+            features = self._features.copy()
+            features.resize((row, len(self._columns)))
+            self._features = sparse.vstack([features, vector], format="csr")
+            self.movie_ids = np.append(self.movie_ids, np.int32(movie.id))
+            self._row_by_id[movie.id] = row
+            self._max_movie_id = max(self._max_movie_id, movie.id)
+
+            sims = (self._features @ vector.T).toarray().ravel()
+            ids, scores = self._top_neighbours(np.arange(row + 1), sims, row)
+            self.neighbours = np.vstack([self.neighbours, ids])
+            self.scores = np.vstack([self.scores, scores])
+
+            # Existing movies whose weakest neighbour the new movie beats
+            weakest = self.scores[:row, -1].astype(np.float32)
+            padded = self.neighbours[:row, -1] < 0
+            for other in np.flatnonzero((sims[:row] > 0) & (padded | (sims[:row] > weakest))):
+                merged_ids = np.append(self.neighbours[other], np.int32(movie.id))
+                merged_scores = np.append(
+                    self.scores[other].astype(np.float32), sims[other]
+                )
+                merged_scores[merged_ids < 0] = -1
+                order = np.argsort(-merged_scores, kind="stable")[:self.top_n]
+                self.neighbours[other] = merged_ids[order]
+                self.scores[other] = np.maximum(merged_scores[order], 0)
+
+    def similar(self, movie_id: int, limit: int) -> Optional[List[int]]:
+        """IDs of the most similar movies, best first (None until built)."""
+        with self._lock:
+            if not self._loaded:
+                return None
+            row = self._row_by_id.get(movie_id)
+            if row is None:
+                return []
+            ids = self.neighbours[row, :limit]
+            return [int(i) for i in ids if i >= 0]
+
+
+# Shared index instance used by the API process
+similarity_index = SimilarityIndex()
+
+
+@events.subscribe(events.MOVIE_CREATED)
+def _add_created_movie(movie: Movie, **_):
+    similarity_index.add_movie(movie)
+
+
+@events.subscribe(events.MOVIES_IMPORTED)
+def _add_imported_movies(movie_ids, **_):
+    if len(movie_ids) > events.REBUILD_THRESHOLD:
+        # The current lists keep being served until the rebuild swaps in
+        similarity_index.start_rebuild()
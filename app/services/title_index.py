@@ -0,0 +1,202 @@
+"""In-memory title prefix index for search-as-you-type."""
+import bisect
+import heapq
+import threading
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Movie, normalize_title
+from app.services import events
+
+MAX_SUGGESTIONS = 20
+# Prefix ranges larger than this keep a memoized top list instead of being scanned
+SCAN_LIMIT = 500
+# Later title words are indexed too ("matrix" finds "The Matrix"), up to this many
+MAX_WORD_KEYS = 4
+STOPWORDS = {"a", "an", "and", "of", "the"}
+
+def title_keys(title: Optional[str]) -> List[str]:
+    """Index keys for a title: the whole title plus suffixes at later words."""
+    normalized = normalize_title(title)
+    if not normalized:
+        return []
+    words = normalized.split(" ")
+    keys = [normalized]
+    for i in range(1, len(words)):
+        if len(keys) > MAX_WORD_KEYS:
+            break
+        if words[i] not in STOPWORDS:
+            keys.append(" ".join(words[i:]))
+    return keys
+
+
+class TitleIndex:
+    """
+    Sorted array of normalized title keys searched with bisect.
+
+    A prefix maps to a contiguous key range; small ranges are ranked
+    directly and large ones (short prefixes) keep a memoized top list that
+    new movies are merged into, so lookups stay well under a millisecond.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._keys: List[str] = []
+        self._key_rows: List[int] = []
+        self.movie_ids: List[int] = []
+        self.titles: List[str] = []
+        self.years: List[Optional[int]] = []
+        self.ratings: List[float] = []
+        self._top_by_prefix: Dict[str, List[int]] = {}
+        self._row_by_id: Dict[int, int] = {}
+        self._max_movie_id = 0
+        self._loaded = False
+
+    @property
+    def size(self) -> int:
+        return len(self.movie_ids)
+
+    @staticmethod
+    def _rating(imdb_rating_value: Optional[float], average_rating_value: Optional[float]) -> float:
+        """Ranking score: IMDB rating, else the user average, unrated last."""
+        if imdb_rating_value is not None:
+            return imdb_rating_value
+        if average_rating_value is not None:
+            return average_rating_value
+        return -1.0
+
+    def _append(self, movie_id: int, title: str, year: Optional[int], rating: float) -> int:
+        row = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.titles.append(title)
+        self.years.append(year)
+        self.ratings.append(rating)
+        self._row_by_id[movie_id] = row
+        self._max_movie_id = max(self._max_movie_id, movie_id)
+        return row
+
+    def rebuild(self, db: Session):
+        """Load every title into memory."""
+        rows = db.query(
+            Movie.id, Movie.title, Movie.year,
+            Movie.imdb_rating_value, Movie.average_rating_value
+        ).order_by(Movie.id).all()
+
+        with self._lock:
+            self._reset()
+            entries: List[Tuple[str, int]] = []
+            for r in rows:
+                row = self._append(r.id, r.title, r.year, self._rating(r.imdb_rating_value, r.average_rating_value))
+                entries.extend((key, row) for key in title_keys(r.title))
+            entries.sort()
+            self._keys = [key for key, _ in entries]
+            self._key_rows = [row for _, row in entries]
+            self._warm_large_prefixes()
+            self._loaded = True
+
+    def _warm_large_prefixes(self):
+        """
+        Memoize top lists for every prefix whose key range exceeds SCAN_LIMIT,
+        refining large ranges one character at a time.
+        """
+        ranges = [(0, len(self._keys))]
+        length = 1
+        while ranges:
+            larger = []
+            for lo, hi in ranges:
+                start = lo
+                for prefix, group in groupby(self._keys[lo:hi], key=lambda key: key[:length]):
+                    end = start + sum(1 for _ in group)
+                    if end - start > SCAN_LIMIT:
+                        self._top_by_prefix[prefix] = self._best(self._key_rows[start:end], MAX_SUGGESTIONS)
+                        if len(prefix) == length:
+                            larger.append((start, end))
+                    start = end
+            ranges = larger
+            length += 1
+
+    def invalidate(self):
+        """Drop the loaded data; the next ensure_loaded() rebuilds it."""
+        with self._lock:
+            self._reset()
+
+    def ensure_loaded(self, db: Session):
+        """Load the index on first use and pick up movies added elsewhere."""
+        with self._lock:
+            if not self._loaded:
+                self.rebuild(db)
+                return
+
+            max_id = db.query(func.max(Movie.id)).scalar() or 0
+            if max_id > self._max_movie_id:
+                for movie in db.query(Movie).filter(
+                    Movie.id > self._max_movie_id
+                ).order_by(Movie.id).all():
+                    self.add_movie(movie)
+
+    def add_movie(self, movie: Movie):
+        """Insert a newly created movie's title keys."""
+        with self._lock:
+            if not self._loaded or movie.id in self._row_by_id:
+                return
+
+            rating = self._rating(movie.imdb_rating_value, movie.average_rating_value)
+            row = self._append(movie.id, movie.title, movie.year, rating)
+            for key in title_keys(movie.title):
+                position = bisect.bisect_right(self._keys, key)
+                self._keys.insert(position, key)
+                self._key_rows.insert(position, row)
+                for length in range(1, len(key) + 1):
+                    top = self._top_by_prefix.get(key[:length])
+                    if top is not None and row not in top:
+                        self._top_by_prefix[key[:length]] = self._best(top + [row], MAX_SUGGESTIONS)
+
+    def _best(self, rows, limit: int) -> List[int]:
+        ratings = self.ratings
+        return heapq.nlargest(limit, set(rows), key=lambda row: (ratings[row], -row))
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[int, str, Optional[int]]]:
+        """
+        Best rated movies whose title, or a later word in it, starts with prefix.
+        Returns list of tuples: (movie_id, title, year)
+        """
+        needle = normalize_title(prefix)
+        if not needle:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+
+        with self._lock:
+            top = self._top_by_prefix.get(needle)
+            if top is None:
+                lo = bisect.bisect_left(self._keys, needle)
+                hi = bisect.bisect_left(self._keys, needle + "\uffff", lo)
+                if hi - lo > SCAN_LIMIT:
+                    top = self._best(self._key_rows[lo:hi], MAX_SUGGESTIONS)
+                    self._top_by_prefix[needle] = top
+                else:
+                    top = self._best(self._key_rows[lo:hi], limit)
+            return [
+                (self.movie_ids[row], self.titles[row], self.years[row])
+                for row in top[:limit]
+            ]
+
+
+# Shared index used by the API process
+title_index = TitleIndex()
+
+
+@events.subscribe(events.MOVIE_CREATED)
+def _add_created_movie(movie: Movie, **_):
+    title_index.add_movie(movie)
+
+
+@events.subscribe(events.MOVIES_IMPORTED)
+def _add_imported_movies(movie_ids, **_):
+    if len(movie_ids) > events.REBUILD_THRESHOLD:
+        title_index.invalidate()
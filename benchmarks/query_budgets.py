@@ -0,0 +1,153 @@
+"""
+Per-endpoint query-count budgets.
+
+Usage:
+    python -m benchmarks.query_budgets [--page-size 100]
+
+Seeds a scratch SQLite database with list pages of --page-size rows, then
+calls each endpoint in BUDGETS with STRICT_LOADING on (a relationship that
+was not eager-loaded raises instead of querying). An endpoint fails if it
+errors or runs more statements than its budget, so an N+1 pattern (about
+one extra query per row) fails loudly. Exits non-zero on any failure, for CI.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# The app reads its configuration at import time: use a scratch database
+# and strict loading before anything from app is imported
+_DATA_DIR = tempfile.mkdtemp(prefix="moviefan-query-budgets-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DATA_DIR, 'budgets.db')}"
+os.environ["STRICT_LOADING"] = "1"
+os.environ["MOVIE_CACHE_BACKEND"] = "memory"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.auth import create_access_token, get_password_hash  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Invitation, Movie, Review, Room, User  # noqa: E402
+from app.services.feed_service import FeedService, large_rooms  # noqa: E402
+from app.services.movie_cache import movie_cache  # noqa: E402
+from app.services.rating_service import RatingService  # noqa: E402
+from app.services.recommendation import recommendation_cache  # noqa: E402
+from benchmarks.recommendations import QueryCounter  # noqa: E402
+
+# (method, path, maximum statements per call); every list call asks for a
+# full page (limit={page}). Paths are formatted with the seeded IDs.
+BUDGETS = [
+    ("GET", "/api/movies?limit={page}", 1),
+    ("GET", "/api/reviews/movie/{movie_id}?limit={page}", 2),
+    ("GET", "/api/reviews/user/{viewer_id}?limit={page}", 3),
+    ("GET", "/api/reviews/me?limit={page}", 3),
+    ("GET", "/api/reviews/feed?limit={page}", 4),
+    ("GET", "/api/reviews/{review_id}", 2),
+    ("GET", "/api/reviews/movie/{movie_id}/stats", 1),
+    ("GET", "/api/rooms?limit={page}", 4),
+    ("GET", "/api/rooms/my-rooms", 4),
+    ("GET", "/api/rooms/{room_id}", 4),
+    ("GET", "/api/rooms/invitations/me", 3),
+    ("GET", "/api/zapier/rooms?limit={page}", 4),
+    ("GET", "/api/zapier/reviews?limit={page}", 2),
+    ("GET", "/api/zapier/movies?limit={page}", 1),
+    ("POST", "/api/rooms/{open_room_id}/join", 13),
+    ("PUT", "/api/reviews/{review_id}", 9),
+]
+
+
+def seed(page: int) -> dict:
+    """
+    Create a viewer plus page other users, each with a hot-movie review,
+    a room the viewer joined, an open room and an invitation to it.
+    Returns the IDs the BUDGETS paths use.
+    """
+    db = SessionLocal()
+    try:
+        hashed = get_password_hash("budget-password")
+        viewer = User(username="viewer", email="viewer@example.com", hashed_password=hashed)
+        others = [
+            User(username=f"user{i}", email=f"user{i}@example.com", hashed_password=hashed)
+            for i in range(page)
+        ]
+        movies = [Movie(title=f"Budget Movie {i}", year=2000 + i % 25) for i in range(page + 1)]
+        db.add_all([viewer, *others, *movies])
+        db.flush()
+
+        hot = movies[0]
+        reviews = [Review(movie_id=hot.id, user_id=user.id, rating=1 + i % 10) for i, user in enumerate(others)]
+        reviews += [Review(movie_id=movie.id, user_id=viewer.id, rating=7) for movie in movies[1:]]
+        joined = [
+            Room(name=f"Joined {i}", movie_id=movies[i + 1].id, creator_id=user.id, members=[user, viewer])
+            for i, user in enumerate(others)
+        ]
+        open_rooms = [
+            Room(name=f"Open {i}", movie_id=movies[i + 1].id, creator_id=user.id, members=[user])
+            for i, user in enumerate(others)
+        ]
+        db.add_all([*reviews, *joined, *open_rooms])
+        db.flush()
+        db.add_all([
+            Invitation(room_id=room.id, inviter_id=room.creator_id, invitee_id=viewer.id, status="pending")
+            for room in open_rooms
+        ])
+        db.commit()
+        ids = {
+            "viewer_id": viewer.id,
+            "movie_id": hot.id,
+            "review_id": reviews[-1].id,
+            "room_id": joined[0].id,
+            "open_room_id": open_rooms[-1].id,
+            "token": create_access_token({"sub": viewer.username}),
+        }
+        RatingService.reconcile(db)
+        RatingService.rebuild_stats(db)
+        FeedService.rebuild(db)
+        return ids
+    finally:
+        db.close()
+
+
+def run(page: int) -> int:
+    """Check every budget. Returns the number of failures."""
+    ids = seed(page)
+    headers = {"Authorization": f"Bearer {ids['token']}"}
+    counter = QueryCounter(engine)
+    failures = 0
+    with TestClient(app) as client:
+        for method, template, budget in BUDGETS:
+            path = template.format(page=page, **ids)
+            # Cold caches, so cached rows are counted too
+            movie_cache.clear()
+            recommendation_cache.clear()
+            large_rooms.invalidate()
+            counter.count = 0
+            body = {"rating": 9} if method == "PUT" else None
+            try:
+                response = client.request(method, path, headers=headers, json=body)
+                error = None if response.status_code < 400 else f"HTTP {response.status_code}: {response.text[:200]}"
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}".splitlines()[0]
+            queries = counter.count
+            ok = error is None and queries <= budget
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {queries:>4}/{budget:<3} {method:<4} {path}")
+            if error:
+                print(f"       {error}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check per-endpoint query-count budgets.")
+    parser.add_argument("--page-size", type=int, default=100, help="Rows per list page (1-100)")
+    args = parser.parse_args(argv)
+
+    failures = run(max(1, min(args.page_size, 100)))
+    if failures:
+        print(f"{failures} endpoint(s) over budget or failing.")
+        sys.exit(1)
+    print("All endpoints within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Recommendation latency benchmark over synthetic catalogs.
+
+Usage:
+    python -m benchmarks.recommendations --sizes 10000 100000 1000000 --output results.json
+
+Each catalog size runs in its own process so peak RSS is per size.
+Catalogs are cached under --data-dir and reused unless --regenerate is given.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, List
+
+import numpy as np
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Movie, User
+from app.services.collaborative_filtering import item_item_model
+from app.services.recommendation import RecommendationService, recommendation_cache
+from app.services.recommendation_engine import recommendation_engine
+from app.services.seen_movies import seen_movies
+from app.services.similarity_index import similarity_index
+from benchmarks.synthetic import generate_catalog
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_CALLS = 200
+DEFAULT_SIMILAR_BUILD_TIMEOUT = 3600.0
+
+
+class QueryCounter:
+    """Counts statements executed on an engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_):
+        self.count += 1
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _summarize(latencies: List[float], queries: List[int]) -> dict:
+    millis = np.asarray(latencies) * 1000
+    return {
+        "calls": len(latencies),
+        "p50_ms": round(float(np.percentile(millis, 50)), 3),
+        "p95_ms": round(float(np.percentile(millis, 95)), 3),
+        "p99_ms": round(float(np.percentile(millis, 99)), 3),
+        "max_ms": round(float(millis.max()), 3),
+        "queries_per_call": round(float(np.mean(queries)), 2),
+    }
+
+
+def _measure(
+    session_factory,
+    counter: QueryCounter,
+    call: Callable,
+    args: List[int],
+    before_each: Callable = None
+) -> dict:
+    latencies, queries = [], []
+    for arg in args:
+        if before_each:
+            before_each()
+        db = session_factory()
+        try:
+            counter.count = 0
+            started = time.perf_counter()
+            call(db, arg)
+            latencies.append(time.perf_counter() - started)
+            queries.append(counter.count)
+        finally:
+            db.close()
+    return _summarize(latencies, queries)
+
+
+def _clear_caches():
+    recommendation_cache.clear()
+    seen_movies.clear()
+
+
+def run_size(movies: int, args: argparse.Namespace) -> dict:
+    """Benchmark one catalog size. Returns a result dict."""
+    path = os.path.join(args.data_dir, f"catalog_{movies}.db")
+    started = time.perf_counter()
+    if args.regenerate or not os.path.exists(path):
+        os.makedirs(args.data_dir, exist_ok=True)
+        print(f"Generating {movies} movie catalog at {path}...")
+        generate_catalog(path, movies, reviews_per_user=args.reviews_per_user, seed=args.seed)
+    generate_seconds = time.perf_counter() - started
+
+    engine = create_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = QueryCounter(engine)
+
+    db = session_factory()
+    user_count = db.query(func.count(User.id)).scalar()
+    movie_count = db.query(func.count(Movie.id)).scalar()
+    db.close()
+
+    rng = np.random.default_rng(args.seed)
+    user_ids = [int(u) for u in rng.integers(1, user_count + 1, args.calls)]
+    movie_ids = [int(m) for m in rng.integers(1, movie_count + 1, args.calls)]
+
+    result = {
+        "movies": movie_count,
+        "users": user_count,
+        "catalog_seconds": round(generate_seconds, 3),
+        "index_build_seconds": {},
+        "get_recommendations": {},
+        "get_similar_movies": {},
+    }
+
+    # This process is fresh, so each index is built from the database here
+    for name, model in [("content", recommendation_engine), ("collaborative", item_item_model)]:
+        db = session_factory()
+        started = time.perf_counter()
+        model.ensure_loaded(db)
+        result["index_build_seconds"][name] = round(time.perf_counter() - started, 3)
+        db.close()
+        print(f"  {name} index loaded in {result['index_build_seconds'][name]}s")
+
+    # The similarity index is built off the request path, so it is timed
+    # separately and a build over --similar-build-timeout is recorded as such
+    db = session_factory()
+    started = time.perf_counter()
+    try:
+        similarity_index.rebuild(db, deadline=time.monotonic() + args.similar_build_timeout)
+        similar_status = "ok"
+    except TimeoutError:
+        similar_status = "timeout"
+    finally:
+        db.close()
+    result["index_build_seconds"]["similarity"] = round(time.perf_counter() - started, 3)
+    print(f"  similarity index build {similar_status} after {result['index_build_seconds']['similarity']}s")
+
+    for strategy in args.strategies:
+        def recommend(db, user_id, strategy=strategy):
+            RecommendationService.get_recommendations(db, user_id, args.limit, strategy)
+
+        # Cold: indexes loaded, per-user caches empty
+        cold = _measure(session_factory, counter, recommend, user_ids, _clear_caches)
+        # Warm: the same users again once their rankings are cached
+        _measure(session_factory, counter, recommend, user_ids)
+        warm = _measure(session_factory, counter, recommend, user_ids)
+        result["get_recommendations"][strategy] = {"cold": cold, "warm": warm}
+        print(f"  get_recommendations[{strategy}] cold p50 {cold['p50_ms']}ms, warm p50 {warm['p50_ms']}ms")
+
+    def similar(db, movie_id):
+        RecommendationService.get_similar_movies(db, movie_id, args.limit)
+
+    result["get_similar_movies"]["status"] = similar_status
+    if similar_status == "ok":
+        # No result cache here: cold is the first read of each movie's rows,
+        # warm repeats them with SQLite's page cache populated
+        result["get_similar_movies"]["cold"] = _measure(session_factory, counter, similar, movie_ids)
+        result["get_similar_movies"]["warm"] = _measure(session_factory, counter, similar, movie_ids)
+        print(f"  get_similar_movies p50 {result['get_similar_movies']['warm']['p50_ms']}ms")
+    else:
+        result["get_similar_movies"]["timeout_seconds"] = args.similar_build_timeout
+        print(f"  get_similar_movies not measured: index build timed out after {args.similar_build_timeout}s")
+
+    result["cache"] = {
+        "recommendations": recommendation_cache.stats(),
+        "seen_movies": seen_movies.stats(),
+    }
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _run_in_process(movies: int, args: argparse.Namespace, queue):
+    queue.put(run_size(movies, args))
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recommendation latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Catalog sizes (number of movies)")
+    parser.add_argument("--calls", type=int, default=DEFAULT_CALLS, help="Calls per measurement")
+    parser.add_argument("--limit", type=int, default=10, help="Results per call")
+    parser.add_argument("--strategies", nargs="+", default=["content", "collaborative"],
+                        choices=["content", "collaborative"])
+    parser.add_argument("--similar-build-timeout", type=float, default=DEFAULT_SIMILAR_BUILD_TIMEOUT,
+                        help="Seconds the similarity index build may take before it is recorded as a timeout")
+    parser.add_argument("--reviews-per-user", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=".benchmarks", help="Where synthetic catalogs are kept")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild catalogs even if cached")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "calls": args.calls,
+        "limit": args.limit,
+        "results": [],
+    }
+
+    context = multiprocessing.get_context("spawn")
+    for movies in args.sizes:
+        print(f"Benchmarking {movies} movies...")
+        queue = context.Queue()
+        process = context.Process(target=_run_in_process, args=(movies, args, queue))
+        process.start()
+        result = None
+        while result is None:
+            try:
+                result = queue.get(timeout=1)
+            except queue_module.Empty:
+                if not process.is_alive():
+                    sys.exit(f"Benchmark for {movies} movies failed (exit code {process.exitcode})")
+        process.join()
+        report["results"].append(result)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
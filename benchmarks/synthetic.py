@@ -0,0 +1,149 @@
+"""Synthetic catalog generator for benchmarks."""
+import random
+import time
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+
+from app.database import Base
+from app.models import Movie, User, UserPreferences, Room, Review, room_members
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Biography", "Comedy", "Crime",
+    "Documentary", "Drama", "Family", "Fantasy", "History", "Horror",
+    "Music", "Mystery", "Romance", "Sci-Fi", "Sport", "Thriller", "War",
+    "Western",
+]
+# Drama/Comedy/Action dominate real catalogs
+GENRE_WEIGHTS = [8, 4, 2, 2, 9, 5, 3, 12, 2, 3, 1, 4, 1, 3, 5, 3, 1, 6, 1, 1]
+CERTIFICATIONS = ["G", "PG", "PG-13", "R", None]
+WORDS = (
+    "love war family secret city journey night power truth past future "
+    "friend enemy escape heist murder detective island ship space planet "
+    "king queen empire rebel school town small dream music band team game "
+    "race storm ocean desert mountain forest ghost house doctor soldier spy "
+    "agent thief lawyer father mother son daughter brother sister stranger"
+).split()
+
+INSERT_CHUNK = 5000
+
+
+def _zipf_choice(rng: np.random.Generator, pool_size: int, count: int, a: float = 1.3) -> np.ndarray:
+    """Popularity-skewed picks in [0, pool_size)."""
+    return (rng.zipf(a, count) - 1) % pool_size
+
+
+def _insert(engine: Engine, table, rows):
+    with engine.begin() as conn:
+        for start in range(0, len(rows), INSERT_CHUNK):
+            conn.execute(insert(table), rows[start:start + INSERT_CHUNK])
+
+
+def generate_catalog(
+    path: str,
+    movies: int,
+    users: Optional[int] = None,
+    reviews_per_user: int = 20,
+    seed: int = 42,
+    progress=print
+) -> Engine:
+    """
+    Create a SQLite database at path with a synthetic catalog: movies,
+    users (about 70% with preferences), rooms with members, and reviews.
+    """
+    users = users or max(1000, movies // 10)
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    started = time.perf_counter()
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    directors = [f"Director {i}" for i in range(max(100, movies // 8))]
+    actors = [f"Actor {i}" for i in range(max(500, movies // 2))]
+    genre_p = np.asarray(GENRE_WEIGHTS, dtype=float) / sum(GENRE_WEIGHTS)
+
+    movie_rows = []
+    quality = np.clip(rng.normal(6.5, 1.2, movies), 1.0, 9.8)
+    for i in range(movies):
+        genre_count = int(rng.integers(1, 4))
+        genres = rng.choice(len(GENRES), size=genre_count, replace=False, p=genre_p)
+        cast = _zipf_choice(rng, len(actors), int(rng.integers(3, 7)))
+        rating = f"{quality[i]:.1f}"
+        movie_rows.append({
+            "title": f"{random.choice(WORDS).title()} {random.choice(WORDS).title()} {i}",
+            "year": int(rng.integers(1950, 2025)),
+            "genre": ", ".join(GENRES[g] for g in genres),
+            "director": directors[int(_zipf_choice(rng, len(directors), 1)[0])],
+            "cast": ", ".join(dict.fromkeys(actors[a] for a in cast)),
+            "plot": " ".join(random.choices(WORDS, k=int(rng.integers(15, 40)))),
+            "rating": random.choice(CERTIFICATIONS),
+            "imdb_rating": rating,
+            "imdb_rating_value": float(rating),
+        })
+    _insert(engine, Movie.__table__, movie_rows)
+    del movie_rows
+    progress(f"  {movies} movies")
+
+    _insert(engine, User.__table__, [
+        {
+            "username": f"bench_user_{i}",
+            "email": f"bench_user_{i}@example.com",
+            "hashed_password": "x",
+        }
+        for i in range(users)
+    ])
+
+    preference_rows = []
+    for user_id in range(1, users + 1):
+        if rng.random() >= 0.7:
+            continue
+        preference_rows.append({
+            "user_id": user_id,
+            "favorite_genres": ",".join(
+                GENRES[g] for g in rng.choice(len(GENRES), int(rng.integers(1, 4)), replace=False, p=genre_p)
+            ),
+            "favorite_directors": directors[int(_zipf_choice(rng, len(directors), 1)[0])] if rng.random() < 0.4 else None,
+            "favorite_actors": actors[int(_zipf_choice(rng, len(actors), 1)[0])] if rng.random() < 0.5 else None,
+            "min_rating": int(rng.choice([0, 0, 5, 6, 7])),
+            "preferred_decades": random.choice([None, None, "1990s", "1980s,1990s", "2000s,2010s"]),
+        })
+    _insert(engine, UserPreferences.__table__, preference_rows)
+    progress(f"  {users} users, {len(preference_rows)} with preferences")
+
+    room_count = max(1, users // 5)
+    _insert(engine, Room.__table__, [
+        {
+            "name": f"Room {i}",
+            "movie_id": int(_zipf_choice(rng, movies, 1)[0]) + 1,
+            "creator_id": int(rng.integers(1, users + 1)),
+            "is_private": bool(rng.random() < 0.2),
+            "max_members": 50,
+        }
+        for i in range(room_count)
+    ])
+    member_rows = {}
+    for room_id in range(1, room_count + 1):
+        for user_id in rng.integers(1, users + 1, int(rng.integers(2, 20))):
+            member_rows[(room_id, int(user_id))] = {"room_id": room_id, "user_id": int(user_id), "is_admin": False}
+    _insert(engine, room_members, list(member_rows.values()))
+    progress(f"  {room_count} rooms, {len(member_rows)} memberships")
+
+    review_rows = []
+    for user_id in range(1, users + 1):
+        count = min(movies, int(rng.poisson(reviews_per_user)))
+        movie_ids = np.unique(_zipf_choice(rng, movies, count, a=1.1)) + 1
+        ratings = np.clip(np.rint(quality[movie_ids - 1] + rng.normal(0, 1.5, len(movie_ids))), 1, 10)
+        review_rows.extend(
+            {"movie_id": int(m), "user_id": user_id, "rating": int(r)}
+            for m, r in zip(movie_ids, ratings)
+        )
+        if len(review_rows) >= INSERT_CHUNK * 10:
+            _insert(engine, Review.__table__, review_rows)
+            review_rows = []
+    _insert(engine, Review.__table__, review_rows)
+    progress(f"  reviews generated in {time.perf_counter() - started:.1f}s total")
+    return engine
@@ -1,6 +1,7 @@
 const authentication = require('./authentication');
 const newRoomTrigger = require('./triggers/newRoom');
 const newReviewTrigger = require('./triggers/newReview');
+const reviewsImportedTrigger = require('./triggers/reviewsImported');
 const createRoomAction = require('./creates/createRoom');
 const createReviewAction = require('./creates/createReview');
 const searchMoviesAction = require('./searches/searchMovies');
@@ -12,6 +13,7 @@ module.exports = {
   triggers: {
     [newRoomTrigger.key]: newRoomTrigger,
     [newReviewTrigger.key]: newReviewTrigger,
+    [reviewsImportedTrigger.key]: reviewsImportedTrigger,
   },
   creates: {
     [createRoomAction.key]: createRoomAction,
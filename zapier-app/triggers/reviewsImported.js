@@ -0,0 +1,70 @@
+const performSubscribe = async (z, bundle) => {
+  const response = await z.request({
+    url: `${bundle.authData.apiUrl}/api/zapier/webhooks`,
+    method: 'POST',
+    headers: {
+      'X-API-Key': bundle.authData.apiKey,
+      'Content-Type': 'application/json'
+    },
+    body: {
+      event_type: 'reviews_imported',
+      webhook_url: bundle.targetUrl
+    }
+  });
+  return response.json;
+};
+
+const performUnsubscribe = async (z, bundle) => {
+  const response = await z.request({
+    url: `${bundle.authData.apiUrl}/api/zapier/webhooks`,
+    method: 'GET',
+    headers: {
+      'X-API-Key': bundle.authData.apiKey
+    }
+  });
+  
+  const subscriptions = response.json;
+  const subscription = subscriptions.find(sub => sub.webhook_url === bundle.targetUrl);
+  
+  if (subscription) {
+    await z.request({
+      url: `${bundle.authData.apiUrl}/api/zapier/webhooks/${subscription.id}`,
+      method: 'DELETE',
+      headers: {
+        'X-API-Key': bundle.authData.apiKey
+      }
+    });
+  }
+  
+  return {};
+};
+
+const perform = async (z, bundle) => {
+  return [];
+};
+
+module.exports = {
+  key: 'reviewsImported',
+  noun: 'Review Import',
+  display: {
+    label: 'Reviews Imported',
+    description: 'Triggers when reviews are imported in bulk in MovieFan.'
+  },
+  operation: {
+    type: 'hook',
+    performSubscribe,
+    performUnsubscribe,
+    perform,
+    sample: {
+      event: 'reviews_imported',
+      user_id: 1,
+      created: 250,
+      updated: 12,
+      movie_ids: [1, 2, 3],
+      movie_count: 262
+    }
+  }
+};
+
+
+